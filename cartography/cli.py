@@ -6,8 +6,10 @@ import sys
 from typing import Optional
 
 import cartography.config
+import cartography.graph.querylint
 import cartography.sync
 import cartography.util
+from cartography.client.core.session import build_neo4j_driver
 from cartography.intel.aws.util.common import parse_and_validate_aws_requested_syncs
 
 
@@ -137,6 +139,95 @@ class CLI:
                 'removed from the graph. By default, cartography will use a UNIX timestamp as the update tag.'
             ),
         )
+        parser.add_argument(
+            '--max-concurrent-stages',
+            type=int,
+            default=1,
+            help=(
+                'Maximum number of top-level sync stages to run at the same time, each on its own Neo4j session. '
+                'A stage only starts once the stages it depends on have finished: `create-indexes` always runs first, '
+                '`analysis` always runs last, and cross-module dependencies are declared in cartography.sync. '
+                'Defaults to 1, which runs all stages in sequence.'
+            ),
+        )
+        parser.add_argument(
+            '--max-load-writers',
+            type=int,
+            default=1,
+            help=(
+                'Number of Neo4j sessions to write node schema data with in parallel. Data is partitioned by node id '
+                'so that two writers never MERGE the same node. Defaults to 1, which writes all data on one session.'
+            ),
+        )
+        parser.add_argument(
+            '--change-detection',
+            action='store_true',
+            help=(
+                'Store a hash of the properties of every node written from a node schema, and only update '
+                '`lastupdated` on nodes whose properties have not changed since the previous sync instead of writing '
+                'all of their properties again. This reduces transaction log churn on large, mostly static graphs.'
+            ),
+        )
+        parser.add_argument(
+            '--two-phase-ingestion',
+            action='store_true',
+            help=(
+                'Write the nodes of every node schema first and then each of their relationship types in a separate '
+                'pass, with the rows sorted by target node. This reduces lock contention and deadlock retries on '
+                'target nodes shared by many rows, such as accounts, at the cost of holding each load in memory.'
+            ),
+        )
+        parser.add_argument(
+            '--adaptive-iterations',
+            action='store_true',
+            help=(
+                'Let iterative cleanup and analysis statements grow or shrink the number of records they process per '
+                'transaction towards a target transaction duration and memory budget, instead of always using the '
+                'iteration size of the job. This cuts the number of round trips when many stale nodes are deleted.'
+            ),
+        )
+        parser.add_argument(
+            '--server-side-iterations',
+            action='store_true',
+            help=(
+                'Run iterative cleanup and analysis statements that delete in batches as a single '
+                '`CALL { ... } IN TRANSACTIONS` query, so that Neo4j batches the deletes itself instead of cartography '
+                'sending one query per batch. Requires Neo4j 4.4 or later; on older servers the statements run as '
+                'usual.'
+            ),
+        )
+        parser.add_argument(
+            '--cleanup-precheck',
+            action='store_true',
+            help=(
+                'Before deleting the stale nodes of a cleanup job generated from a node schema, check for them in a '
+                'read transaction and skip the delete when there are none. The number of skipped and run deletes is '
+                'logged at the end of the sync.'
+            ),
+        )
+        parser.add_argument(
+            '--max-concurrent-jobs',
+            type=int,
+            default=1,
+            help=(
+                'The maximum number of cleanup jobs of a module that may run at the same time, each on its own Neo4j '
+                'session. Only jobs that do not touch the same node labels run concurrently. Defaults to 1, which runs '
+                'them one after another.'
+            ),
+        )
+        parser.add_argument(
+            '--bulk-import-csv-dir',
+            type=str,
+            default=None,
+            help=(
+                'Instead of writing node schema data to Neo4j, write it to CSV files for `neo4j-admin import` in this '
+                'directory, along with the import arguments and the indexes to create afterwards. Cleanup and analysis '
+                'jobs on the exported labels are skipped. Use this to bootstrap a new database offline. Modules that '
+                'do not load their data through node schemas, like most of AWS, GCP and Okta, still write to Neo4j, '
+                'and relationships to their nodes are left out of the export. The bigfix, cve, duo, kandji, lastpass '
+                'and semgrep syncs produce a self-contained import.'
+            ),
+        )
         parser.add_argument(
             '--aws-sync-all-profiles',
             action='store_true',
@@ -160,6 +251,46 @@ class CLI:
                 'syncing other accounts and delay raising an exception until the very end.'
             ),
         )
+        parser.add_argument(
+            '--aws-account-concurrency',
+            type=int,
+            default=1,
+            help=(
+                'Number of AWS accounts to sync at the same time. Each account is synced by its own worker with its '
+                'own boto3 session and Neo4j session; resources within an account are still synced in order. '
+                'Defaults to 1, which syncs accounts one at a time.'
+            ),
+        )
+        parser.add_argument(
+            '--aws-account-worker-mode',
+            type=str,
+            choices=['thread', 'process'],
+            default='thread',
+            help=(
+                'Whether concurrent AWS accounts are synced on worker threads (default) or worker processes. Worker '
+                'processes each open their own connection to Neo4j. Only used if --aws-account-concurrency is '
+                'greater than 1.'
+            ),
+        )
+        parser.add_argument(
+            '--aws-max-in-flight-calls',
+            type=int,
+            default=None,
+            help=(
+                'The maximum number of calls to one AWS service, such as S3 bucket detail or ECR image lookups, that '
+                'may run at the same time. Defaults to 16.'
+            ),
+        )
+        parser.add_argument(
+            '--aws-resource-concurrency',
+            type=int,
+            default=1,
+            help=(
+                'The maximum number of AWS resource syncs (e.g. "ec2:instance", "s3", "iam") to run concurrently '
+                'within one AWS account. Resource syncs that depend on each other are still run in order. Defaults '
+                'to 1, which syncs resources one at a time.'
+            ),
+        )
         parser.add_argument(
             '--oci-sync-all-profiles',
             action='store_true',
@@ -751,11 +882,130 @@ class CLI:
             return cartography.util.STATUS_KEYBOARD_INTERRUPT
 
 
+class LintQueriesCLI:
+    """
+    Command line interface for `cartography lint-queries`, which EXPLAINs the generated and JSON-defined queries against
+    a local database and reports plans that scan the graph. See cartography.graph.querylint.
+    :type prog: string
+    :param prog: The name of the command line program. This will be displayed in usage and help output.
+    """
+
+    def __init__(self, prog: Optional[str] = None):
+        self.prog = prog
+        self.parser = self._build_parser()
+
+    def _build_parser(self):
+        parser = argparse.ArgumentParser(
+            prog=self.prog,
+            description=(
+                "Lints the queries that cartography generates from its node schemas and the statements of its JSON "
+                "jobs by EXPLAINing them against a Neo4j database. Reports AllNodesScan and CartesianProduct "
+                "operators, and NodeByLabelScan operators on labels that are not known to be small, as JSON. Exits "
+                "with 1 if anything was reported. The indexes of a synced database are created in the database "
+                "first, so point this at a local or CI database."
+            ),
+        )
+        parser.add_argument(
+            '--neo4j-uri',
+            type=str,
+            default='bolt://localhost:7687',
+            help='A valid Neo4j URI to EXPLAIN the queries against.',
+        )
+        parser.add_argument(
+            '--neo4j-user',
+            type=str,
+            default=None,
+            help='A username with which to authenticate to Neo4j.',
+        )
+        parser.add_argument(
+            '--neo4j-password-env-var',
+            type=str,
+            default=None,
+            help='The name of an environment variable containing a password with which to authenticate to Neo4j.',
+        )
+        parser.add_argument(
+            '--neo4j-database',
+            type=str,
+            default=None,
+            help='The name of the database in Neo4j to connect to. Uses the default database if not specified.',
+        )
+        parser.add_argument(
+            '--small-labels',
+            type=str,
+            default=None,
+            help=(
+                'A comma-separated list of labels to not report NodeByLabelScan operators on, in addition to the '
+                'labels of tenants and accounts that cartography.graph.querylint.DEFAULT_SMALL_LABELS lists.'
+            ),
+        )
+        parser.add_argument(
+            '--label-counts-file',
+            type=str,
+            default=None,
+            help=(
+                'The path to a JSON file that maps labels to their number of nodes, e.g. in a production database. '
+                'NodeByLabelScan operators are not reported on labels with fewer than --large-label-threshold nodes '
+                'in it. Scans on labels that are neither in the file nor small labels are always reported.'
+            ),
+        )
+        parser.add_argument(
+            '--large-label-threshold',
+            type=int,
+            default=cartography.graph.querylint.DEFAULT_LARGE_LABEL_THRESHOLD,
+            help='See --label-counts-file.',
+        )
+        parser.add_argument(
+            '--skip-index-setup',
+            action='store_true',
+            help='Do not create the indexes of a synced database before EXPLAINing the queries.',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='The path to write the JSON report to. The report is printed to stdout if not specified.',
+        )
+        return parser
+
+    def main(self, argv: str) -> int:
+        config: argparse.Namespace = self.parser.parse_args(argv)
+        neo4j_password = None
+        if config.neo4j_password_env_var:
+            neo4j_password = os.environ.get(config.neo4j_password_env_var)
+        small_labels = set(cartography.graph.querylint.DEFAULT_SMALL_LABELS)
+        if config.small_labels:
+            small_labels.update(label.strip() for label in config.small_labels.split(',') if label.strip())
+        label_counts = None
+        if config.label_counts_file:
+            label_counts = cartography.graph.querylint.load_label_counts(config.label_counts_file)
+        neo4j_driver = build_neo4j_driver(config.neo4j_uri, config.neo4j_user, neo4j_password)
+        try:
+            with neo4j_driver.session(database=config.neo4j_database) as neo4j_session:
+                report = cartography.graph.querylint.run_lint_queries(
+                    neo4j_session,
+                    small_labels=small_labels,
+                    label_counts=label_counts,
+                    large_label_threshold=config.large_label_threshold,
+                    skip_index_setup=config.skip_index_setup,
+                )
+        finally:
+            neo4j_driver.close()
+        if config.output:
+            with open(config.output, 'w') as report_file:
+                report_file.write(report.to_json())
+        else:
+            print(report.to_json())
+        if report.findings or report.errors:
+            return cartography.util.STATUS_FAILURE
+        return cartography.util.STATUS_SUCCESS
+
+
 def main(argv=None):
     """
     Entrypoint for the default cartography command line interface.
 
     This entrypoint build and executed the default cartography sync. See cartography.sync.build_default_sync.
+    `cartography lint-queries` runs the query linter instead, see LintQueriesCLI.
 
     :rtype: int
     :return: The return code.
@@ -765,4 +1015,6 @@ def main(argv=None):
     logging.getLogger('googleapiclient').setLevel(logging.WARNING)
     logging.getLogger('neo4j').setLevel(logging.WARNING)
     argv = argv if argv is not None else sys.argv[1:]
+    if argv and argv[0] == 'lint-queries':
+        sys.exit(LintQueriesCLI(prog='cartography lint-queries').main(argv[1:]))
     sys.exit(CLI(prog='cartography').main(argv))
@@ -0,0 +1,61 @@
+from typing import Optional
+from typing import Tuple
+
+import neo4j
+from neo4j import GraphDatabase
+
+
+class Neo4jSessionFactory:
+    """
+    Holds the Neo4j driver used for the current sync so that code that was only handed a single `neo4j.Session` can
+    open additional sessions for concurrent work. `neo4j.Session` objects are not thread-safe, but the driver is, so
+    every thread or worker must use its own session obtained through `new_session()`.
+    """
+
+    def __init__(self, driver: neo4j.Driver, database: Optional[str] = None):
+        self.driver = driver
+        self.database = database
+
+    def new_session(self) -> neo4j.Session:
+        return self.driver.session(database=self.database)
+
+
+# Global _session_factory
+# Will be set by cartography.sync.Sync.run() for the duration of a sync.
+_session_factory: Optional[Neo4jSessionFactory] = None
+
+
+def set_session_factory(session_factory: Optional[Neo4jSessionFactory]) -> None:
+    """
+    This is used to set the module level session factory. Pass None to unset it.
+    """
+    global _session_factory
+    _session_factory = session_factory
+
+
+def get_session_factory() -> Optional[Neo4jSessionFactory]:
+    """
+    Returns the module level session factory, or None if no driver has been registered. Callers that want to run work
+    concurrently should fall back to running it sequentially on their own session when this returns None.
+    """
+    return _session_factory
+
+
+def build_neo4j_driver(
+    neo4j_uri: str,
+    neo4j_user: Optional[str] = None,
+    neo4j_password: Optional[str] = None,
+    neo4j_max_connection_lifetime: Optional[int] = None,
+) -> neo4j.Driver:
+    """
+    Creates a Neo4j driver. Raises neo4j.exceptions.ServiceUnavailable or neo4j.exceptions.AuthError if the connection
+    cannot be established.
+    """
+    neo4j_auth: Optional[Tuple[Optional[str], Optional[str]]] = None
+    if neo4j_user or neo4j_password:
+        neo4j_auth = (neo4j_user, neo4j_password)
+    return GraphDatabase.driver(
+        neo4j_uri,
+        auth=neo4j_auth,
+        max_connection_lifetime=neo4j_max_connection_lifetime,
+    )
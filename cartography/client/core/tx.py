@@ -1,16 +1,90 @@
+import copy
+import hashlib
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict
 from typing import Any
+from typing import Callable
+from typing import ContextManager
 from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Set
 from typing import Tuple
 from typing import Union
 
+import backoff
 import neo4j
 
+from cartography.client.core.session import get_session_factory
+from cartography.client.core.session import Neo4jSessionFactory
+from cartography.graph.bulkimport import get_bulk_import_exporter
 from cartography.graph.querybuilder import build_create_index_queries
 from cartography.graph.querybuilder import build_ingestion_query
+from cartography.graph.querybuilder import build_relationship_ingestion_query
+from cartography.graph.querybuilder import CONTENT_HASH_FIELD
+from cartography.graph.querybuilder import get_referenced_item_keys
 from cartography.models.core.nodes import CartographyNodeSchema
-from cartography.util import batch
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.stats import get_stats_client
+
+logger = logging.getLogger(__name__)
+stat_handler = get_stats_client(__name__)
+
+DEFAULT_LOAD_BATCH_SIZE = 10000
+
+# Global _max_load_writers
+# Will be set by cartography.sync.Sync.run() from the config for the duration of a sync.
+_max_load_writers = 1
+
+# Loads with fewer items than this are written on the caller's session, since opening a pool of writer threads and
+# sessions costs more than it saves for a handful of rows.
+MIN_CONCURRENT_LOAD_SIZE = 1000
+
+_END_OF_PARTITION = object()
+
+# Labels of nodes that concurrent syncs MERGE with the same ids, like the AWSAccount and AWSPrincipal of an account
+# that several AWS accounts trust, or the IpRange 0.0.0.0/0 of AWS security group rules and GCP firewalls. The graph
+# has no uniqueness constraints, so MERGEs of the same node from concurrent transactions can create duplicates. See
+# shared_node_writes().
+SHARED_NODE_LABELS = frozenset({'AWSAccount', 'AWSPrincipal', 'IpRange'})
+
+# Global _shared_node_lock
+# Will be set by cartography.sync.Sync.run() while stages run concurrently, and by
+# cartography.intel.aws._sync_accounts_concurrently() while AWS accounts are synced concurrently.
+_shared_node_lock: Optional[ContextManager[Any]] = None
+
+# Global _created_indexes
+# The CREATE INDEX queries that ensure_indexes() has already run in this process.
+_created_indexes: Set[str] = set()
+
+# Global _change_detection
+# Will be set by cartography.sync.Sync.run() from the config for the duration of a sync.
+_change_detection = False
+
+# Global _two_phase_ingestion
+# Will be set by cartography.sync.Sync.run() from the config for the duration of a sync.
+_two_phase_ingestion = False
+
+# Global _change_counts
+# The number of changed and unchanged nodes that load() has written per node schema while change detection is enabled.
+_change_counts: Dict[str, Dict[str, int]] = {}
+_change_counts_lock = threading.Lock()
+
+# Global _bad_rows
+# The rows that load_graph_data() skipped because they could not be written, with their errors, per stat key.
+_bad_rows: Dict[str, List[Dict[str, Any]]] = {}
+_bad_rows_lock = threading.Lock()
 
 
 def read_list_of_values_tx(tx: neo4j.Transaction, query: str, **kwargs) -> List[Union[str, int]]:
@@ -191,10 +265,204 @@ def write_list_of_dicts_tx(
     tx.run(query, kwargs)
 
 
+def write_list_of_dicts_and_count_changes_tx(
+        tx: neo4j.Transaction,
+        query: str,
+        **kwargs,
+) -> Tuple[int, int]:
+    """
+    Writes a list of dicts to Neo4j like `write_list_of_dicts_tx()`, using a query built with
+    `build_ingestion_query(change_detection=True)`.
+    :param tx: The neo4j write transaction.
+    :param query: The Neo4j write query to run.
+    :param kwargs: Keyword args to be supplied to the Neo4j query.
+    :return: The number of nodes whose properties changed and the number of nodes that were left unchanged.
+    """
+    record = tx.run(query, kwargs).single()
+    return record['changed'], record['unchanged']
+
+
+# AdaptiveBatchSizer estimates the payload of a batch from every PAYLOAD_SAMPLE_INTERVAL-th item, starting with the
+# first one, because serializing every item only to measure it costs about as much CPU as sending it.
+PAYLOAD_SAMPLE_INTERVAL = 16
+
+
+def estimate_payload_bytes(item: Dict[str, Any]) -> int:
+    """
+    Estimates the number of bytes that the given dict adds to a write query's parameters.
+    """
+    return len(json.dumps(item, default=str))
+
+
+class AdaptiveBatchSizer:
+    """
+    Splits data into write batches whose size adapts to the data and to the database. A batch is cut as soon as it
+    reaches the current item limit or its estimated payload reaches `target_bytes`, so that nodes with large properties
+    like policy documents do not produce huge Bolt messages, while small nodes are written in large batches. The payload
+    is extrapolated from the sizes of a sample of the batch's items, see PAYLOAD_SAMPLE_INTERVAL. After each
+    transaction, `record()` scales the item limit towards the number of items that could be written in
+    `target_seconds`, at most doubling or halving it each time and keeping it within [min_size, max_size]. The payload
+    limit wins over min_size, so a batch holds at least one item but may be smaller than min_size if its items are big.
+
+    Use:
+    batch_sizer = AdaptiveBatchSizer()
+    for data_batch in batch_sizer.batches(dict_list):
+        start = time.monotonic()
+        neo4j_session.write_transaction(...)
+        batch_sizer.record(len(data_batch), time.monotonic() - start)
+    """
+
+    def __init__(
+        self,
+        initial_size: int = DEFAULT_LOAD_BATCH_SIZE,
+        min_size: int = 100,
+        max_size: int = 50000,
+        target_bytes: int = 8 * 1024 * 1024,
+        target_seconds: float = 2.0,
+    ):
+        if not 1 <= min_size <= max_size:
+            raise ValueError(f'Invalid batch size limits: min_size={min_size}, max_size={max_size}.')
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.size = min(max(initial_size, min_size), max_size)
+
+    def batches(self, items: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily consumes `items` and yields them in batches sized by the current item and payload limits.
+        """
+        data_batch: List[Dict[str, Any]] = []
+        sampled_bytes = 0
+        samples = 0
+        for item in items:
+            if len(data_batch) % PAYLOAD_SAMPLE_INTERVAL == 0:
+                sampled_bytes += estimate_payload_bytes(item)
+                samples += 1
+            data_batch.append(item)
+            batch_bytes = sampled_bytes * len(data_batch) / samples
+            if len(data_batch) >= self.size or batch_bytes >= self.target_bytes:
+                yield data_batch
+                data_batch = []
+                sampled_bytes = 0
+                samples = 0
+        if data_batch:
+            yield data_batch
+
+    def record(self, batch_size: int, seconds: float) -> None:
+        """
+        Adjusts the item limit after a batch of `batch_size` items was written in `seconds`.
+        """
+        if batch_size <= 0:
+            return
+        items_in_target_time = batch_size * self.target_seconds / max(seconds, 0.001)
+        new_size = min(max(items_in_target_time, self.size / 2), self.size * 2)
+        self.size = int(min(max(new_size, self.min_size), self.max_size))
+
+
+# Codes of the errors that a batch can fail with because of the values of some of its rows, e.g. a row that would
+# create a second node with the same value of a uniquely constrained property. Other client errors, like syntax,
+# semantic or type errors, point at the query rather than the data, so they are raised instead.
+_BAD_ROW_ERROR_CODES = frozenset({
+    'Neo.ClientError.Schema.ConstraintValidationFailed',
+})
+
+
+def _is_memory_error(error: Exception) -> bool:
+    """
+    :return: True if the error means that the transaction needed more memory than the database was willing to give it.
+    Retrying such a transaction as is will only fail again, but a smaller one might succeed.
+    """
+    code = getattr(error, 'code', None) or ''
+    return 'OutOfMemory' in code or 'MemoryLimit' in code
+
+
+# Retry batches that failed with transient errors like DeadlockDetected, which concurrent writers can run into when
+# their transactions lock the same relationship target nodes. This is on top of the retries done by write_transaction.
+# The jitter keeps writers that deadlocked on each other from retrying in lockstep. Memory errors are transient errors
+# too, but they are handled by `_write_batch_splitting()` instead.
+@backoff.on_exception(
+    backoff.expo,
+    neo4j.exceptions.TransientError,
+    max_tries=5,
+    jitter=backoff.full_jitter,
+    giveup=_is_memory_error,
+)
+def _write_batch(
+        neo4j_session: neo4j.Session,
+        query: str,
+        data_batch: List[Dict[str, Any]],
+        tx_func: Callable[..., Any] = write_list_of_dicts_tx,
+        **kwargs,
+) -> Any:
+    return neo4j_session.write_transaction(
+        tx_func,
+        query,
+        DictList=data_batch,
+        **kwargs,
+    )
+
+
+def _write_batch_splitting(
+        neo4j_session: neo4j.Session,
+        query: str,
+        data_batch: List[Dict[str, Any]],
+        stat_key: str,
+        tx_func: Callable[..., Any] = write_list_of_dicts_tx,
+        **kwargs,
+) -> List[Any]:
+    """
+    Writes the batch with `_write_batch()`. If the transaction runs out of memory or fails because of bad rows, the
+    batch is split in half and each half is written on its own, recursively, so that a large batch only loses the rows
+    that cannot be written. Rows that fail on their own are reported with `_record_bad_row()` and skipped. All other
+    errors are raised, and so is the error of the first row if every row of the batch fails, since that points at the
+    query rather than at the rows.
+    :return: The return values of `tx_func` for the transactions that succeeded.
+    """
+    results, bad_rows = _write_batch_halves(neo4j_session, query, data_batch, tx_func=tx_func, **kwargs)
+    if bad_rows and len(bad_rows) == len(data_batch):
+        raise bad_rows[0][1]
+    for row, error in bad_rows:
+        _record_bad_row(stat_key, row, error)
+    return results
+
+
+def _write_batch_halves(
+        neo4j_session: neo4j.Session,
+        query: str,
+        data_batch: List[Dict[str, Any]],
+        tx_func: Callable[..., Any] = write_list_of_dicts_tx,
+        **kwargs,
+) -> Tuple[List[Any], List[Tuple[Dict[str, Any], neo4j.exceptions.Neo4jError]]]:
+    """
+    :return: A tuple of (the return values of `tx_func` for the transactions that succeeded, the rows that failed on
+    their own with their errors), see `_write_batch_splitting()`.
+    """
+    try:
+        return [_write_batch(neo4j_session, query, data_batch, tx_func=tx_func, **kwargs)], []
+    except neo4j.exceptions.Neo4jError as e:
+        if not (_is_memory_error(e) or e.code in _BAD_ROW_ERROR_CODES):
+            raise
+        if len(data_batch) == 1:
+            return [], [(data_batch[0], e)]
+        logger.debug("Splitting a batch of %d rows after %s.", len(data_batch), e.code)
+    middle = len(data_batch) // 2
+    first_results, first_bad_rows = _write_batch_halves(
+        neo4j_session, query, data_batch[:middle], tx_func=tx_func, **kwargs,
+    )
+    second_results, second_bad_rows = _write_batch_halves(
+        neo4j_session, query, data_batch[middle:], tx_func=tx_func, **kwargs,
+    )
+    return first_results + second_results, first_bad_rows + second_bad_rows
+
+
 def load_graph_data(
         neo4j_session: neo4j.Session,
         query: str,
-        dict_list: List[Dict[str, Any]],
+        dict_list: Iterable[Dict[str, Any]],
+        batch_sizer: Optional[AdaptiveBatchSizer] = None,
+        change_detection_key: Optional[str] = None,
+        stat_key: str = 'load_graph_data',
         **kwargs,
 ) -> None:
     """
@@ -202,17 +470,30 @@ def load_graph_data(
     :param neo4j_session: The Neo4j session
     :param query: The Neo4j write query to run. This query is not meant to be handwritten, rather it should be generated
     with cartography.graph.querybuilder.build_ingestion_query().
-    :param dict_list: The data to load to the graph represented as a list of dicts.
+    :param dict_list: The data to load to the graph represented as a list of dicts. This may also be a generator, in
+    which case it is consumed one batch at a time so that only one batch is held in memory.
+    :param batch_sizer: Decides how many dicts go into each write transaction. Defaults to an AdaptiveBatchSizer with
+    default limits.
+    :param change_detection_key: Set this when `query` was built with `build_ingestion_query(change_detection=True)`.
+    The number of changed and unchanged nodes reported by the query is then added to the counters under this key, see
+    `get_change_counts()`.
+    :param stat_key: The key that rows which cannot be written are reported under, see `get_bad_rows()`.
     :param kwargs: Allows additional keyword args to be supplied to the Neo4j query.
     :return: None
+
+    Batches that fail with transient errors like deadlocks are retried with jittered exponential backoff. Batches that
+    run out of memory or contain bad rows are split until the bad rows are isolated, see `_write_batch_splitting()`.
     """
-    for data_batch in batch(dict_list, size=10000):
-        neo4j_session.write_transaction(
-            write_list_of_dicts_tx,
-            query,
-            DictList=data_batch,
-            **kwargs,
-        )
+    if batch_sizer is None:
+        batch_sizer = AdaptiveBatchSizer()
+    tx_func = write_list_of_dicts_and_count_changes_tx if change_detection_key else write_list_of_dicts_tx
+    for data_batch in batch_sizer.batches(dict_list):
+        start = time.monotonic()
+        results = _write_batch_splitting(neo4j_session, query, data_batch, stat_key, tx_func=tx_func, **kwargs)
+        if change_detection_key:
+            for changed, unchanged in results:
+                _record_change_counts(change_detection_key, changed, unchanged)
+        batch_sizer.record(len(data_batch), time.monotonic() - start)
 
 
 def ensure_indexes(neo4j_session: neo4j.Session, node_schema: CartographyNodeSchema) -> None:
@@ -223,6 +504,8 @@ def ensure_indexes(neo4j_session: neo4j.Session, node_schema: CartographyNodeSch
 
     This ensures that every time we need to MATCH on a node to draw a relationship to it, the field used for the MATCH
     will be indexed, making the operation fast.
+
+    Each index is only sent to Neo4j once per process, see `reset_index_registry()`.
     :param neo4j_session: The neo4j session
     :param node_schema: The node_schema object to create indexes for.
     """
@@ -231,13 +514,27 @@ def ensure_indexes(neo4j_session: neo4j.Session, node_schema: CartographyNodeSch
     for query in queries:
         if not query.startswith('CREATE INDEX IF NOT EXISTS'):
             raise ValueError('Query provided to `ensure_indexes()` does not start with "CREATE INDEX IF NOT EXISTS".')
+    for query in queries:
+        # Every index only needs to be created once, so skip the round trip for indexes this process already created.
+        if query in _created_indexes:
+            continue
         neo4j_session.run(query)
+        _created_indexes.add(query)
+
+
+def reset_index_registry() -> None:
+    """
+    Forgets which indexes `ensure_indexes()` has created, so that they are sent to Neo4j again on next use. Called at
+    the start of every sync in case the sync runs against a different database than the previous one.
+    """
+    _created_indexes.clear()
 
 
 def load(
         neo4j_session: neo4j.Session,
         node_schema: CartographyNodeSchema,
-        dict_list: List[Dict[str, Any]],
+        dict_list: Iterable[Dict[str, Any]],
+        batch_sizer: Optional[AdaptiveBatchSizer] = None,
         **kwargs,
 ) -> None:
     """
@@ -245,10 +542,418 @@ def load(
     to the graph and then performs the load operation.
     :param neo4j_session: The Neo4j session
     :param node_schema: The CartographyNodeSchema object to create indexes for and generate a query.
-    :param dict_list: The data to load to the graph represented as a list of dicts.
+    :param dict_list: The data to load to the graph represented as a list of dicts, or a generator of dicts to stream
+    into the graph in batches. Every batch is written with the same `lastupdated`, so cleanup jobs that run after the
+    generator has been fully consumed behave as if all of the data had been loaded at once.
+    :param batch_sizer: Decides how many dicts go into each write transaction, see `load_graph_data()`.
     :param kwargs: Allows additional keyword args to be supplied to the Neo4j query.
     :return: None
+
+    If parallel loads are enabled with `set_max_load_writers()` and a session factory is registered, the data is written
+    by that many writer sessions instead of `neo4j_session`, see `load_graph_data_concurrently()`.
+
+    If change detection is enabled with `set_change_detection()`, every dict is written along with a hash of the node
+    properties it maps to. Nodes whose stored hash is unchanged only get their `lastupdated` bumped instead of having
+    all of their properties SET again, and the changed and unchanged nodes are counted per schema, see
+    `get_change_counts()`.
+
+    If two-phase ingestion is enabled with `set_two_phase_ingestion()`, the nodes are written first and each of their
+    relationship types afterwards, with the rows sorted by target node, see `_load_in_two_phases()`.
+
+    Only the keys of each dict that the ingestion query reads are sent to Neo4j, see `_project_items()`.
+
+    Rows that cannot be written are skipped and reported per schema instead of failing the load, see `get_bad_rows()`.
+
+    If a BulkImportCsvExporter is registered with `set_bulk_import_exporter()`, the data is handed to it instead of
+    being written to Neo4j.
+
+    Nodes of SHARED_NODE_LABELS are written while holding the lock of `shared_node_writes()`.
     """
+    exporter = get_bulk_import_exporter()
+    if exporter is not None:
+        exporter.add(node_schema, dict_list, **kwargs)
+        return
+    labels = {node_schema.label}
+    if node_schema.extra_node_labels:
+        labels.update(node_schema.extra_node_labels.labels)
+    with shared_node_writes(labels):
+        _load(neo4j_session, node_schema, dict_list, batch_sizer, **kwargs)
+
+
+def _load(
+        neo4j_session: neo4j.Session,
+        node_schema: CartographyNodeSchema,
+        dict_list: Iterable[Dict[str, Any]],
+        batch_sizer: Optional[AdaptiveBatchSizer] = None,
+        **kwargs,
+) -> None:
     ensure_indexes(neo4j_session, node_schema)
-    ingestion_query = build_ingestion_query(node_schema)
-    load_graph_data(neo4j_session, ingestion_query, dict_list, **kwargs)
+    if _two_phase_ingestion:
+        _load_in_two_phases(neo4j_session, node_schema, dict_list, batch_sizer, **kwargs)
+        return
+    ingestion_query = build_ingestion_query(node_schema, change_detection=_change_detection)
+    stat_key = type(node_schema).__name__
+    dict_list = _project_items(dict_list, get_referenced_item_keys(ingestion_query), stat_key)
+    change_detection_key = None
+    if _change_detection:
+        dict_list = _with_content_hashes(node_schema, dict_list, kwargs)
+        change_detection_key = stat_key
+    _load_with_configured_writers(
+        neo4j_session, ingestion_query, dict_list, node_schema.properties.id.name, batch_sizer, change_detection_key,
+        stat_key, **kwargs,
+    )
+
+
+def _load_with_configured_writers(
+        neo4j_session: neo4j.Session,
+        query: str,
+        dict_list: Iterable[Dict[str, Any]],
+        partition_field: Optional[str],
+        batch_sizer: Optional[AdaptiveBatchSizer],
+        change_detection_key: Optional[str],
+        stat_key: str,
+        **kwargs,
+) -> None:
+    """
+    Writes the data with `load_graph_data_concurrently()` if parallel loads are enabled and a session factory is
+    registered, and with `load_graph_data()` on `neo4j_session` otherwise. Data without a `partition_field`, and data
+    with fewer than MIN_CONCURRENT_LOAD_SIZE items, is always written on `neo4j_session`.
+    """
+    session_factory = get_session_factory()
+    concurrent = _max_load_writers > 1 and session_factory is not None and partition_field is not None
+    if concurrent:
+        # Buffer the head of the data to find out whether it is big enough to be worth the writer pool, without
+        # materializing a generator.
+        items = iter(dict_list)
+        head = list(itertools.islice(items, MIN_CONCURRENT_LOAD_SIZE))
+        dict_list = itertools.chain(head, items)
+        concurrent = len(head) >= MIN_CONCURRENT_LOAD_SIZE
+
+    if concurrent and session_factory is not None and partition_field is not None:
+        load_graph_data_concurrently(
+            session_factory, query, dict_list, partition_field, _max_load_writers,
+            batch_sizer=batch_sizer, change_detection_key=change_detection_key, stat_key=stat_key, **kwargs,
+        )
+    else:
+        load_graph_data(
+            neo4j_session, query, dict_list, batch_sizer=batch_sizer,
+            change_detection_key=change_detection_key, stat_key=stat_key, **kwargs,
+        )
+
+
+def _get_relationships(node_schema: CartographyNodeSchema) -> List[CartographyRelSchema]:
+    rels: List[CartographyRelSchema] = []
+    if node_schema.sub_resource_relationship:
+        rels.append(node_schema.sub_resource_relationship)
+    if node_schema.other_relationships:
+        rels.extend(node_schema.other_relationships.rels)
+    return rels
+
+
+def _sort_by_target(rel_schema: CartographyRelSchema, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Returns the items that can match a target node of `rel_schema`, sorted by the values they match it on, so that
+    every transaction locks the target nodes in the same order. Items that lack one of the values can never match and
+    are dropped. Values are compared as strings because a field may hold values of different types.
+    """
+    refs = [ref for ref in asdict(rel_schema.target_node_matcher).values() if not ref.set_in_kwargs]
+    matchable = [item for item in items if all(item.get(ref.name) is not None for ref in refs)]
+    return sorted(matchable, key=lambda item: tuple(str(item[ref.name]) for ref in refs))
+
+
+def _load_in_two_phases(
+        neo4j_session: neo4j.Session,
+        node_schema: CartographyNodeSchema,
+        dict_list: Iterable[Dict[str, Any]],
+        batch_sizer: Optional[AdaptiveBatchSizer],
+        **kwargs,
+) -> None:
+    """
+    Loads the data in two phases instead of with one query per batch that MERGEs the nodes and all of their
+    relationships: first the nodes alone, then each relationship type with its own query, see
+    `build_relationship_ingestion_query()`. The rows of each relationship phase are sorted by their target node, and
+    with parallel loads they are partitioned by it, so concurrent writers do not contend for the same target nodes,
+    such as the AWSAccount that every node of a schema is attached to.
+
+    Every phase reads all of the data, so a generator passed as `dict_list` is consumed into a list first.
+    Relationship rows are reported under `<schema name>.<rel label>` in `get_bad_rows()`.
+    """
+    stat_key = type(node_schema).__name__
+    node_query = build_ingestion_query(node_schema, selected_relationships=set(), change_detection=_change_detection)
+    rel_queries = [
+        (rel_schema, build_relationship_ingestion_query(node_schema, rel_schema))
+        for rel_schema in _get_relationships(node_schema)
+    ]
+    keys = get_referenced_item_keys(node_query).union(*(get_referenced_item_keys(query) for _, query in rel_queries))
+    items = list(_project_items(dict_list, keys, stat_key))
+
+    node_items: Iterable[Dict[str, Any]] = items
+    change_detection_key = None
+    if _change_detection:
+        node_items = _with_content_hashes(node_schema, items, kwargs)
+        change_detection_key = stat_key
+    _load_with_configured_writers(
+        neo4j_session, node_query, node_items, node_schema.properties.id.name, batch_sizer, change_detection_key,
+        stat_key, **kwargs,
+    )
+
+    for rel_schema, rel_query in rel_queries:
+        # Partition on a matched field so that each target node is only written by one writer. If the target is
+        # matched on kwargs alone, every row points at the same node and a single writer is all that can help.
+        partition_field = next(
+            (ref.name for ref in asdict(rel_schema.target_node_matcher).values() if not ref.set_in_kwargs),
+            None,
+        )
+        _load_with_configured_writers(
+            neo4j_session, rel_query, _sort_by_target(rel_schema, items), partition_field, batch_sizer, None,
+            f'{stat_key}.{rel_schema.rel_label}', **kwargs,
+        )
+
+
+def _project_items(
+        dict_list: Iterable[Dict[str, Any]],
+        keys: FrozenSet[str],
+        stat_key: str,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields a copy of each dict with only the given keys. Transformed data often still holds whole API responses,
+    and Bolt would otherwise serialize all of it for properties that the query never reads. If statsd is enabled, the
+    estimated number of bytes saved is sent as `<stat_key>.projection_bytes_saved` once `dict_list` is consumed.
+    """
+    measure = stat_handler.is_enabled()
+    bytes_saved = 0
+    for item in dict_list:
+        projected = {key: item[key] for key in keys if key in item}
+        if measure:
+            bytes_saved += estimate_payload_bytes(item) - estimate_payload_bytes(projected)
+        yield projected
+    if measure:
+        stat_handler.incr(f'{stat_key}.projection_bytes_saved', bytes_saved)
+
+
+def _with_content_hashes(
+        node_schema: CartographyNodeSchema,
+        dict_list: Iterable[Dict[str, Any]],
+        kwargs: Dict[str, Any],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yields a copy of each dict with the hash of the node properties that it maps to under `CONTENT_HASH_FIELD`.
+    The hash covers the node's label, extra labels and property names too, so that nodes are rewritten in full when
+    the schema changes. `lastupdated` changes on every sync, so it is left out.
+    """
+    property_refs = sorted(
+        (
+            (node_property, property_ref)
+            for node_property, property_ref in asdict(node_schema.properties).items()
+            if node_property != 'lastupdated'
+        ),
+        key=lambda node_property_and_ref: node_property_and_ref[0],
+    )
+    extra_labels = node_schema.extra_node_labels.labels if node_schema.extra_node_labels else []
+    schema_fingerprint = [node_schema.label, extra_labels, [node_property for node_property, _ in property_refs]]
+    for item in dict_list:
+        values = [
+            kwargs.get(property_ref.name) if property_ref.set_in_kwargs else item.get(property_ref.name)
+            for _, property_ref in property_refs
+        ]
+        content = json.dumps([schema_fingerprint, values], sort_keys=True, default=str)
+        yield {**item, CONTENT_HASH_FIELD: hashlib.blake2b(content.encode(), digest_size=16).hexdigest()}
+
+
+def _record_change_counts(key: str, changed: int, unchanged: int) -> None:
+    with _change_counts_lock:
+        counts = _change_counts.setdefault(key, {'changed': 0, 'unchanged': 0})
+        counts['changed'] += changed
+        counts['unchanged'] += unchanged
+    stat_handler.incr(f'{key}.changed', changed)
+    stat_handler.incr(f'{key}.unchanged', unchanged)
+
+
+def set_change_detection(enabled: bool) -> None:
+    """
+    Enables or disables content-hash change detection in `load()`.
+    """
+    global _change_detection
+    _change_detection = enabled
+
+
+def get_change_counts() -> Dict[str, Dict[str, int]]:
+    """
+    Returns the number of `changed` and `unchanged` nodes that `load()` has written with change detection enabled, keyed
+    by the name of the node schema class.
+    """
+    with _change_counts_lock:
+        return {key: dict(counts) for key, counts in _change_counts.items()}
+
+
+def reset_change_counts() -> None:
+    """
+    Clears the counters returned by `get_change_counts()`. Called at the start of every sync.
+    """
+    with _change_counts_lock:
+        _change_counts.clear()
+
+
+def merge_change_counts(change_counts: Dict[str, Dict[str, int]]) -> None:
+    """
+    Adds counters returned by `get_change_counts()` in another process, like an AWS account worker process, to the
+    counters of this process. They are not sent to statsd again.
+    """
+    with _change_counts_lock:
+        for key, counts in change_counts.items():
+            merged = _change_counts.setdefault(key, {'changed': 0, 'unchanged': 0})
+            for outcome, count in counts.items():
+                merged[outcome] = merged.get(outcome, 0) + count
+
+
+def _record_bad_row(key: str, row: Dict[str, Any], error: neo4j.exceptions.Neo4jError) -> None:
+    logger.warning("Skipping a %s row that cannot be written: %s: %s. Row: %s", key, error.code, error.message, row)
+    with _bad_rows_lock:
+        _bad_rows.setdefault(key, []).append({'row': row, 'error': f'{error.code}: {error.message}'})
+    stat_handler.incr(f'{key}.bad_rows')
+
+
+def get_bad_rows() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Returns the rows that `load_graph_data()` skipped because they could not be written, keyed by stat key, which is
+    the name of the node schema class for data written with `load()`. Each entry holds the `row` and its `error`.
+    """
+    with _bad_rows_lock:
+        return {key: list(rows) for key, rows in _bad_rows.items()}
+
+
+def reset_bad_rows() -> None:
+    """
+    Clears the rows returned by `get_bad_rows()`. Called at the start of every sync.
+    """
+    with _bad_rows_lock:
+        _bad_rows.clear()
+
+
+def merge_bad_rows(bad_rows: Dict[str, List[Dict[str, Any]]]) -> None:
+    """
+    Adds rows returned by `get_bad_rows()` in another process, like an AWS account worker process, to the rows of this
+    process.
+    """
+    with _bad_rows_lock:
+        for key, rows in bad_rows.items():
+            _bad_rows.setdefault(key, []).extend(rows)
+
+
+def set_two_phase_ingestion(enabled: bool) -> None:
+    """
+    Enables or disables loading nodes and relationships in separate phases in `load()`, see `_load_in_two_phases()`.
+    """
+    global _two_phase_ingestion
+    _two_phase_ingestion = enabled
+
+
+def set_shared_node_lock(lock: Optional[ContextManager[Any]]) -> None:
+    """
+    Sets the lock that serializes writes of SHARED_NODE_LABELS, see `shared_node_writes()`. Pass None to unset it. This
+    is a `multiprocessing.RLock` when it has to be shared with the worker processes of AWS accounts, and can be a
+    `threading.RLock` otherwise.
+    """
+    global _shared_node_lock
+    _shared_node_lock = lock
+
+
+def get_shared_node_lock() -> Optional[ContextManager[Any]]:
+    """
+    Returns the lock set with `set_shared_node_lock()`, or None if writes of SHARED_NODE_LABELS are not serialized.
+    """
+    return _shared_node_lock
+
+
+@contextmanager
+def shared_node_writes(labels: Iterable[str]) -> Iterator[None]:
+    """
+    Holds the lock set with `set_shared_node_lock()` while writing nodes of the given labels, if any of them is in
+    SHARED_NODE_LABELS. Without a lock, i.e. when stages and accounts are synced one at a time, this does nothing.
+    Example usage:
+        with shared_node_writes({'AWSAccount'}):
+            neo4j_session.run(query_that_merges_aws_accounts, ...)
+    """
+    lock = _shared_node_lock
+    if lock is None or SHARED_NODE_LABELS.isdisjoint(labels):
+        yield
+        return
+    with lock:
+        yield
+
+
+def set_max_load_writers(max_load_writers: int) -> None:
+    """
+    Sets the number of concurrent writer sessions that `load()` spreads its batches across. 1 disables parallel loads.
+    """
+    global _max_load_writers
+    _max_load_writers = max(max_load_writers, 1)
+
+
+def load_graph_data_concurrently(
+        session_factory: Neo4jSessionFactory,
+        query: str,
+        dict_list: Iterable[Dict[str, Any]],
+        id_field: str,
+        max_writers: int,
+        batch_sizer: Optional[AdaptiveBatchSizer] = None,
+        change_detection_key: Optional[str] = None,
+        stat_key: str = 'load_graph_data',
+        **kwargs,
+) -> None:
+    """
+    Writes data to the graph like `load_graph_data()`, but spreads it across `max_writers` writer threads with their
+    own sessions. Items are partitioned by the value of their `id_field`, so all items for the same node go to the same
+    writer and two concurrent transactions never MERGE the same node. Writers consume their partition as a stream, so
+    `dict_list` can still be a generator. If a writer fails, the remaining items are not loaded and the first error is
+    re-raised once all writers have stopped.
+    :param session_factory: Opens a session for each writer.
+    :param query: The Neo4j write query to run, see `load_graph_data()`.
+    :param dict_list: The data to load to the graph represented as a list or generator of dicts.
+    :param id_field: The key of the dicts that holds the id of the node they are written to.
+    :param max_writers: The number of writer threads.
+    :param batch_sizer: Each writer sizes its batches with a copy of this sizer.
+    :param change_detection_key: See `load_graph_data()`.
+    :param stat_key: See `load_graph_data()`.
+    :param kwargs: Allows additional keyword args to be supplied to the Neo4j query.
+    :return: None
+    """
+    # Bounded queues keep a slow writer from letting the other partitions pile up in memory.
+    partitions: List[queue.Queue] = [queue.Queue(maxsize=DEFAULT_LOAD_BATCH_SIZE) for _ in range(max_writers)]
+
+    def write_partition(partition: queue.Queue) -> None:
+        def items() -> Iterator[Dict[str, Any]]:
+            while True:
+                item = partition.get()
+                if item is _END_OF_PARTITION:
+                    return
+                yield item
+
+        with session_factory.new_session() as writer_session:
+            load_graph_data(
+                writer_session, query, items(), batch_sizer=copy.copy(batch_sizer) if batch_sizer else None,
+                change_detection_key=change_detection_key, stat_key=stat_key, **kwargs,
+            )
+
+    def put(partition: queue.Queue, writer: Future, item: Any) -> bool:
+        # Give up on a partition whose writer has stopped, instead of blocking on its full queue forever.
+        while not writer.done():
+            try:
+                partition.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    with ThreadPoolExecutor(max_workers=max_writers, thread_name_prefix='cartography-load') as pool:
+        writers = [pool.submit(write_partition, partition) for partition in partitions]
+        try:
+            for item in dict_list:
+                index = hash(item.get(id_field)) % max_writers
+                if not put(partitions[index], writers[index], item):
+                    break
+        finally:
+            for partition, writer in zip(partitions, writers):
+                put(partition, writer, _END_OF_PARTITION)
+        for writer in writers:
+            writer.result()
@@ -23,12 +23,62 @@ class Config:
     :param selected_modules: Comma-separated list of cartography top-level modules to sync. Optional.
     :type update_tag: int
     :param update_tag: Update tag for a cartography sync run. Optional.
+    :type max_concurrent_stages: int
+    :param max_concurrent_stages: Maximum number of sync stages to run at the same time. Stages only run concurrently
+        once the stages they depend on have finished; see cartography.sync.STAGE_DEPENDENCIES. Defaults to 1, which runs
+        all stages in sequence. Optional.
+    :type max_load_writers: int
+    :param max_load_writers: Number of Neo4j sessions that `cartography.client.core.tx.load()` spreads its write
+        batches across. Data is partitioned by node id so that concurrent writers never MERGE the same node. Defaults
+        to 1, which writes all batches on the caller's session. Optional.
+    :type change_detection: bool
+    :param change_detection: If True, `cartography.client.core.tx.load()` stores a hash of each node's properties and
+        only bumps `lastupdated` on nodes whose hash has not changed instead of SETting all of their properties again.
+        Defaults to False. Optional.
+    :type two_phase_ingestion: bool
+    :param two_phase_ingestion: If True, `cartography.client.core.tx.load()` writes nodes first and then each
+        relationship type in its own pass, with the rows sorted by target node, to reduce lock contention on heavily
+        shared target nodes. Defaults to False. Optional.
+    :type adaptive_iterations: bool
+    :param adaptive_iterations: If True, iterative cleanup and analysis statements scale their LIMIT_SIZE towards a
+        target transaction duration and memory budget instead of always processing `iterationsize` records per
+        transaction. Defaults to False. Optional.
+    :type server_side_iterations: bool
+    :param server_side_iterations: If True, iterative cleanup and analysis statements that delete in batches of
+        LIMIT_SIZE run as a single `CALL { } IN TRANSACTIONS` query on Neo4j 4.4 and later instead of one query per
+        batch. Defaults to False. Optional.
+    :type cleanup_precheck: bool
+    :param cleanup_precheck: If True, the cleanup jobs generated from node schemas first check in a read transaction
+        whether their label and sub resource have any stale nodes, and skip deleting them when there are none. Defaults
+        to False. Optional.
+    :type max_concurrent_jobs: int
+    :param max_concurrent_jobs: Maximum number of jobs, like the cleanup jobs of a module, that
+        `cartography.util.run_graph_jobs()` runs at the same time on their own Neo4j sessions. Only jobs that do not
+        share a node label run concurrently. Defaults to 1, which runs them in sequence. Optional.
+    :type bulk_import_csv_dir: str
+    :param bulk_import_csv_dir: If set, data loaded through `cartography.client.core.tx.load()` is written to CSV files
+        for `neo4j-admin import` in this directory instead of to Neo4j, and cleanup and analysis jobs on the exported
+        labels are skipped. Modules that write with their own queries still write to Neo4j, and relationships to their
+        nodes are left out of the export; see `cartography.graph.bulkimport.BulkImportCsvExporter`. Optional.
     :type aws_sync_all_profiles: bool
     :param aws_sync_all_profiles: If True, AWS sync will run for all non-default profiles in the AWS_CONFIG_FILE. If
         False (default), AWS sync will run using the default credentials only. Optional.
     :type aws_best_effort_mode: bool
     :param aws_best_effort_mode: If True, AWS sync will not raise any exceptions, just log. If False (default),
         exceptions will be raised.
+    :type aws_account_concurrency: int
+    :param aws_account_concurrency: Number of AWS accounts to sync at the same time. Defaults to 1. Optional.
+    :type aws_account_worker_mode: str
+    :param aws_account_worker_mode: Whether concurrent AWS accounts are synced on worker "thread"s (default) or worker
+        "process"es. Only used if aws_account_concurrency is greater than 1. Optional.
+    :type aws_max_in_flight_calls: int
+    :param aws_max_in_flight_calls: Maximum number of calls to one AWS service that may run at the same time on the
+        shared `cartography.util.BoundedExecutor`, e.g. S3 bucket details and ECR image lookups. Defaults to
+        `cartography.util.DEFAULT_MAX_IN_FLIGHT_CALLS`. Optional.
+    :type aws_resource_concurrency: int
+    :param aws_resource_concurrency: The maximum number of AWS resource syncs to run concurrently within one account.
+        Syncs still respect the dependencies declared in cartography.intel.aws.resources.RESOURCE_DEPENDENCIES.
+        Defaults to 1, which syncs resources one at a time. Optional.
     :type azure_sync_all_subscriptions: bool
     :param azure_sync_all_subscriptions: If True, Azure sync will run for all profiles in azureProfile.json. If
         False (default), Azure sync will run using current user session via CLI credentials. Optional.
@@ -122,8 +172,21 @@ class Config:
         neo4j_database=None,
         selected_modules=None,
         update_tag=None,
+        max_concurrent_stages=1,
+        max_load_writers=1,
+        change_detection=False,
+        two_phase_ingestion=False,
+        adaptive_iterations=False,
+        server_side_iterations=False,
+        cleanup_precheck=False,
+        max_concurrent_jobs=1,
+        bulk_import_csv_dir=None,
         aws_sync_all_profiles=False,
         aws_best_effort_mode=False,
+        aws_account_concurrency=1,
+        aws_account_worker_mode='thread',
+        aws_max_in_flight_calls=None,
+        aws_resource_concurrency=1,
         azure_sync_all_subscriptions=False,
         azure_sp_auth=None,
         azure_tenant_id=None,
@@ -178,8 +241,21 @@ class Config:
         self.neo4j_database = neo4j_database
         self.selected_modules = selected_modules
         self.update_tag = update_tag
+        self.max_concurrent_stages = max_concurrent_stages
+        self.max_load_writers = max_load_writers
+        self.change_detection = change_detection
+        self.two_phase_ingestion = two_phase_ingestion
+        self.adaptive_iterations = adaptive_iterations
+        self.server_side_iterations = server_side_iterations
+        self.cleanup_precheck = cleanup_precheck
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.bulk_import_csv_dir = bulk_import_csv_dir
         self.aws_sync_all_profiles = aws_sync_all_profiles
         self.aws_best_effort_mode = aws_best_effort_mode
+        self.aws_account_concurrency = aws_account_concurrency
+        self.aws_account_worker_mode = aws_account_worker_mode
+        self.aws_max_in_flight_calls = aws_max_in_flight_calls
+        self.aws_resource_concurrency = aws_resource_concurrency
         self.azure_sync_all_subscriptions = azure_sync_all_subscriptions
         self.azure_sp_auth = azure_sp_auth
         self.azure_tenant_id = azure_tenant_id
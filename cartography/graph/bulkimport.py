@@ -0,0 +1,369 @@
+import csv
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from cartography.graph.querybuilder import build_create_index_queries
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+
+logger = logging.getLogger(__name__)
+
+# Separates the elements of list properties within a CSV field. This is the default of `neo4j-admin import`.
+ARRAY_DELIMITER = ';'
+
+# Keys of the relationships collected by BulkImportCsvExporter: (start node label, rel label, end node label).
+RelKey = Tuple[str, str, str]
+
+
+def _resolve(property_ref: PropertyRef, item: Dict[str, Any], kwargs: Dict[str, Any]) -> Any:
+    return kwargs.get(property_ref.name) if property_ref.set_in_kwargs else item.get(property_ref.name)
+
+
+def _neo4j_type(value: Any) -> Optional[str]:
+    """
+    :return: The `neo4j-admin import` header type for the given value, or None if the value is None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'long'
+    if isinstance(value, float):
+        return 'double'
+    return 'string'
+
+
+def _merge_types(types: Set[str]) -> str:
+    if len(types) == 1:
+        return types.pop()
+    if types == {'long', 'double'}:
+        return 'double'
+    return 'string'
+
+
+def _column_type(values: Iterable[Any]) -> str:
+    """
+    Infers the `neo4j-admin import` header type of a column so that numbers, booleans and lists keep the types that a
+    MERGE-based sync would have given them. Columns of mixed types fall back to strings.
+    """
+    scalar_types: Set[str] = set()
+    element_types: Set[str] = set()
+    has_lists = False
+    for value in values:
+        if isinstance(value, (list, tuple, set)):
+            has_lists = True
+            element_types.update(filter(None, map(_neo4j_type, value)))
+        else:
+            value_type = _neo4j_type(value)
+            if value_type:
+                scalar_types.add(value_type)
+    if has_lists:
+        return f'{_merge_types(element_types | scalar_types)}[]'
+    return _merge_types(scalar_types)
+
+
+def _format(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (list, tuple, set)):
+        return ARRAY_DELIMITER.join(_format(element) for element in value)
+    return str(value)
+
+
+class BulkImportCsvExporter:
+    """
+    Collects the nodes and relationships that `cartography.client.core.tx.load()` would have written to Neo4j and
+    writes them as CSV files for `neo4j-admin import`, which builds a new database offline far faster than replaying a
+    sync through MERGE transactions.
+
+    The files are generated from the CartographyNodeSchema and CartographyRelSchema definitions:
+    - Nodes are deduplicated by label and id. Like repeated MERGE + SET, later properties overwrite earlier ones.
+    - Relationships are deduplicated by their type and start and end nodes.
+    - Relationships can only be exported if their target node matcher matches on `id` alone, because `neo4j-admin
+      import` connects nodes by ID. Other relationships are counted in `skipped_relationships` and logged.
+    - `neo4j-admin import` looks up the ends of a relationship in an ID space. Relationships match their target nodes by
+      the label in their target node matcher, which can be an extra label like AWSPrincipal that the nodes of several
+      schemas carry. So the node labels that share a label that relationships point to get one ID space, and nodes with
+      the same id in one ID space are merged.
+    - Relationships whose start or end node is not part of the export are left out and counted in
+      `unresolved_relationships`, so the import does not need `--skip-bad-relationships`.
+
+    Only data that goes through `load()` is exported. Modules that write with their own queries, like most of the AWS,
+    GCP and Okta syncs and the AWSAccount and GCPProject nodes that other nodes hang off, still write to Neo4j, and
+    relationships to their nodes are left out of the export. The bigfix, cve, duo, kandji, lastpass and semgrep syncs
+    load all of their nodes with `load()` and produce a self-contained import, except for their relationships to nodes
+    of other modules, like the ones from Semgrep findings to GitHub repositories.
+
+    Everything is held in memory until `write()` is called, so this is intended for one-off bootstrap exports.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.firstseen = int(time.time() * 1000)
+        self.skipped_relationships: Dict[str, int] = {}
+        self.unresolved_relationships: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # label -> node id -> (labels, properties)
+        self._nodes: Dict[str, Dict[Any, Tuple[Set[str], Dict[str, Any]]]] = {}
+        # (start label, rel label, end label) -> (start id, end id) -> properties
+        self._rels: Dict[RelKey, Dict[Tuple[Any, Any], Dict[str, Any]]] = {}
+        self._index_queries: Dict[str, None] = {}
+        self._exported_labels: Set[str] = set()
+
+    def exports_any(self, labels: Iterable[str]) -> bool:
+        """
+        :return: True if nodes with any of the given labels have been added to the export. Jobs on such labels have to
+        be skipped, because the data that they would clean up or analyze is in the export rather than in the graph.
+        """
+        with self._lock:
+            return not self._exported_labels.isdisjoint(labels)
+
+    def add(self, node_schema: CartographyNodeSchema, dict_list: Iterable[Dict[str, Any]], **kwargs) -> None:
+        """
+        Adds the nodes and relationships that loading `dict_list` with `node_schema` would have written to the graph.
+        :param node_schema: The CartographyNodeSchema describing the data.
+        :param dict_list: The data, as it would be passed to `load()`.
+        :param kwargs: The keyword args that would have been supplied to the ingestion query.
+        """
+        node_props: Dict[str, PropertyRef] = asdict(node_schema.properties)
+        labels = {node_schema.label}
+        if node_schema.extra_node_labels:
+            labels.update(node_schema.extra_node_labels.labels)
+        rels: List[CartographyRelSchema] = []
+        if node_schema.sub_resource_relationship:
+            rels.append(node_schema.sub_resource_relationship)
+        if node_schema.other_relationships:
+            rels.extend(node_schema.other_relationships.rels)
+        rel_specs = [(rel, asdict(rel.target_node_matcher), asdict(rel.properties)) for rel in rels]
+
+        with self._lock:
+            for query in build_create_index_queries(node_schema):
+                self._index_queries[query] = None
+            self._exported_labels.update(labels)
+            nodes = self._nodes.setdefault(node_schema.label, {})
+            for item in dict_list:
+                node_id = _resolve(node_props['id'], item, kwargs)
+                if node_id is None:
+                    continue
+                node_labels, properties = nodes.setdefault(node_id, (set(), {'firstseen': self.firstseen}))
+                node_labels.update(labels)
+                properties.update(
+                    {name: _resolve(ref, item, kwargs) for name, ref in node_props.items() if name != 'id'},
+                )
+                for rel, matcher, rel_props in rel_specs:
+                    self._add_rel(node_schema.label, node_id, rel, matcher, rel_props, item, kwargs)
+
+    def _add_rel(
+        self,
+        node_label: str,
+        node_id: Any,
+        rel: CartographyRelSchema,
+        matcher: Dict[str, PropertyRef],
+        rel_props: Dict[str, PropertyRef],
+        item: Dict[str, Any],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        if set(matcher) != {'id'} or matcher['id'].ignore_case:
+            self.skipped_relationships[rel.rel_label] = self.skipped_relationships.get(rel.rel_label, 0) + 1
+            return
+        target_id = _resolve(matcher['id'], item, kwargs)
+        if target_id is None:
+            return
+        if rel.direction == LinkDirection.INWARD:
+            key = (rel.target_node_label, rel.rel_label, node_label)
+            ends = (target_id, node_id)
+        else:
+            key = (node_label, rel.rel_label, rel.target_node_label)
+            ends = (node_id, target_id)
+        properties = self._rels.setdefault(key, {}).setdefault(ends, {'firstseen': self.firstseen})
+        properties.update({name: _resolve(ref, item, kwargs) for name, ref in rel_props.items()})
+
+    def write(self) -> List[str]:
+        """
+        Writes the collected data to `directory`: one CSV file per node label and per relationship type and label
+        pair, `indexes.cypher` with the indexes to create after the import, and `neo4j-admin-import.args` with the
+        arguments to pass to `neo4j-admin import`.
+        :return: The paths of the written CSV files.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            id_spaces = self._get_id_spaces()
+            nodes_by_label, owners = self._merge_nodes(id_spaces)
+            carriers: Dict[str, str] = {}
+            for label, nodes in nodes_by_label.items():
+                for node_labels, _ in nodes.values():
+                    carriers.update((node_label, id_spaces[label]) for node_label in node_labels)
+
+            def resolves(label: str, node_id: Any) -> bool:
+                id_space = carriers.get(label)
+                owner = owners[id_space].get(node_id) if id_space else None
+                return owner is not None and label in nodes_by_label[owner][node_id][0]
+
+            import_args = ['--multiline-fields=true', f'--array-delimiter={ARRAY_DELIMITER}']
+            paths = []
+            for label, nodes in sorted(nodes_by_label.items()):
+                path = os.path.join(self.directory, f'nodes_{label}.csv')
+                self._write_nodes(path, id_spaces[label], nodes)
+                import_args.append(f'--nodes={path}')
+                paths.append(path)
+            self.unresolved_relationships = {}
+            for (start_label, rel_label, end_label), rels in sorted(self._rels.items()):
+                resolved = {
+                    ends: properties for ends, properties in rels.items()
+                    if resolves(start_label, ends[0]) and resolves(end_label, ends[1])
+                }
+                if len(resolved) < len(rels):
+                    self.unresolved_relationships[rel_label] = (
+                        self.unresolved_relationships.get(rel_label, 0) + len(rels) - len(resolved)
+                    )
+                if not resolved:
+                    continue
+                path = os.path.join(self.directory, f'relationships_{start_label}_{rel_label}_{end_label}.csv')
+                self._write_rels(path, carriers[start_label], rel_label, carriers[end_label], resolved)
+                import_args.append(f'--relationships={path}')
+                paths.append(path)
+            with open(os.path.join(self.directory, 'neo4j-admin-import.args'), 'w') as args_file:
+                args_file.write('\n'.join(import_args) + '\n')
+            with open(os.path.join(self.directory, 'indexes.cypher'), 'w') as index_file:
+                index_file.write(''.join(f'{query};\n' for query in self._index_queries))
+            for rel_label, count in sorted(self.skipped_relationships.items()):
+                logger.warning(
+                    "Skipped %d %s relationships in the bulk import export because their target nodes are not "
+                    "matched on `id` alone.", count, rel_label,
+                )
+            for rel_label, count in sorted(self.unresolved_relationships.items()):
+                logger.warning(
+                    "Left %d %s relationships out of the bulk import export because their start or end nodes are not "
+                    "part of the export.", count, rel_label,
+                )
+        return paths
+
+    def _get_id_spaces(self) -> Dict[str, str]:
+        """
+        :return: The ID space of each exported node label. The node labels that carry a label that relationships point
+        to share one ID space, named after the first of them.
+        """
+        carried_by: Dict[str, Set[str]] = {}
+        for label, nodes in self._nodes.items():
+            for node_labels, _ in nodes.values():
+                for node_label in node_labels:
+                    carried_by.setdefault(node_label, set()).add(label)
+
+        id_spaces = {label: label for label in self._nodes}
+
+        def find(label: str) -> str:
+            while id_spaces[label] != label:
+                label = id_spaces[label]
+            return label
+
+        for start_label, _, end_label in self._rels:
+            for rel_end_label in (start_label, end_label):
+                roots = sorted({find(label) for label in carried_by.get(rel_end_label, ())})
+                for root in roots[1:]:
+                    id_spaces[root] = roots[0]
+        return {label: find(label) for label in id_spaces}
+
+    def _merge_nodes(
+        self,
+        id_spaces: Dict[str, str],
+    ) -> Tuple[Dict[str, Dict[Any, Tuple[Set[str], Dict[str, Any]]]], Dict[str, Dict[Any, str]]]:
+        """
+        Merges the nodes that have the same id in one ID space into the node of the first label that has it, like a
+        MERGE on their shared label would have.
+        :return: The nodes to write per label, and the label whose file holds each node id per ID space.
+        """
+        nodes_by_label: Dict[str, Dict[Any, Tuple[Set[str], Dict[str, Any]]]] = {}
+        owners: Dict[str, Dict[Any, str]] = {}
+        for label in sorted(self._nodes):
+            space_owners = owners.setdefault(id_spaces[label], {})
+            label_nodes = nodes_by_label.setdefault(label, {})
+            for node_id, (node_labels, properties) in self._nodes[label].items():
+                owner = space_owners.setdefault(node_id, label)
+                if owner == label:
+                    label_nodes[node_id] = (set(node_labels), dict(properties))
+                else:
+                    owner_labels, owner_properties = nodes_by_label[owner][node_id]
+                    owner_labels.update(node_labels)
+                    owner_properties.update(properties)
+        return {label: nodes for label, nodes in nodes_by_label.items() if nodes}, owners
+
+    @staticmethod
+    def _columns(rows: Iterable[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        values: Dict[str, List[Any]] = {}
+        for properties in rows:
+            for name, value in properties.items():
+                values.setdefault(name, []).append(value)
+        return [(name, _column_type(column)) for name, column in sorted(values.items())]
+
+    def _write_nodes(self, path: str, id_space: str, nodes: Dict[Any, Tuple[Set[str], Dict[str, Any]]]) -> None:
+        id_type = _column_type(nodes.keys())
+        columns = self._columns(properties for _, properties in nodes.values())
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            # The ID column only identifies the node during the import; `id` is also stored as a regular property so
+            # that it keeps its type.
+            writer.writerow(
+                [f':ID({id_space})', f'id:{id_type}'] + [f'{name}:{column_type}' for name, column_type in columns]
+                + [':LABEL'],
+            )
+            for node_id, (labels, properties) in nodes.items():
+                writer.writerow(
+                    [_format(node_id), _format(node_id)] + [_format(properties.get(name)) for name, _ in columns]
+                    + [ARRAY_DELIMITER.join(sorted(labels))],
+                )
+
+    def _write_rels(
+        self,
+        path: str,
+        start_id_space: str,
+        rel_label: str,
+        end_id_space: str,
+        rels: Dict[Tuple[Any, Any], Dict[str, Any]],
+    ) -> None:
+        columns = self._columns(rels.values())
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(
+                [f':START_ID({start_id_space})', f':END_ID({end_id_space})', ':TYPE']
+                + [f'{name}:{column_type}' for name, column_type in columns],
+            )
+            for (start_id, end_id), properties in rels.items():
+                writer.writerow(
+                    [_format(start_id), _format(end_id), rel_label]
+                    + [_format(properties.get(name)) for name, _ in columns],
+                )
+
+
+# Global _bulk_import_exporter
+# Will be set by cartography.sync.Sync.run() when the sync exports to CSV files instead of writing to Neo4j.
+_bulk_import_exporter: Optional[BulkImportCsvExporter] = None
+
+
+def set_bulk_import_exporter(exporter: Optional[BulkImportCsvExporter]) -> None:
+    """
+    This is used to set the module level exporter. Pass None to unset it.
+    """
+    global _bulk_import_exporter
+    _bulk_import_exporter = exporter
+
+
+def get_bulk_import_exporter() -> Optional[BulkImportCsvExporter]:
+    """
+    Returns the module level exporter, or None if data should be written to Neo4j as usual.
+    """
+    return _bulk_import_exporter
@@ -41,6 +41,47 @@ def build_cleanup_queries(node_schema: CartographyNodeSchema) -> List[str]:
     return result
 
 
+def build_stale_node_count_query(node_schema: CartographyNodeSchema) -> str:
+    """
+    Generates a query that checks whether the first query of `build_cleanup_queries()` would delete anything, i.e.
+    whether any node of the given CartographyNodeSchema attached to the sub resource has a `lastupdated` other than
+    $UPDATE_TAG. Like the cleanup query, it starts from the sub resource and expands its nodes, so it reads at most the
+    nodes of one sub resource. Unlike the cleanup query, it runs in a single read transaction, takes no write locks, and
+    stops at the first stale node.
+    :param node_schema: The given CartographyNodeSchema
+    :return: A Neo4j query that returns 1 as `count` if there is a stale node and 0 otherwise.
+    """
+    if not node_schema.sub_resource_relationship:
+        raise ValueError(
+            "Auto-creating a stale node count query for a node_schema without a sub resource relationship is not "
+            f'supported. Please check the class definition of "{node_schema.__class__.__name__}".',
+        )
+    _validate_target_node_matcher_for_cleanup_job(node_schema.sub_resource_relationship.target_node_matcher)
+
+    if node_schema.sub_resource_relationship.direction == LinkDirection.INWARD:
+        sub_resource_link_template = Template("<-[:$SubResourceRelLabel]-")
+    else:
+        sub_resource_link_template = Template("-[:$SubResourceRelLabel]->")
+    sub_resource_link = sub_resource_link_template.safe_substitute(
+        SubResourceRelLabel=node_schema.sub_resource_relationship.rel_label,
+    )
+
+    query_template = Template(
+        """
+        MATCH (n:$node_label)$sub_resource_link(:$sub_resource_label{$match_sub_res_clause})
+        WHERE n.lastupdated <> $UPDATE_TAG
+        WITH n LIMIT 1
+        RETURN count(n) AS count;
+        """,
+    )
+    return query_template.safe_substitute(
+        node_label=node_schema.label,
+        sub_resource_link=sub_resource_link,
+        sub_resource_label=node_schema.sub_resource_relationship.target_node_label,
+        match_sub_res_clause=_build_match_clause(node_schema.sub_resource_relationship.target_node_matcher),
+    )
+
+
 def _build_cleanup_node_and_rel_queries(
         node_schema: CartographyNodeSchema,
         selected_relationship: CartographyRelSchema,
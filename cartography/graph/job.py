@@ -1,10 +1,13 @@
 import json
 import logging
+import re
 import string
 from pathlib import Path
 from string import Template
 from typing import Any
 from typing import Dict
+from typing import FrozenSet
+from typing import Iterable
 from typing import List
 from typing import Optional
 from typing import Set
@@ -12,13 +15,23 @@ from typing import Union
 
 import neo4j
 
+from cartography.graph.bulkimport import get_bulk_import_exporter
 from cartography.graph.cleanupbuilder import build_cleanup_queries
+from cartography.graph.cleanupbuilder import build_stale_node_count_query
 from cartography.graph.statement import get_job_shortname
 from cartography.graph.statement import GraphStatement
 from cartography.models.core.nodes import CartographyNodeSchema
 
 logger = logging.getLogger(__name__)
 
+# Matches node patterns like `(n:EC2Instance)` or `(:AWSAccount{id: $AWS_ID})`, capturing the variable, the labels and
+# the property map.
+_NODE_PATTERN = re.compile(r'\(\s*(\w*)\s*((?::\s*`?\w+`?\s*)+)(\{[^}]*\})?')
+
+# Global _max_concurrent_jobs
+# Will be set by cartography.sync.Sync.run() from the config for the duration of a sync.
+_max_concurrent_jobs = 1
+
 
 def _get_identifiers(template: string.Template) -> List[str]:
     """
@@ -53,6 +66,34 @@ def get_parameters(queries: List[str]) -> Set[str]:
     return parameter_set
 
 
+def get_touched_labels(queries: Iterable[str]) -> FrozenSet[str]:
+    """
+    :param queries: Neo4j queries.
+    :return: The labels of the nodes that the queries match, except for anonymous nodes that are pinned by a parameter
+    like `(:AWSAccount{id: $AWS_ID})`. Such nodes only scope a query to a sub resource, so queries that share them can
+    still run concurrently.
+    """
+    labels: Set[str] = set()
+    for query in queries:
+        for variable, node_labels, properties in _NODE_PATTERN.findall(query):
+            if not variable and '$' in properties:
+                continue
+            labels.update(label.strip(' `') for label in node_labels.split(':') if label.strip(' `'))
+    return frozenset(labels)
+
+
+def set_max_concurrent_jobs(max_concurrent_jobs: int) -> None:
+    """
+    Sets the number of jobs that `cartography.util.run_graph_jobs()` may run at the same time. 1 runs them in sequence.
+    """
+    global _max_concurrent_jobs
+    _max_concurrent_jobs = max(max_concurrent_jobs, 1)
+
+
+def get_max_concurrent_jobs() -> int:
+    return _max_concurrent_jobs
+
+
 class GraphJobJSONEncoder(json.JSONEncoder):
     """
     Support JSON serialization for GraphJob instances.
@@ -71,12 +112,23 @@ class GraphJob:
     A job that will run against the cartography graph. A job is a sequence of statements which execute sequentially.
     """
 
-    def __init__(self, name: str, statements: List[GraphStatement], short_name: Optional[str] = None):
+    def __init__(
+        self,
+        name: str,
+        statements: List[GraphStatement],
+        short_name: Optional[str] = None,
+        labels: Optional[Iterable[str]] = None,
+    ):
         # E.g. "Okta intel module cleanup"
         self.name = name
         self.statements: List[GraphStatement] = statements
         # E.g. "okta_import_cleanup"
         self.short_name = short_name
+        # The node labels that the job reads or writes. Jobs that do not share a label can run concurrently, see
+        # cartography.util.run_graph_jobs(). Inferred from the queries with get_touched_labels() if not given.
+        self.labels: FrozenSet[str] = (
+            frozenset(labels) if labels is not None else get_touched_labels(s.query for s in statements)
+        )
 
     def merge_parameters(self, parameters: Dict) -> None:
         """
@@ -88,7 +140,14 @@ class GraphJob:
     def run(self, neo4j_session: neo4j.Session) -> None:
         """
         Run the job. This will execute all statements sequentially.
+        While the sync exports to bulk import CSV files, jobs on labels that have been exported are skipped, since the
+        data that they would clean up or analyze is in the export rather than in the graph. Other jobs still run on the
+        data that modules with their own queries wrote to the graph.
         """
+        exporter = get_bulk_import_exporter()
+        if exporter is not None and exporter.exports_any(self.labels):
+            logger.info("Skipping job '%s' because its labels are exported to bulk import CSV files.", self.name)
+            return
         logger.debug("Starting job '%s'.", self.name)
         for stm in self.statements:
             try:
@@ -150,13 +209,30 @@ class GraphJob:
             )
 
         statements: List[GraphStatement] = [
-            GraphStatement(query, parameters=parameters, iterative=True, iterationsize=100) for query in queries
+            GraphStatement(
+                query,
+                parameters=parameters,
+                iterative=True,
+                iterationsize=100,
+                parent_job_name=node_schema.label,
+                parent_job_sequence_num=sequence_num,
+                # Only the node statement is prechecked, which keeps the extra read to one per node schema and sub
+                # resource.
+                precheck_query=build_stale_node_count_query(node_schema) if sequence_num == 1 else None,
+            )
+            for sequence_num, query in enumerate(queries, start=1)
         ]
 
+        # The queries only delete nodes of this schema and their relationships. Nodes at the other end of those
+        # relationships are only matched as the end of a path, so cleanups of their labels can run at the same time.
+        labels = {node_schema.label}
+        if node_schema.extra_node_labels:
+            labels.update(node_schema.extra_node_labels.labels)
         return cls(
             f"Cleanup {node_schema.label}",
             statements,
             node_schema.label,
+            labels=labels,
         )
 
     @classmethod
@@ -0,0 +1,161 @@
+import json
+import logging
+import sys
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+
+from cartography.graph.job import GraphJob
+from cartography.graph.statement import get_job_shortname
+from cartography.graph.statement import GraphStatement
+
+if sys.version_info >= (3, 7):
+    from importlib.resources import contents, read_text
+else:
+    from importlib_resources import contents, read_text
+
+logger = logging.getLogger(__name__)
+
+# The packages whose JSON jobs are loaded into the registry.
+JOB_PACKAGES = (
+    'cartography.data.jobs.analysis',
+    'cartography.data.jobs.cleanup',
+    'cartography.data.jobs.scoped_analysis',
+)
+
+
+@dataclass(frozen=True)
+class StatementSpec:
+    """
+    An immutable, validated statement of a JSON job. `bind()` creates the GraphStatement to run.
+    """
+    query: str
+    parameters: Mapping[str, Any]
+    iterative: bool
+    iterationsize: int
+    sequence_num: int
+
+    def bind(self, short_job_name: Optional[str], parameters: Dict[str, Any]) -> GraphStatement:
+        statement = GraphStatement(
+            self.query,
+            dict(self.parameters),
+            self.iterative,
+            self.iterationsize,
+            short_job_name,
+            self.sequence_num,
+        )
+        statement.merge_parameters(parameters)
+        return statement
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """
+    An immutable, validated JSON job. `bind()` creates the GraphJob to run with the parameters of a sync, without
+    reading or parsing the job again.
+    """
+    name: str
+    short_name: Optional[str]
+    statements: Tuple[StatementSpec, ...]
+    # The labels declared by the job's optional `labels` key, see GraphJob.labels.
+    labels: Optional[FrozenSet[str]] = None
+
+    def bind(self, parameters: Optional[Dict[str, Any]] = None) -> GraphJob:
+        parameters = parameters or {}
+        return GraphJob(
+            self.name,
+            [statement.bind(self.short_name, parameters) for statement in self.statements],
+            self.short_name,
+            self.labels,
+        )
+
+
+def parse_job(blob: str, short_name: Optional[str] = None) -> JobSpec:
+    """
+    Parses and validates a JSON job. Raises a ValueError that names the job if it is malformed: if it is not valid
+    JSON, lacks a `name` or `statements`, has `labels` that are not a list of strings, or has a statement without a
+    query or an iterative statement without a positive `iterationsize`.
+    """
+    job_name = short_name or 'job'
+    try:
+        data = json.loads(blob)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Job '{job_name}' is not valid JSON: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get('name'), str):
+        raise ValueError(f"Job '{job_name}' must be an object with a string `name`.")
+    if not isinstance(data.get('statements'), list) or not data['statements']:
+        raise ValueError(f"Job '{job_name}' must have a non-empty list of `statements`.")
+    labels = data.get('labels')
+    if labels is not None and (not isinstance(labels, list) or not all(isinstance(label, str) for label in labels)):
+        raise ValueError(f"Job '{job_name}' has `labels` that are not a list of strings.")
+
+    statements = []
+    # Sequence numbers are 1-based, like the ones of GraphJob.from_json(), to help with log readability.
+    for sequence_num, statement in enumerate(data['statements'], start=1):
+        where = f"Statement #{sequence_num} of job '{job_name}'"
+        if not isinstance(statement, dict) or not isinstance(statement.get('query'), str) or not statement['query']:
+            raise ValueError(f"{where} must be an object with a non-empty string `query`.")
+        parameters = statement.get('parameters', {})
+        if not isinstance(parameters, dict):
+            raise ValueError(f"{where} has `parameters` that are not an object.")
+        iterative = statement.get('iterative', False)
+        iterationsize = statement.get('iterationsize', 0)
+        if not isinstance(iterative, bool) or not isinstance(iterationsize, int):
+            raise ValueError(f"{where} must have a boolean `iterative` and an integer `iterationsize`.")
+        if iterative and iterationsize < 1:
+            raise ValueError(f"{where} is iterative but its `iterationsize` is not positive.")
+        statements.append(
+            StatementSpec(
+                statement['query'], MappingProxyType(dict(parameters)), iterative, iterationsize, sequence_num,
+            ),
+        )
+    return JobSpec(data['name'], short_name, tuple(statements), frozenset(labels) if labels is not None else None)
+
+
+class JobRegistry:
+    """
+    The JSON jobs of the given packages, read, parsed and validated once. Cleanup jobs run for every account and
+    region set, so this saves reading and parsing the same files over and over in a multi-account sync.
+    """
+
+    def __init__(self, packages: Tuple[str, ...] = JOB_PACKAGES):
+        jobs: Dict[Tuple[str, str], JobSpec] = {}
+        for package in packages:
+            for filename in sorted(contents(package)):
+                if filename.endswith('.json'):
+                    jobs[(package, filename)] = parse_job(read_text(package, filename), get_job_shortname(filename))
+        self._jobs: Mapping[Tuple[str, str], JobSpec] = MappingProxyType(jobs)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def get(self, package: str, filename: str) -> Optional[JobSpec]:
+        """
+        :return: The job in `filename` of `package`, or None if it is not part of the registry.
+        """
+        return self._jobs.get((package, filename))
+
+
+# Global _job_registry
+# Built on first use by get_job_registry(). cartography.sync.Sync.run() builds it before running any stage.
+_job_registry: Optional[JobRegistry] = None
+_job_registry_lock = threading.Lock()
+
+
+def get_job_registry() -> JobRegistry:
+    """
+    Returns the registry of the jobs packaged with cartography, building it on the first call. Raises a ValueError if
+    one of them is malformed.
+    """
+    global _job_registry
+    with _job_registry_lock:
+        if _job_registry is None:
+            _job_registry = JobRegistry()
+            logger.debug("Loaded %d jobs into the job registry.", len(_job_registry))
+        return _job_registry
@@ -1,11 +1,20 @@
 import logging
+import re
+import threading
 from dataclasses import asdict
+from dataclasses import fields
+from dataclasses import is_dataclass
+from functools import lru_cache
 from string import Template
+from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import FrozenSet
 from typing import List
 from typing import Optional
 from typing import Set
 from typing import Tuple
+from typing import TypeVar
 
 from cartography.models.core.common import PropertyRef
 from cartography.models.core.nodes import CartographyNodeProperties
@@ -18,6 +27,68 @@ from cartography.models.core.relationships import TargetNodeMatcher
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+# The key on each item dict that holds the content hash when ingesting with change detection, and the prefix of the
+# node property that stores it. See `build_ingestion_query(change_detection=True)`.
+CONTENT_HASH_FIELD = 'content_hash'
+
+_ITEM_KEY_PATTERN = re.compile(r'\bitem\.(\w+)')
+
+
+# Process-wide caches of the queries built from each schema, see `_get_or_build()`.
+_ingestion_query_cache: Dict[Tuple, Tuple[Any, str]] = {}
+_index_queries_cache: Dict[Tuple, Tuple[Any, Tuple[str, ...]]] = {}
+_relationship_query_cache: Dict[Tuple, Tuple[Any, str]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_content_hash_property(node_schema: CartographyNodeSchema) -> str:
+    """
+    Returns the node property that stores the content hash written by the given schema. Some nodes are written by
+    several schemas under the same label, like the EC2SecurityGroups of the EC2 instance and the security group syncs.
+    Each schema hashes different properties, so with a shared property the schemas would overwrite each other's hash and
+    rewrite the node in full on every sync.
+    """
+    return f'{CONTENT_HASH_FIELD}_{type(node_schema).__name__}'
+
+
+def _schema_cache_key(schema: Any) -> Optional[Tuple]:
+    """
+    Schemas are usually constructed anew for every call, e.g. `load(neo4j_session, EC2InstanceSchema(), ...)`, and many
+    of them are not hashable because OtherRelationships holds a list. So a schema is identified by its class and the
+    identity of its field values, which are the same default objects for all instances built without arguments.
+    Returns None for objects that are not dataclasses.
+    """
+    if not is_dataclass(schema):
+        return None
+    return (type(schema),) + tuple(id(getattr(schema, f.name)) for f in fields(schema))
+
+
+def _get_or_build(
+    cache: Dict[Tuple, Tuple[Any, T]],
+    schemas: Tuple[Any, ...],
+    build: Callable[[], T],
+    variant: Any = None,
+) -> T:
+    """
+    Returns the value built from the given schemas and hashable `variant` by `build()`, building it only on the first
+    call. Schemas built with non-default field values get their own cache entry per instance, so they should be
+    constructed once and reused rather than constructed anew for every call.
+    """
+    schema_keys = tuple(_schema_cache_key(schema) for schema in schemas)
+    if None in schema_keys:
+        return build()
+    key = (variant,) + schema_keys
+    with _cache_lock:
+        if key in cache:
+            return cache[key][1]
+    value = build()
+    with _cache_lock:
+        # Keep the schemas alive along with the value so that the object ids in the key cannot be reused.
+        cache[key] = (schemas, value)
+    return value
+
 
 def _build_node_properties_statement(
         node_property_map: Dict[str, PropertyRef],
@@ -259,6 +330,7 @@ def _build_attach_additional_links_statement(
 def _build_attach_relationships_statement(
         sub_resource_relationship: Optional[CartographyRelSchema],
         other_relationships: Optional[OtherRelationships],
+        carried_variables: str = 'i, item',
 ) -> str:
     """
     Use Neo4j subqueries to attach sub resource and/or other relationships.
@@ -267,6 +339,7 @@ def _build_attach_relationships_statement(
     For example, if an EC2Instance has attachments to NetworkInterfaces and AWSAccounts, but our data only includes
     EC2Instance to AWSAccount information, structuring the ingestion query with subqueries allows us to build a query
     that will ignore the null relationships and continue to MERGE the ones that exist.
+    `carried_variables` are the variables of the outer query that are still needed after the subqueries.
     """
     if not sub_resource_relationship and not other_relationships:
         return ""
@@ -282,13 +355,16 @@ def _build_attach_relationships_statement(
 
     query_template = Template(
         """
-        WITH i, item
+        WITH $carried_variables
         CALL {
             $attach_relationships_statement
         }
         """,
     )
-    return query_template.safe_substitute(attach_relationships_statement=attach_relationships_statement)
+    return query_template.safe_substitute(
+        carried_variables=carried_variables,
+        attach_relationships_statement=attach_relationships_statement,
+    )
 
 
 def rel_present_on_node_schema(
@@ -349,6 +425,7 @@ def filter_selected_relationships(
 def build_ingestion_query(
         node_schema: CartographyNodeSchema,
         selected_relationships: Optional[Set[CartographyRelSchema]] = None,
+        change_detection: bool = False,
 ) -> str:
     """
     Generates a Neo4j query from the given CartographyNodeSchema to ingest the specified nodes and relationships so that
@@ -360,6 +437,11 @@ def build_ingestion_query(
     If selected_relationships is None (default), then we create a query using all RelSchema specified in
     node_schema.sub_resource_relationship + node_schema.other_relationships.
     If selected_relationships is the empty set, we create a query with no relationship attachments at all.
+    :param change_detection: If True, generates a query that expects every item to carry a hash of its property values
+    under the `CONTENT_HASH_FIELD` key. Nodes whose hash stored under `get_content_hash_property(node_schema)` matches
+    only get their `lastupdated` bumped; all other nodes get the full SET and the new hash. Relationships are attached
+    as usual. The query returns a single record with the number of distinct `changed` and `unchanged` nodes in the
+    batch; a node that appears in several items counts as changed if any of them changed it.
     :return: An optimized Neo4j query that can be used to ingest nodes and relationships.
     Important notes:
     - The resulting query uses the UNWIND + MERGE pattern (see
@@ -368,7 +450,26 @@ def build_ingestion_query(
     - The query assumes that a list of dicts will be passed to it through parameter $DictList.
     - The query sets `firstseen` attributes on all the nodes and relationships that it creates.
     - The query is intended to be supplied as input to cartography.core.client.tx.load_graph_data().
+    - The query for each (node_schema, selected_relationships) pair is only built once per process and then served
+      from a cache. Schemas that are not hashable, e.g. because they are not frozen dataclasses, are built every time.
     """
+    # Relationships are sorted by their cache key so that the same selection in any order shares a query.
+    selected = sorted(selected_relationships or [], key=lambda rel: repr(_schema_cache_key(rel)))
+    return _get_or_build(
+        _ingestion_query_cache,
+        (node_schema,) + tuple(selected),
+        lambda: _build_ingestion_query(node_schema, selected_relationships, change_detection),
+        variant=(selected_relationships is None, change_detection),
+    )
+
+
+def _build_ingestion_query(
+        node_schema: CartographyNodeSchema,
+        selected_relationships: Optional[Set[CartographyRelSchema]] = None,
+        change_detection: bool = False,
+) -> str:
+    if change_detection:
+        return _build_change_detection_ingestion_query(node_schema, selected_relationships)
     query_template = Template(
         """
         UNWIND $DictList AS item
@@ -401,13 +502,137 @@ def build_ingestion_query(
     return ingest_query
 
 
+def _build_change_detection_ingestion_query(
+        node_schema: CartographyNodeSchema,
+        selected_relationships: Optional[Set[CartographyRelSchema]] = None,
+) -> str:
+    query_template = Template(
+        """
+        UNWIND $DictList AS item
+            MERGE (i:$node_label{id: $dict_id_field})
+            ON CREATE SET i.firstseen = timestamp()
+            WITH i, item, coalesce(i.$content_hash_property = item.$content_hash, false) AS unchanged
+            SET i.lastupdated = $lastupdated
+            FOREACH (_ IN CASE WHEN unchanged THEN [] ELSE [1] END |
+                SET
+                    i.$content_hash_property = item.$content_hash,
+                    $set_node_properties_statement
+            )
+            $attach_relationships_statement
+            WITH count(DISTINCT i) AS nodes, count(DISTINCT CASE WHEN NOT unchanged THEN i END) AS changed
+            RETURN changed, nodes - changed AS unchanged
+        """,
+    )
+
+    node_props: CartographyNodeProperties = node_schema.properties
+    node_props_as_dict: Dict[str, PropertyRef] = asdict(node_props)
+
+    sub_resource_rel: Optional[CartographyRelSchema] = node_schema.sub_resource_relationship
+    other_rels: Optional[OtherRelationships] = node_schema.other_relationships
+    if selected_relationships or selected_relationships == set():
+        sub_resource_rel, other_rels = filter_selected_relationships(node_schema, selected_relationships)
+
+    return query_template.safe_substitute(
+        node_label=node_schema.label,
+        dict_id_field=node_props.id,
+        content_hash=CONTENT_HASH_FIELD,
+        content_hash_property=get_content_hash_property(node_schema),
+        lastupdated=node_props.lastupdated,
+        set_node_properties_statement=_build_node_properties_statement(
+            node_props_as_dict,
+            node_schema.extra_node_labels,
+        ),
+        attach_relationships_statement=_build_attach_relationships_statement(
+            sub_resource_rel,
+            other_rels,
+            carried_variables='i, item, unchanged',
+        ),
+    )
+
+
+def build_relationship_ingestion_query(
+        node_schema: CartographyNodeSchema,
+        rel_schema: CartographyRelSchema,
+) -> str:
+    """
+    Generates a Neo4j query that only attaches the given relationship to nodes of the given schema that already exist,
+    for loading a node schema in two phases: first its nodes with
+    `build_ingestion_query(node_schema, selected_relationships=set())`, then each of its relationships with this query.
+    Every row of such a query MERGEs the same relationship type onto one target node, so callers can sort the rows by
+    their target to acquire the target node locks in a consistent order.
+    :param node_schema: The CartographyNodeSchema object whose nodes the relationship starts or ends at.
+    :param rel_schema: The CartographyRelSchema to attach. It _must_ be node_schema.sub_resource_relationship or one of
+    node_schema.other_relationships.
+    :return: A Neo4j query that expects the same $DictList items as the ingestion query of node_schema. Like
+    `build_ingestion_query()`, the query is only built once per process for hashable schemas.
+    """
+    return _get_or_build(
+        _relationship_query_cache,
+        (node_schema, rel_schema),
+        lambda: _build_relationship_ingestion_query(node_schema, rel_schema),
+    )
+
+
+def _build_relationship_ingestion_query(
+        node_schema: CartographyNodeSchema,
+        rel_schema: CartographyRelSchema,
+) -> str:
+    # Raises a ValueError if rel_schema is not defined on node_schema.
+    filter_selected_relationships(node_schema, {rel_schema})
+
+    query_template = Template(
+        """
+        UNWIND $DictList AS item
+            MATCH (i:$node_label{id: $dict_id_field})
+            MATCH (j:$target_label)
+            WHERE
+                $where_clause
+            $rel_merge_clause
+            ON CREATE SET r.firstseen = timestamp()
+            SET
+                $set_rel_properties_statement
+        """,
+    )
+    if rel_schema.direction == LinkDirection.INWARD:
+        rel_merge_template = Template("""MERGE (i)<-[r:$rel_label]-(j)""")
+    else:
+        rel_merge_template = Template("""MERGE (i)-[r:$rel_label]->(j)""")
+
+    return query_template.safe_substitute(
+        node_label=node_schema.label,
+        dict_id_field=node_schema.properties.id,
+        target_label=rel_schema.target_node_label,
+        where_clause=_build_where_clause_for_rel_match('j', rel_schema.target_node_matcher),
+        rel_merge_clause=rel_merge_template.safe_substitute(rel_label=rel_schema.rel_label),
+        set_rel_properties_statement=_build_rel_properties_statement('r', _asdict_with_validate_relprops(rel_schema)),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_referenced_item_keys(ingestion_query: str) -> FrozenSet[str]:
+    """
+    :param ingestion_query: A query generated by `build_ingestion_query()`.
+    :return: The keys of the `$DictList` items that the query reads, i.e. every `key` in `item.key`. Any other keys on
+    the items are sent to Neo4j for nothing.
+    """
+    return frozenset(_ITEM_KEY_PATTERN.findall(ingestion_query))
+
+
 def build_create_index_queries(node_schema: CartographyNodeSchema) -> List[str]:
     """
     Generate queries to create indexes for the given CartographyNodeSchema and all node types attached to it via its
-    relationships.
+    relationships. Like `build_ingestion_query()`, the queries for each hashable node_schema are only built once.
     :param node_schema: The Cartography node_schema object
     :return: A list of queries of the form `CREATE INDEX IF NOT EXISTS FOR (n:$TargetNodeLabel) ON (n.$TargetAttribute)`
     """
+    # Cache a tuple so that callers cannot modify the cached queries through the returned list.
+    queries: Tuple[str, ...] = _get_or_build(
+        _index_queries_cache, (node_schema,), lambda: tuple(_build_create_index_queries(node_schema)),
+    )
+    return list(queries)
+
+
+def _build_create_index_queries(node_schema: CartographyNodeSchema) -> List[str]:
     index_template = Template('CREATE INDEX IF NOT EXISTS FOR (n:$TargetNodeLabel) ON (n.$TargetAttribute);')
 
     # First ensure an index exists for the node_schema and all extra labels on the `id` and `lastupdated` fields
@@ -0,0 +1,258 @@
+import importlib
+import inspect
+import json
+import logging
+import pkgutil
+import re
+from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import AbstractSet
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+import neo4j
+
+import cartography.data.jobs
+import cartography.models
+from cartography.graph.cleanupbuilder import build_cleanup_queries
+from cartography.graph.cleanupbuilder import build_stale_node_count_query
+from cartography.graph.job import get_parameters
+from cartography.graph.querybuilder import build_create_index_queries
+from cartography.graph.querybuilder import build_ingestion_query
+from cartography.models.core.nodes import CartographyNodeSchema
+
+logger = logging.getLogger(__name__)
+
+# Plan operators that are reported regardless of the data in the database.
+FLAGGED_OPERATORS = frozenset({'AllNodesScan', 'CartesianProduct'})
+
+# NodeByLabelScan is not reported for these labels, since there are only a few nodes of each of them per tenant.
+DEFAULT_SMALL_LABELS = frozenset({
+    'AWSAccount',
+    'AzureSubscription',
+    'AzureTenant',
+    'BigfixRoot',
+    'DOAccount',
+    'DOProject',
+    'DuoApiHost',
+    'GCPFolder',
+    'GCPOrganization',
+    'GCPProject',
+    'GitHubOrganization',
+    'KandjiTenant',
+    'KubernetesCluster',
+    'LastpassTenant',
+    'OCITenancy',
+    'OktaOrganization',
+    'SemgrepDeployment',
+})
+
+# With label counts from a file, NodeByLabelScan is not reported for labels with fewer nodes than this either.
+DEFAULT_LARGE_LABEL_THRESHOLD = 10000
+
+# Placeholder values for query parameters whose value matters for planning.
+PARAMETER_PLACEHOLDERS: Dict[str, Any] = {
+    'DictList': [],
+    'LIMIT_SIZE': 100,
+}
+
+INDEXES_CYPHER = Path(cartography.data.__file__).parent / 'indexes.cypher'
+
+
+@dataclass
+class LintQuery:
+    # Where the query comes from, e.g. `AWSUserSchema:ingestion` or `cleanup/aws_import_users_cleanup.json#0`.
+    source: str
+    query: str
+
+
+@dataclass
+class LintFinding:
+    source: str
+    operator: str
+    details: str
+    query: str
+    label: Optional[str] = None
+    label_count: Optional[int] = None
+
+
+@dataclass
+class LintReport:
+    queries: int = 0
+    findings: List[LintFinding] = field(default_factory=list)
+    errors: List[Dict[str, str]] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), indent=2)
+
+
+def get_node_schemas() -> List[CartographyNodeSchema]:
+    """
+    Imports every module under `cartography.models` and returns an instance of every CartographyNodeSchema defined in
+    them, sorted by class name.
+    """
+    schema_classes = {}
+    for module_info in pkgutil.walk_packages(cartography.models.__path__, prefix='cartography.models.'):
+        module = importlib.import_module(module_info.name)
+        for _, member in inspect.getmembers(module, inspect.isclass):
+            if issubclass(member, CartographyNodeSchema) and member is not CartographyNodeSchema:
+                schema_classes[member.__name__] = member
+    return [schema_classes[name]() for name in sorted(schema_classes)]
+
+
+def get_schema_queries(node_schemas: List[CartographyNodeSchema]) -> Iterator[LintQuery]:
+    """
+    Yields the ingestion and, where supported, the cleanup and stale node count queries generated for the given node
+    schemas.
+    """
+    for node_schema in node_schemas:
+        name = type(node_schema).__name__
+        yield LintQuery(f'{name}:ingestion', build_ingestion_query(node_schema))
+        if node_schema.sub_resource_relationship:
+            for i, query in enumerate(build_cleanup_queries(node_schema)):
+                yield LintQuery(f'{name}:cleanup#{i}', query)
+            yield LintQuery(f'{name}:stale_count', build_stale_node_count_query(node_schema))
+
+
+def get_json_job_queries(jobs_dir: Optional[Path] = None) -> Iterator[LintQuery]:
+    """
+    Yields the statements of every JSON job under `jobs_dir`, which defaults to `cartography/data/jobs`.
+    """
+    jobs_dir = jobs_dir or Path(cartography.data.jobs.__file__).parent
+    for path in sorted(jobs_dir.rglob('*.json')):
+        blob = json.loads(path.read_text())
+        for i, statement in enumerate(blob['statements']):
+            yield LintQuery(f'{path.relative_to(jobs_dir)}#{i}', statement['query'])
+
+
+def apply_indexes(neo4j_session: neo4j.Session, node_schemas: List[CartographyNodeSchema]) -> None:
+    """
+    Creates the indexes from `indexes.cypher` and the indexes of the given node schemas, so that the plans match the
+    ones that a synced database would use.
+    """
+    queries = [query.strip() for query in INDEXES_CYPHER.read_text().split(';') if query.strip()]
+    for node_schema in node_schemas:
+        queries.extend(build_create_index_queries(node_schema))
+    for query in queries:
+        neo4j_session.run(query).consume()
+
+
+def _iter_operators(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get('children', []):
+        yield from _iter_operators(child)
+
+
+def _operator_name(plan: Dict[str, Any]) -> str:
+    # Operator types can carry a runtime suffix, like `NodeByLabelScan@neo4j`.
+    return plan.get('operatorType', '').split('@')[0]
+
+
+def _scanned_label(plan: Dict[str, Any]) -> Optional[str]:
+    match = re.search(r':`?(\w+)`?', plan.get('args', {}).get('Details', ''))
+    return match.group(1) if match else None
+
+
+def load_label_counts(path: str) -> Dict[str, int]:
+    """
+    Reads the number of nodes per label from a JSON file that maps labels to counts, e.g. the output of
+    `MATCH (n) UNWIND labels(n) AS label RETURN label, count(*)` on a production database.
+    """
+    with open(path) as label_counts_file:
+        return {label: int(count) for label, count in json.load(label_counts_file).items()}
+
+
+class QueryLinter:
+    """
+    EXPLAINs queries and reports the plan operators that make them scale with the size of the graph instead of the
+    size of their input: AllNodesScan, CartesianProduct, and NodeByLabelScan on any label that is not known to be
+    small. The database that the queries are EXPLAINed against is usually empty, so a label is known to be small only
+    if it is in `small_labels`, or if `label_counts` has fewer than `large_label_threshold` nodes for it.
+    """
+
+    def __init__(
+        self,
+        neo4j_session: neo4j.Session,
+        small_labels: AbstractSet[str] = DEFAULT_SMALL_LABELS,
+        label_counts: Optional[Dict[str, int]] = None,
+        large_label_threshold: int = DEFAULT_LARGE_LABEL_THRESHOLD,
+    ):
+        self.neo4j_session = neo4j_session
+        self.small_labels = small_labels
+        self.label_counts = label_counts or {}
+        self.large_label_threshold = large_label_threshold
+
+    def _is_small_label(self, label: Optional[str]) -> bool:
+        if label is None:
+            return False
+        if label in self.small_labels:
+            return True
+        return label in self.label_counts and self.label_counts[label] < self.large_label_threshold
+
+    def lint(self, lint_query: LintQuery) -> List[LintFinding]:
+        parameters = {
+            name: PARAMETER_PLACEHOLDERS.get(name) for name in get_parameters([lint_query.query])
+        }
+        plan = self.neo4j_session.run(f'EXPLAIN {lint_query.query}', parameters).consume().plan or {}
+        findings = []
+        for operator in _iter_operators(plan):
+            name = _operator_name(operator)
+            details = operator.get('args', {}).get('Details', '')
+            if name in FLAGGED_OPERATORS:
+                findings.append(LintFinding(lint_query.source, name, details, lint_query.query))
+            elif name == 'NodeByLabelScan':
+                label = _scanned_label(operator)
+                if not self._is_small_label(label):
+                    count = self.label_counts.get(label) if label else None
+                    findings.append(LintFinding(lint_query.source, name, details, lint_query.query, label, count))
+        return findings
+
+    def lint_all(self, lint_queries: Iterator[LintQuery]) -> LintReport:
+        report = LintReport()
+        for lint_query in lint_queries:
+            report.queries += 1
+            try:
+                report.findings.extend(self.lint(lint_query))
+            except neo4j.exceptions.Neo4jError as e:
+                report.errors.append({'source': lint_query.source, 'error': f'{e.code}: {e.message}'})
+        return report
+
+
+def run_lint_queries(
+    neo4j_session: neo4j.Session,
+    small_labels: AbstractSet[str] = DEFAULT_SMALL_LABELS,
+    label_counts: Optional[Dict[str, int]] = None,
+    large_label_threshold: int = DEFAULT_LARGE_LABEL_THRESHOLD,
+    skip_index_setup: bool = False,
+) -> LintReport:
+    """
+    Lints the ingestion and cleanup queries generated for every node schema under `cartography.models` and every JSON
+    job under `cartography/data/jobs`.
+    :param neo4j_session: A session to the database to EXPLAIN the queries against. Unless `skip_index_setup` is set,
+    the indexes of a synced database are created in it first.
+    :param small_labels: NodeByLabelScan is not reported for these labels.
+    :param label_counts: The number of nodes per label, e.g. from `load_label_counts()`. NodeByLabelScan is not reported
+    for labels with fewer than `large_label_threshold` nodes in it either.
+    :param large_label_threshold: See `label_counts`.
+    :param skip_index_setup: Whether to skip creating the indexes.
+    :return: The report.
+    """
+    node_schemas = get_node_schemas()
+    if not skip_index_setup:
+        apply_indexes(neo4j_session, node_schemas)
+    linter = QueryLinter(neo4j_session, small_labels, label_counts, large_label_threshold)
+
+    def lint_queries() -> Iterator[LintQuery]:
+        yield from get_schema_queries(node_schemas)
+        yield from get_json_job_queries()
+
+    report = linter.lint_all(lint_queries())
+    logger.info(
+        "Linted %d queries: %d findings, %d errors.", report.queries, len(report.findings), len(report.errors),
+    )
+    return report
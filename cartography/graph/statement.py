@@ -1,20 +1,181 @@
 import json
 import logging
 import os
+import re
+import threading
+import time
 from pathlib import Path
 from typing import Any
 from typing import Dict
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
 import neo4j
 
+from cartography.client.core.tx import _is_memory_error
+from cartography.client.core.tx import AdaptiveBatchSizer
+from cartography.client.core.tx import read_single_value_tx
 from cartography.stats import get_stats_client
 
 
 logger = logging.getLogger(__name__)
 stat_handler = get_stats_client(__name__)
 
+# Limits of the LIMIT_SIZE of iterative statements while adaptive iterations are enabled, see
+# `GraphStatement._run_iterative()`.
+ADAPTIVE_ITERATION_MIN_SIZE = 10
+ADAPTIVE_ITERATION_MAX_SIZE = 100000
+ADAPTIVE_ITERATION_TARGET_SECONDS = 2.0
+# Neo4j holds the state of a transaction in memory until it commits, and that state grows with the number of nodes,
+# relationships and properties that the transaction changes. So the memory budget of an iteration is expressed as a
+# maximum number of such updates, which keeps nodes with many relationships from blowing up a DETACH DELETE.
+ADAPTIVE_ITERATION_MAX_UPDATES = 200000
+
+# Global _adaptive_iterations
+# Will be set by cartography.sync.Sync.run() from the config for the duration of a sync.
+_adaptive_iterations = False
+
+
+def set_adaptive_iterations(enabled: bool) -> None:
+    """
+    Enables or disables sizing the LIMIT_SIZE of iterative statements adaptively, see `GraphStatement._run_iterative()`.
+    """
+    global _adaptive_iterations
+    _adaptive_iterations = enabled
+
+
+# Global _server_side_iterations
+# Will be set by cartography.sync.Sync.run() from the config for the duration of a sync.
+_server_side_iterations = False
+
+# Global _server_supports_call_in_transactions
+# Whether the Neo4j server supports `CALL { } IN TRANSACTIONS`. Detected on first use after
+# set_server_side_iterations().
+_server_supports_call_in_transactions: Optional[bool] = None
+
+# Matches iterative statements that delete what they match in batches of $LIMIT_SIZE, e.g.
+#   MATCH (n:EC2Instance) WHERE n.lastupdated <> $UPDATE_TAG WITH n LIMIT $LIMIT_SIZE DETACH DELETE (n)
+# optionally followed by `RETURN COUNT(*) AS TotalCompleted`.
+_ITERATIVE_DELETE_PATTERN = re.compile(
+    r'^(?P<match>.*?)\bWITH\s+(?:DISTINCT\s+)?(?P<var>\w+)\s+LIMIT\s+\$LIMIT_SIZE\s+'
+    r'(?P<delete>(?:DETACH\s+)?DELETE)\s+(?:\(\s*(?P=var)\s*\)|(?P=var))\s*'
+    r'(?:RETURN\s+COUNT\(\s*\*\s*\)\s+AS\s+\w+\s*)?;?\s*$',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# `CALL { } IN TRANSACTIONS` was added in Neo4j 4.4.
+_CALL_IN_TRANSACTIONS_MIN_VERSION = (4, 4)
+
+
+def set_server_side_iterations(enabled: bool) -> None:
+    """
+    Enables or disables running iterative delete statements as a single `CALL { } IN TRANSACTIONS` query on servers
+    that support it, see `GraphStatement._run_server_side()`.
+    """
+    global _server_side_iterations, _server_supports_call_in_transactions
+    _server_side_iterations = enabled
+    _server_supports_call_in_transactions = None
+
+
+def rewrite_as_server_side_batches(query: str, batch_size: int) -> Optional[str]:
+    """
+    Rewrites an iterative statement of the form `... WITH n LIMIT $LIMIT_SIZE [DETACH] DELETE n` into a single query
+    that deletes everything it matches in transactions of `batch_size` rows on the server:
+    `... WITH DISTINCT n CALL { WITH n [DETACH] DELETE n } IN TRANSACTIONS OF <batch_size> ROWS`.
+    :return: The rewritten query, or None if the statement does not have that form.
+    """
+    match = _ITERATIVE_DELETE_PATTERN.match(query.strip())
+    if not match or batch_size < 1:
+        return None
+    var = match.group('var')
+    delete = ' '.join(match.group('delete').upper().split())
+    # DISTINCT because unlike LIMIT batches, an inner transaction cannot skip what an earlier one already deleted.
+    return (
+        f"{match.group('match').rstrip()}\n"
+        f"WITH DISTINCT {var}\n"
+        f"CALL {{ WITH {var} {delete} {var} }} IN TRANSACTIONS OF {int(batch_size)} ROWS"
+    )
+
+
+# Global _cleanup_precheck
+# Will be set by cartography.sync.Sync.run() from the config for the duration of a sync.
+_cleanup_precheck = False
+
+# Global _precheck_counts
+# The number of statements with a `precheck_query` that were `skipped` because it counted nothing, or `run`, per job.
+_precheck_counts: Dict[str, Dict[str, int]] = {}
+_precheck_counts_lock = threading.Lock()
+
+
+def set_cleanup_precheck(enabled: bool) -> None:
+    """
+    Enables or disables running the `precheck_query` of statements before them, see `GraphStatement._is_clean()`.
+    """
+    global _cleanup_precheck
+    _cleanup_precheck = enabled
+
+
+def get_precheck_counts() -> Dict[str, Dict[str, int]]:
+    """
+    Returns the number of statements that were `skipped` because their `precheck_query` counted nothing and the number
+    that were `run` anyway, keyed by the name of their job.
+    """
+    with _precheck_counts_lock:
+        return {key: dict(counts) for key, counts in _precheck_counts.items()}
+
+
+def reset_precheck_counts() -> None:
+    """
+    Clears the counters returned by `get_precheck_counts()`. Called at the start of every sync.
+    """
+    with _precheck_counts_lock:
+        _precheck_counts.clear()
+
+
+def merge_precheck_counts(precheck_counts: Dict[str, Dict[str, int]]) -> None:
+    """
+    Adds counters returned by `get_precheck_counts()` in another process, like an AWS account worker process, to the
+    counters of this process. They are not sent to statsd again.
+    """
+    with _precheck_counts_lock:
+        for key, counts in precheck_counts.items():
+            merged = _precheck_counts.setdefault(key, {'skipped': 0, 'run': 0})
+            for outcome, count in counts.items():
+                merged[outcome] = merged.get(outcome, 0) + count
+
+
+def _record_precheck(key: str, skipped: bool) -> None:
+    outcome = 'skipped' if skipped else 'run'
+    with _precheck_counts_lock:
+        counts = _precheck_counts.setdefault(key, {'skipped': 0, 'run': 0})
+        counts[outcome] += 1
+    stat_handler.incr(f'{key}.precheck.{outcome}')
+
+
+def _parse_version(version: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in re.findall(r'\d+', version)[:2])
+
+
+def _supports_call_in_transactions(session: neo4j.Session) -> bool:
+    global _server_supports_call_in_transactions
+    if _server_supports_call_in_transactions is None:
+        record = session.run(
+            "CALL dbms.components() YIELD name, versions WHERE name = 'Neo4j Kernel' RETURN versions[0] AS version",
+        ).single()
+        version = _parse_version(record['version']) if record else ()
+        _server_supports_call_in_transactions = version >= _CALL_IN_TRANSACTIONS_MIN_VERSION
+        if not _server_supports_call_in_transactions:
+            logger.info("Neo4j does not support CALL { } IN TRANSACTIONS, running iterative statements in a loop.")
+    return _server_supports_call_in_transactions
+
+
+def _count_updates(counters: neo4j.SummaryCounters) -> int:
+    return (
+        counters.nodes_created + counters.nodes_deleted + counters.relationships_created
+        + counters.relationships_deleted + counters.properties_set + counters.labels_added + counters.labels_removed
+    )
+
 
 class GraphStatementJSONEncoder(json.JSONEncoder):
     """
@@ -48,6 +209,7 @@ class GraphStatement:
             iterationsize: int = 0,
             parent_job_name: Optional[str] = None,
             parent_job_sequence_num: Optional[int] = None,
+            precheck_query: Optional[str] = None,
     ):
         self.query = query
         self.parameters = parameters or {}
@@ -57,6 +219,13 @@ class GraphStatement:
 
         self.parent_job_name = parent_job_name if parent_job_name else None
         self.parent_job_sequence_num = parent_job_sequence_num if parent_job_sequence_num else None
+        # A read query that returns the number of records the statement would update as `count`. See _is_clean().
+        self.precheck_query = precheck_query
+
+        # Totals of the last run of an iterative statement.
+        self.iterations = 0
+        self.nodes_deleted = 0
+        self.relationships_deleted = 0
 
     def merge_parameters(self, parameters: Dict) -> None:
         """
@@ -70,11 +239,22 @@ class GraphStatement:
         """
         Run the statement. This will execute the query against the graph.
         """
+        if self._is_clean(session):
+            logger.info(
+                f"Skipped {self.parent_job_name} statement #{self.parent_job_sequence_num} because its precheck found "
+                f"nothing to update",
+            )
+            return
         if self.iterative:
-            self._run_iterative(session)
+            if not self._run_server_side(session):
+                self._run_iterative(session)
+            logger.info(
+                f"Completed {self.parent_job_name} statement #{self.parent_job_sequence_num} in {self.iterations} "
+                f"iterations, deleting {self.nodes_deleted} nodes and {self.relationships_deleted} relationships",
+            )
         else:
             session.write_transaction(self._run_noniterative).consume()
-        logger.info(f"Completed {self.parent_job_name} statement #{self.parent_job_sequence_num}")
+            logger.info(f"Completed {self.parent_job_name} statement #{self.parent_job_sequence_num}")
 
     def as_dict(self) -> Dict[str, Any]:
         """
@@ -109,23 +289,121 @@ class GraphStatement:
 
         return result
 
+    def _is_clean(self, session: neo4j.Session) -> bool:
+        """
+        If cleanup prechecks are enabled with `set_cleanup_precheck()` and the statement has a `precheck_query`, runs it
+        to check whether the statement would update anything. In a steady state most cleanups have nothing to
+        delete, and finding that out in one read transaction is cheaper than running the statement in write
+        transactions. The outcome is
+        counted per job in `get_precheck_counts()` and sent to statsd.
+        If the precheck fails, the statement is run as usual.
+        :return: True if the statement has nothing to update and can be skipped.
+        """
+        if not _cleanup_precheck or not self.precheck_query:
+            return False
+        try:
+            count = session.read_transaction(read_single_value_tx, self.precheck_query, **self.parameters)
+        except neo4j.exceptions.ClientError as e:
+            logger.warning(
+                "Precheck of %s statement #%s failed, running the statement: %s",
+                self.parent_job_name, self.parent_job_sequence_num, e,
+            )
+            return False
+        skipped = count == 0
+        _record_precheck(self.parent_job_name or 'unnamed_job', skipped)
+        return skipped
+
+    def _run_server_side(self, session: neo4j.Session) -> bool:
+        """
+        If server-side iterations are enabled with `set_server_side_iterations()`, the server supports them, and the
+        statement can be rewritten by `rewrite_as_server_side_batches()`, runs the statement as a single auto-commit
+        query that deletes in transactions of `iterationsize` rows. This saves a round trip and a query execution per
+        batch. `CALL { } IN TRANSACTIONS` cannot run inside a managed transaction, so it is not retried by the driver.
+        :return: True if the statement was run, False if it has to be run with `_run_iterative()` instead.
+        """
+        if not _server_side_iterations:
+            return False
+        query = rewrite_as_server_side_batches(self.query, self.iterationsize)
+        if query is None or not _supports_call_in_transactions(session):
+            return False
+        parameters = {key: value for key, value in self.parameters.items() if key != "LIMIT_SIZE"}
+        counters = session.run(query, parameters).consume().counters
+        self.iterations = 1
+        self.nodes_deleted = counters.nodes_deleted
+        self.relationships_deleted = counters.relationships_deleted
+        stat_handler.incr('nodes_deleted', counters.nodes_deleted)
+        stat_handler.incr('relationships_deleted', counters.relationships_deleted)
+        self._send_iteration_stats()
+        return True
+
+    def _send_iteration_stats(self) -> None:
+        if self.parent_job_name:
+            stat_prefix = f'{self.parent_job_name}.{self.parent_job_sequence_num}'
+            stat_handler.incr(f'{stat_prefix}.iterations', self.iterations)
+            stat_handler.incr(f'{stat_prefix}.nodes_deleted', self.nodes_deleted)
+            stat_handler.incr(f'{stat_prefix}.relationships_deleted', self.relationships_deleted)
+
     def _run_iterative(self, session: neo4j.Session) -> None:
         """
         Iterative statement execution.
 
         Expects the query to return the total number of records updated.
+
+        If adaptive iterations are enabled with `set_adaptive_iterations()`, LIMIT_SIZE starts at `iterationsize` and
+        is scaled after every transaction towards the number of records that can be processed in
+        ADAPTIVE_ITERATION_TARGET_SECONDS, like the batches of `cartography.client.core.tx.load_graph_data()`. It is
+        also capped so that a transaction changes at most ADAPTIVE_ITERATION_MAX_UPDATES entities, and halved when a
+        transaction runs out of memory.
+
+        The number of iterations and the number of deleted nodes and relationships are kept in `iterations`,
+        `nodes_deleted` and `relationships_deleted`, and sent to statsd per job statement.
         """
         self.parameters["LIMIT_SIZE"] = self.iterationsize
+        sizer: Optional[AdaptiveBatchSizer] = None
+        if _adaptive_iterations:
+            sizer = AdaptiveBatchSizer(
+                initial_size=self.iterationsize,
+                min_size=ADAPTIVE_ITERATION_MIN_SIZE,
+                max_size=ADAPTIVE_ITERATION_MAX_SIZE,
+                target_seconds=ADAPTIVE_ITERATION_TARGET_SECONDS,
+            )
+        self.iterations = 0
+        self.nodes_deleted = 0
+        self.relationships_deleted = 0
 
         while True:
-            result: neo4j.Result = session.write_transaction(self._run_noniterative)
+            if sizer:
+                self.parameters["LIMIT_SIZE"] = sizer.size
+            start = time.monotonic()
+            try:
+                result: neo4j.Result = session.write_transaction(self._run_noniterative)
+            except neo4j.exceptions.Neo4jError as e:
+                if sizer is None or not _is_memory_error(e) or sizer.size <= sizer.min_size:
+                    raise
+                sizer.size = max(sizer.size // 2, sizer.min_size)
+                logger.warning(
+                    "%s statement #%s ran out of memory, retrying with LIMIT_SIZE %d.",
+                    self.parent_job_name, self.parent_job_sequence_num, sizer.size,
+                )
+                continue
+            seconds = time.monotonic() - start
+            counters = result.consume().counters
+            self.iterations += 1
+            self.nodes_deleted += counters.nodes_deleted
+            self.relationships_deleted += counters.relationships_deleted
 
             # Exit if we have finished processing all items
-            if not result.consume().counters.contains_updates:
-                # Ensure network buffers are cleared
-                result.consume()
+            if not counters.contains_updates:
                 break
-            result.consume()
+            if sizer:
+                limit_size = self.parameters["LIMIT_SIZE"]
+                sizer.record(limit_size, seconds)
+                updates = _count_updates(counters)
+                if updates > ADAPTIVE_ITERATION_MAX_UPDATES:
+                    budget_size = int(limit_size * ADAPTIVE_ITERATION_MAX_UPDATES / updates)
+                    sizer.size = max(min(sizer.size, budget_size), sizer.min_size)
+
+        self._send_iteration_stats()
 
     @classmethod
     def create_from_json(
@@ -1,25 +1,73 @@
+import argparse
 import datetime
 import logging
+import multiprocessing
+import threading
 import traceback
+from concurrent.futures import as_completed
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Any
+from typing import cast
 from typing import Dict
 from typing import Iterable
 from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
 
 import boto3
 import botocore.exceptions
 import neo4j
+from statsd import StatsClient
 
 from . import ec2
+from . import iam
 from . import organizations
+from .resources import RESOURCE_DEPENDENCIES
 from .resources import RESOURCE_FUNCTIONS
+from cartography.client.core.session import build_neo4j_driver
+from cartography.client.core.session import get_session_factory
+from cartography.client.core.session import Neo4jSessionFactory
+from cartography.client.core.session import set_session_factory
+from cartography.client.core.tx import get_bad_rows
+from cartography.client.core.tx import get_change_counts
+from cartography.client.core.tx import get_shared_node_lock
+from cartography.client.core.tx import merge_bad_rows
+from cartography.client.core.tx import merge_change_counts
+from cartography.client.core.tx import reset_bad_rows
+from cartography.client.core.tx import reset_change_counts
+from cartography.client.core.tx import set_change_detection
+from cartography.client.core.tx import set_max_load_writers
+from cartography.client.core.tx import set_shared_node_lock
+from cartography.client.core.tx import set_two_phase_ingestion
 from cartography.config import Config
+from cartography.graph.bulkimport import get_bulk_import_exporter
+from cartography.graph.job import set_max_concurrent_jobs
+from cartography.graph.statement import get_precheck_counts
+from cartography.graph.statement import merge_precheck_counts
+from cartography.graph.statement import reset_precheck_counts
+from cartography.graph.statement import set_adaptive_iterations
+from cartography.graph.statement import set_cleanup_precheck
+from cartography.graph.statement import set_server_side_iterations
 from cartography.intel.aws.util.common import parse_and_validate_aws_requested_syncs
 from cartography.stats import get_stats_client
+from cartography.stats import set_stats_client
+from cartography.util import CachedBoto3Session
+from cartography.util import DEFAULT_MAX_IN_FLIGHT_CALLS
+from cartography.util import get_aws_throttle_counts
+from cartography.util import get_bounded_executor
+from cartography.util import get_cached_boto3_session
+from cartography.util import get_dependency_order
 from cartography.util import merge_module_sync_metadata
+from cartography.util import reset_aws_rate_limiters
 from cartography.util import run_analysis_and_ensure_deps
 from cartography.util import run_analysis_job
 from cartography.util import run_cleanup_job
+from cartography.util import run_with_dependencies
 from cartography.util import timeit
 
 
@@ -33,7 +81,8 @@ def _build_aws_sync_kwargs(
 ) -> Dict[str, Any]:
     return {
         'neo4j_session': neo4j_session,
-        'boto3_session': boto3_session,
+        # Share one client cache across all syncs of the account instead of building new clients on every get call.
+        'boto3_session': get_cached_boto3_session(boto3_session, current_aws_account_id),
         'regions': regions,
         'current_aws_account_id': current_aws_account_id,
         'update_tag': sync_tag,
@@ -49,31 +98,63 @@ def _sync_one_account(
     common_job_parameters: Dict[str, Any],
     regions: List[str] = [],
     aws_requested_syncs: Iterable[str] = RESOURCE_FUNCTIONS.keys(),
+    max_workers: int = 1,
 ) -> None:
+    """
+    Syncs the requested resources of one AWS account. Syncs run in an order that respects RESOURCE_DEPENDENCIES. If
+    max_workers is greater than 1, syncs whose dependencies have finished run concurrently, each on its own Neo4j
+    session.
+    """
+    for func_name in aws_requested_syncs:
+        if func_name not in RESOURCE_FUNCTIONS:
+            raise ValueError(f'AWS sync function "{func_name}" was specified but does not exist. Did you misspell it?')
+
+    boto3_session = get_cached_boto3_session(boto3_session, current_aws_account_id)
     if not regions:
         regions = _autodiscover_account_regions(boto3_session, current_aws_account_id)
 
-    sync_args = _build_aws_sync_kwargs(
-        neo4j_session, boto3_session, regions, current_aws_account_id, update_tag, common_job_parameters,
-    )
-
-    for func_name in aws_requested_syncs:
-        if func_name in RESOURCE_FUNCTIONS:
-            # Skip permission relationships and tags for now because they rely on data already being in the graph
-            if func_name not in ['permission_relationships', 'resourcegroupstaggingapi']:
-                RESOURCE_FUNCTIONS[func_name](**sync_args)
-            else:
-                continue
-        else:
-            raise ValueError(f'AWS sync function "{func_name}" was specified but does not exist. Did you misspell it?')
+    session_factory = get_session_factory()
+    if max_workers > 1 and session_factory is None:
+        logger.warning(
+            "AWS resource concurrency was requested but no Neo4j driver is registered to open worker sessions from, "
+            "so AWS resources will be synced one at a time.",
+        )
+        max_workers = 1
+
+    if max_workers > 1 and session_factory is not None:
+        worker_session_factory: Neo4jSessionFactory = session_factory
+
+        def run_resource_sync(func_name: str) -> None:
+            with worker_session_factory.new_session() as worker_session:
+                RESOURCE_FUNCTIONS[func_name](
+                    **_build_aws_sync_kwargs(
+                        worker_session, boto3_session, regions, current_aws_account_id, update_tag,
+                        common_job_parameters,
+                    ),
+                )
 
-    # MAP IAM permissions
-    if 'permission_relationships' in aws_requested_syncs:
-        RESOURCE_FUNCTIONS['permission_relationships'](**sync_args)
+        run_with_dependencies(
+            {func_name: partial(run_resource_sync, func_name) for func_name in aws_requested_syncs},
+            RESOURCE_DEPENDENCIES,
+            max_workers,
+            thread_name_prefix=f'cartography-aws-{current_aws_account_id}',
+        )
+    else:
+        sync_args = _build_aws_sync_kwargs(
+            neo4j_session, boto3_session, regions, current_aws_account_id, update_tag, common_job_parameters,
+        )
+        for func_name in get_dependency_order(aws_requested_syncs, RESOURCE_DEPENDENCIES):
+            RESOURCE_FUNCTIONS[func_name](**sync_args)
 
-    # AWS Tags - Must always be last.
-    if 'resourcegroupstaggingapi' in aws_requested_syncs:
-        RESOURCE_FUNCTIONS['resourcegroupstaggingapi'](**sync_args)
+    client_cache = cast(CachedBoto3Session, boto3_session)
+    logger.info(
+        "boto3 client cache for account %s: %d hits, %d misses.",
+        current_aws_account_id, client_cache.hits, client_cache.misses,
+    )
+    throttle_counts = get_aws_throttle_counts(current_aws_account_id)
+    if throttle_counts:
+        logger.info("AWS calls throttled for account %s: %s", current_aws_account_id, throttle_counts)
+    reset_aws_rate_limiters(current_aws_account_id)
 
     run_analysis_job(
         'aws_ec2_iaminstanceprofile.json',
@@ -138,6 +219,208 @@ def _autodiscover_accounts(
         logger.warning(f"The current account ({account_id}) doesn't have enough permissions to perform autodiscovery.")
 
 
+def _get_account_boto3_session(profile_name: str, num_accounts: int) -> boto3.session.Session:
+    if num_accounts == 1:
+        # Use the default boto3 session because boto3 gets confused if you give it a profile name with 1 account
+        return boto3.Session()
+    return boto3.Session(profile_name=profile_name)
+
+
+def _format_account_exception(account_id: str, e: BaseException) -> str:
+    timestamp = datetime.datetime.now()
+    exception_traceback = traceback.TracebackException.from_exception(e)
+    traceback_string = ''.join(exception_traceback.format())
+    return f'{timestamp} - Exception for account ID: {account_id}\n{traceback_string}'
+
+
+# The change detection counts, bad rows and precheck counts that an AWS account recorded in a worker process.
+_WorkerReport = Tuple[Dict[str, Dict[str, int]], Dict[str, List[Dict[str, Any]]], Dict[str, Dict[str, int]]]
+
+
+def _merge_worker_report(report: Optional[_WorkerReport]) -> None:
+    if report is None:
+        return
+    change_counts, bad_rows, precheck_counts = report
+    merge_change_counts(change_counts)
+    merge_bad_rows(bad_rows)
+    merge_precheck_counts(precheck_counts)
+
+
+def _sync_account_in_worker(
+    neo4j_session: Optional[neo4j.Session],
+    profile_name: str,
+    account_id: str,
+    num_accounts: int,
+    sync_tag: int,
+    common_job_parameters: Dict[str, Any],
+    aws_requested_syncs: List[str],
+    config: Optional[Union[Config, argparse.Namespace]] = None,
+) -> Optional[_WorkerReport]:
+    """
+    Syncs one AWS account on a worker of the account pool with its own boto3 session and its own Neo4j session.
+    In thread mode `neo4j_session` is a session opened for this worker from the shared driver. In process mode it is
+    None and a new driver is created from `config` inside the worker process, because drivers cannot be shared across
+    processes.
+    :return: In process mode, the change detection counts, bad rows and precheck counts that the account's sync
+    recorded in the worker process, for the caller to merge into its own with `_merge_worker_report()`. If the account
+    fails, they are lost. In thread mode None, since they are recorded in the caller's process directly.
+    """
+    logger.info("Syncing AWS account with ID '%s' using configured profile '%s'.", account_id, profile_name)
+    boto3_session = _get_account_boto3_session(profile_name, num_accounts)
+    resource_concurrency = getattr(config, 'aws_resource_concurrency', None) or 1
+    if neo4j_session is not None:
+        _sync_one_account(
+            neo4j_session,
+            boto3_session,
+            account_id,
+            sync_tag,
+            common_job_parameters,
+            aws_requested_syncs=aws_requested_syncs,
+            max_workers=resource_concurrency,
+        )
+        return None
+
+    if not config:
+        raise ValueError('Syncing AWS accounts in worker processes requires the cartography config.')
+    if config.statsd_enabled:
+        set_stats_client(StatsClient(host=config.statsd_host, port=config.statsd_port, prefix=config.statsd_prefix))
+    neo4j_driver = build_neo4j_driver(
+        config.neo4j_uri,
+        config.neo4j_user,
+        config.neo4j_password,
+        config.neo4j_max_connection_lifetime,
+    )
+    # Register the worker process's own driver so that resource syncs within the account can open sessions from it.
+    set_session_factory(Neo4jSessionFactory(neo4j_driver, config.neo4j_database))
+    set_max_load_writers(getattr(config, 'max_load_writers', None) or 1)
+    set_change_detection(bool(getattr(config, 'change_detection', False)))
+    set_two_phase_ingestion(bool(getattr(config, 'two_phase_ingestion', False)))
+    set_adaptive_iterations(bool(getattr(config, 'adaptive_iterations', False)))
+    set_server_side_iterations(bool(getattr(config, 'server_side_iterations', False)))
+    set_cleanup_precheck(bool(getattr(config, 'cleanup_precheck', False)))
+    set_max_concurrent_jobs(getattr(config, 'max_concurrent_jobs', None) or 1)
+    get_bounded_executor().set_default_max_in_flight(
+        getattr(config, 'aws_max_in_flight_calls', None) or DEFAULT_MAX_IN_FLIGHT_CALLS,
+    )
+    # Worker processes are reused across accounts, so only report what this account recorded.
+    reset_change_counts()
+    reset_bad_rows()
+    reset_precheck_counts()
+    try:
+        with neo4j_driver.session(database=config.neo4j_database) as worker_session:
+            _sync_one_account(
+                worker_session,
+                boto3_session,
+                account_id,
+                sync_tag,
+                common_job_parameters,
+                aws_requested_syncs=aws_requested_syncs,
+                max_workers=resource_concurrency,
+            )
+        return get_change_counts(), get_bad_rows(), get_precheck_counts()
+    finally:
+        set_session_factory(None)
+        set_max_load_writers(1)
+        set_change_detection(False)
+        set_two_phase_ingestion(False)
+        set_adaptive_iterations(False)
+        set_server_side_iterations(False)
+        set_cleanup_precheck(False)
+        set_max_concurrent_jobs(1)
+        get_bounded_executor().set_default_max_in_flight(DEFAULT_MAX_IN_FLIGHT_CALLS)
+        neo4j_driver.close()
+
+
+def _sync_accounts_concurrently(
+    neo4j_session: neo4j.Session,
+    accounts: Dict[str, str],
+    sync_tag: int,
+    common_job_parameters: Dict[str, Any],
+    aws_best_effort_mode: bool,
+    aws_requested_syncs: List[str],
+    max_workers: int,
+    worker_mode: str,
+    config: Optional[Union[Config, argparse.Namespace]],
+) -> Tuple[List[str], List[str]]:
+    """
+    Syncs the given accounts on a pool of `max_workers` threads or processes, see `_sync_account_in_worker()`.
+    Within each account, resources sync in the same order as in the sequential path. Nodes that accounts share, like
+    the AWSAccount of a trusted account, are written under a lock shared by the workers, see
+    `cartography.client.core.tx.shared_node_writes()`.
+    :return: A tuple of (failed account ids, formatted exception tracebacks). Without aws_best_effort_mode, the first
+    failure stops new accounts from being started and is re-raised once the running accounts have finished.
+    """
+    num_accounts = len(accounts)
+    # Autodiscovery MERGEs AWSAccount nodes shared between accounts, so we run it up front instead of concurrently.
+    for profile_name, account_id in accounts.items():
+        common_job_parameters["AWS_ID"] = account_id
+        boto3_session = _get_account_boto3_session(profile_name, num_accounts)
+        _autodiscover_accounts(neo4j_session, boto3_session, account_id, sync_tag, common_job_parameters)
+    common_job_parameters.pop("AWS_ID", None)
+
+    session_factory = get_session_factory()
+    failed_account_ids: List[str] = []
+    exception_tracebacks: List[str] = []
+    # Reuse the lock of concurrent stages, if any, so that other stages' writes of shared nodes are serialized with the
+    # accounts' writes too.
+    stage_shared_node_lock = get_shared_node_lock()
+    pool: Executor
+    if worker_mode == 'process':
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=set_shared_node_lock,
+            initargs=(stage_shared_node_lock or multiprocessing.RLock(),),
+        )
+    else:
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cartography-aws-account')
+        set_shared_node_lock(stage_shared_node_lock or threading.RLock())
+
+    def sync_account_on_thread(profile_name: str, account_id: str, account_job_parameters: Dict[str, Any]) -> None:
+        with session_factory.new_session() as worker_session:  # type: ignore
+            _sync_account_in_worker(
+                worker_session, profile_name, account_id, num_accounts, sync_tag, account_job_parameters,
+                aws_requested_syncs, config,
+            )
+
+    try:
+        with pool:
+            futures: Dict[Future, str] = {}
+            for profile_name, account_id in accounts.items():
+                # Each worker gets its own copy of the job parameters since they are scoped to a single account.
+                account_job_parameters = {**common_job_parameters, "AWS_ID": account_id}
+                if worker_mode == 'process':
+                    future = pool.submit(
+                        _sync_account_in_worker,
+                        None, profile_name, account_id, num_accounts, sync_tag, account_job_parameters,
+                        aws_requested_syncs, config,
+                    )
+                else:
+                    future = pool.submit(sync_account_on_thread, profile_name, account_id, account_job_parameters)
+                futures[future] = account_id
+
+            for future in as_completed(futures):
+                account_id = futures[future]
+                e = future.exception()
+                if e is None:
+                    _merge_worker_report(future.result())
+                    continue
+                if not aws_best_effort_mode:
+                    for other in futures:
+                        other.cancel()
+                    raise e
+                failed_account_ids.append(account_id)
+                exception_tracebacks.append(_format_account_exception(account_id, e))
+                logger.warning(
+                    f"Caught exception syncing account {account_id}. aws-best-effort-mode is on so we are continuing "
+                    f"on to the other AWS accounts. All exceptions will be aggregated and re-logged at the end of the "
+                    f"sync.",
+                    exc_info=e,
+                )
+    finally:
+        set_shared_node_lock(stage_shared_node_lock)
+    return failed_account_ids, exception_tracebacks
+
+
 def _sync_multiple_accounts(
     neo4j_session: neo4j.Session,
     accounts: Dict[str, str],
@@ -145,23 +428,53 @@ def _sync_multiple_accounts(
     common_job_parameters: Dict[str, Any],
     aws_best_effort_mode: bool,
     aws_requested_syncs: List[str] = [],
+    config: Optional[Union[Config, argparse.Namespace]] = None,
 ) -> bool:
     logger.info("Syncing AWS accounts: %s", ', '.join(accounts.values()))
+    # Organizations MERGEs the root principal of each account, so principals written by earlier versions need their
+    # ids first.
+    iam.migrate_principal_ids(neo4j_session)
     organizations.sync(neo4j_session, accounts, sync_tag, common_job_parameters)
 
-    failed_account_ids = []
-    exception_tracebacks = []
+    failed_account_ids: List[str] = []
+    exception_tracebacks: List[str] = []
 
     num_accounts = len(accounts)
+    max_workers = min(getattr(config, 'aws_account_concurrency', None) or 1, num_accounts)
+    worker_mode = getattr(config, 'aws_account_worker_mode', None) or 'thread'
+    if max_workers > 1 and worker_mode == 'thread' and get_session_factory() is None:
+        logger.warning(
+            "AWS account concurrency was requested but no Neo4j driver is registered to open worker sessions from, "
+            "so AWS accounts will be synced one at a time.",
+        )
+        max_workers = 1
+    if max_workers > 1 and worker_mode == 'process' and get_bulk_import_exporter() is not None:
+        logger.warning(
+            "AWS accounts cannot be synced in worker processes while exporting to bulk import CSV files, because the "
+            "exported data is collected in this process. Using worker threads instead.",
+        )
+        worker_mode = 'thread'
+
+    if max_workers > 1:
+        logger.info("Syncing %d AWS accounts on %d worker %ss.", num_accounts, max_workers, worker_mode)
+        failed_account_ids, exception_tracebacks = _sync_accounts_concurrently(
+            neo4j_session,
+            accounts,
+            sync_tag,
+            common_job_parameters,
+            aws_best_effort_mode,
+            aws_requested_syncs,
+            max_workers,
+            worker_mode,
+            config,
+        )
+        # All accounts have been handled by the worker pool, so skip the sequential loop below.
+        accounts = {}
 
     for profile_name, account_id in accounts.items():
         logger.info("Syncing AWS account with ID '%s' using configured profile '%s'.", account_id, profile_name)
         common_job_parameters["AWS_ID"] = account_id
-        if num_accounts == 1:
-            # Use the default boto3 session because boto3 gets confused if you give it a profile name with 1 account
-            boto3_session = boto3.Session()
-        else:
-            boto3_session = boto3.Session(profile_name=profile_name)
+        boto3_session = _get_account_boto3_session(profile_name, num_accounts)
 
         _autodiscover_accounts(neo4j_session, boto3_session, account_id, sync_tag, common_job_parameters)
 
@@ -173,14 +486,12 @@ def _sync_multiple_accounts(
                 sync_tag,
                 common_job_parameters,
                 aws_requested_syncs=aws_requested_syncs,  # Could be replaced later with per-account requested syncs
+                max_workers=getattr(config, 'aws_resource_concurrency', None) or 1,
             )
         except Exception as e:
             if aws_best_effort_mode:
-                timestamp = datetime.datetime.now()
                 failed_account_ids.append(account_id)
-                exception_traceback = traceback.TracebackException.from_exception(e)
-                traceback_string = ''.join(exception_traceback.format())
-                exception_tracebacks.append(f'{timestamp} - Exception for account ID: {account_id}\n{traceback_string}')
+                exception_tracebacks.append(_format_account_exception(account_id, e))
                 logger.warning(
                     f"Caught exception syncing account {account_id}. aws-best-effort-mode is on so we are continuing "
                     f"on to the next AWS account. All exceptions will be aggregated and re-logged at the end of the "
@@ -195,7 +506,7 @@ def _sync_multiple_accounts(
         logger.error(f'AWS sync failed for accounts {failed_account_ids}')
         raise Exception('\n'.join(exception_tracebacks))
 
-    del common_job_parameters["AWS_ID"]
+    common_job_parameters.pop("AWS_ID", None)
 
     # There may be orphan Principals which point outside of known AWS accounts. This job cleans
     # up those nodes after all AWS accounts have been synced.
@@ -302,6 +613,7 @@ def start_aws_ingestion(neo4j_session: neo4j.Session, config: Config) -> None:
         common_job_parameters,
         config.aws_best_effort_mode,
         requested_syncs,
+        config,
     )
 
     if sync_successful:
@@ -12,6 +12,7 @@ from cartography.intel.aws.ec2.util import get_botocore_config
 from cartography.models.aws.dynamodb.gsi import DynamoDBGSISchema
 from cartography.models.aws.dynamodb.tables import DynamoDBTableSchema
 from cartography.stats import get_stats_client
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import merge_module_sync_metadata
 from cartography.util import timeit
@@ -102,9 +103,8 @@ def sync_dynamodb_tables(
     neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str], current_aws_account_id: str,
     aws_update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, dynamodb_tables in aws_fan_out_regions(get_dynamodb_tables, boto3_session, regions):
         logger.info("Syncing DynamoDB for region in '%s' in account '%s'.", region, current_aws_account_id)
-        dynamodb_tables = get_dynamodb_tables(boto3_session, region)
         ddb_table_data, ddb_gsi_data = transform_dynamodb_tables(dynamodb_tables, region)
         load_dynamodb_tables(neo4j_session, ddb_table_data, region, current_aws_account_id, aws_update_tag)
         load_dynamodb_gsi(neo4j_session, ddb_gsi_data, region, current_aws_account_id, aws_update_tag)
@@ -7,6 +7,7 @@ import neo4j
 from botocore.exceptions import ClientError
 
 from .util import get_botocore_config
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
@@ -93,8 +94,7 @@ def sync_elastic_ip_addresses(
     neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str],
     current_aws_account_id: str, update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, addresses in aws_fan_out_regions(get_elastic_ip_addresses, boto3_session, regions):
         logger.info(f"Syncing Elastic IP Addresses for region {region} in account {current_aws_account_id}.")
-        addresses = get_elastic_ip_addresses(boto3_session, region)
         load_elastic_ip_addresses(neo4j_session, addresses, region, current_aws_account_id, update_tag)
     cleanup_elastic_ip_addresses(neo4j_session, common_job_parameters)
@@ -18,7 +18,9 @@ from cartography.models.aws.ec2.reservations import EC2ReservationSchema
 from cartography.models.aws.ec2.securitygroup_instance import EC2SecurityGroupInstanceSchema
 from cartography.models.aws.ec2.subnet_instance import EC2SubnetInstanceSchema
 from cartography.models.aws.ec2.volumes import EBSVolumeInstanceSchema
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
+from cartography.util import run_graph_jobs
 from cartography.util import timeit
 
 logger = logging.getLogger(__name__)
@@ -306,8 +308,13 @@ def load_ec2_instance_data(
 @timeit
 def cleanup(neo4j_session: neo4j.Session, common_job_parameters: Dict[str, Any]) -> None:
     logger.debug("Running EC2 instance cleanup")
-    GraphJob.from_node_schema(EC2ReservationSchema(), common_job_parameters).run(neo4j_session)
-    GraphJob.from_node_schema(EC2InstanceSchema(), common_job_parameters).run(neo4j_session)
+    run_graph_jobs(
+        neo4j_session,
+        [
+            GraphJob.from_node_schema(EC2ReservationSchema(), common_job_parameters),
+            GraphJob.from_node_schema(EC2InstanceSchema(), common_job_parameters),
+        ],
+    )
 
 
 @timeit
@@ -319,9 +326,8 @@ def sync_ec2_instances(
         update_tag: int,
         common_job_parameters: Dict[str, Any],
 ) -> None:
-    for region in regions:
+    for region, reservations in aws_fan_out_regions(get_ec2_instances, boto3_session, regions):
         logger.info("Syncing EC2 instances for region '%s' in account '%s'.", region, current_aws_account_id)
-        reservations = get_ec2_instances(boto3_session, region)
         ec2_data = transform_ec2_instances(reservations, region, current_aws_account_id)
         load_ec2_instance_data(
             neo4j_session,
@@ -6,6 +6,7 @@ import boto3
 import neo4j
 
 from .util import get_botocore_config
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
@@ -72,9 +73,8 @@ def sync_internet_gateways(
     neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str], current_aws_account_id: str,
     update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, internet_gateways in aws_fan_out_regions(get_internet_gateways, boto3_session, regions):
         logger.info("Syncing Internet Gateways for region '%s' in account '%s'.", region, current_aws_account_id)
-        internet_gateways = get_internet_gateways(boto3_session, region)
         load_internet_gateways(neo4j_session, internet_gateways, region, current_aws_account_id, update_tag)
 
     cleanup(neo4j_session, common_job_parameters)
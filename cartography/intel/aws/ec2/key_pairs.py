@@ -8,6 +8,7 @@ import neo4j
 from .util import get_botocore_config
 from cartography.graph.job import GraphJob
 from cartography.models.aws.ec2.keypairs import EC2KeyPairSchema
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import timeit
 
@@ -64,8 +65,7 @@ def sync_ec2_key_pairs(
     neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str], current_aws_account_id: str,
     update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, data in aws_fan_out_regions(get_ec2_key_pairs, boto3_session, regions):
         logger.info("Syncing EC2 key pairs for region '%s' in account '%s'.", region, current_aws_account_id)
-        data = get_ec2_key_pairs(boto3_session, region)
         load_ec2_key_pairs(neo4j_session, data, region, current_aws_account_id, update_tag)
     cleanup_ec2_key_pairs(neo4j_session, common_job_parameters)
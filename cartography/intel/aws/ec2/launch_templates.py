@@ -10,6 +10,7 @@ from cartography.graph.job import GraphJob
 from cartography.models.aws.ec2.launch_template_versions import LaunchTemplateVersionSchema
 from cartography.models.aws.ec2.launch_templates import LaunchTemplateSchema
 from cartography.util import aws_handle_regions
+from cartography.util import run_graph_jobs
 from cartography.util import timeit
 
 logger = logging.getLogger(__name__)
@@ -118,11 +119,13 @@ def load_launch_template_versions(
 @timeit
 def cleanup(neo4j_session: neo4j.Session, common_job_parameters: dict[str, Any]) -> None:
     logger.info("Running launch template cleanup job.")
-    cleanup_job = GraphJob.from_node_schema(LaunchTemplateSchema(), common_job_parameters)
-    cleanup_job.run(neo4j_session)
-
-    cleanup_job = GraphJob.from_node_schema(LaunchTemplateVersionSchema(), common_job_parameters)
-    cleanup_job.run(neo4j_session)
+    run_graph_jobs(
+        neo4j_session,
+        [
+            GraphJob.from_node_schema(LaunchTemplateSchema(), common_job_parameters),
+            GraphJob.from_node_schema(LaunchTemplateVersionSchema(), common_job_parameters),
+        ],
+    )
 
 
 @timeit
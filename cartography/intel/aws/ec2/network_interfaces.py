@@ -15,7 +15,9 @@ from cartography.models.aws.ec2.networkinterfaces import EC2NetworkInterfaceSche
 from cartography.models.aws.ec2.privateip_networkinterface import EC2PrivateIpNetworkInterfaceSchema
 from cartography.models.aws.ec2.securitygroup_networkinterface import EC2SecurityGroupNetworkInterfaceSchema
 from cartography.models.aws.ec2.subnet_networkinterface import EC2SubnetNetworkInterfaceSchema
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
+from cartography.util import run_graph_jobs
 from cartography.util import timeit
 
 logger = logging.getLogger(__name__)
@@ -225,8 +227,13 @@ def load_network_data(
 
 @timeit
 def cleanup_network_interfaces(neo4j_session: neo4j.Session, common_job_parameters: Dict) -> None:
-    GraphJob.from_node_schema(EC2NetworkInterfaceSchema(), common_job_parameters).run(neo4j_session)
-    GraphJob.from_node_schema(EC2PrivateIpNetworkInterfaceSchema(), common_job_parameters).run(neo4j_session)
+    run_graph_jobs(
+        neo4j_session,
+        [
+            GraphJob.from_node_schema(EC2NetworkInterfaceSchema(), common_job_parameters),
+            GraphJob.from_node_schema(EC2PrivateIpNetworkInterfaceSchema(), common_job_parameters),
+        ],
+    )
 
 
 @timeit
@@ -238,9 +245,8 @@ def sync_network_interfaces(
         update_tag: int,
         common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, data in aws_fan_out_regions(get_network_interface_data, boto3_session, regions):
         logger.info(f"Syncing EC2 network interfaces for region '{region}' in account '{current_aws_account_id}'.")
-        data = get_network_interface_data(boto3_session, region)
         ec2_network_data = transform_network_interface_data(data, region)
         load_network_data(
             neo4j_session,
@@ -7,6 +7,7 @@ import neo4j
 from botocore.exceptions import ClientError
 
 from .util import get_botocore_config
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
@@ -75,8 +76,7 @@ def sync_ec2_reserved_instances(
         current_aws_account_id: str,
         update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, data in aws_fan_out_regions(get_reserved_instances, boto3_session, regions):
         logger.debug("Syncing reserved instances for region '%s' in account '%s'.", region, current_aws_account_id)
-        data = get_reserved_instances(boto3_session, region)
         load_reserved_instances(neo4j_session, data, region, current_aws_account_id, update_tag)
     cleanup_reserved_instances(neo4j_session, common_job_parameters)
@@ -1,16 +1,23 @@
 import logging
-from string import Template
 from typing import Dict
 from typing import List
+from typing import Tuple
 
 import boto3
 import neo4j
 
 from .util import get_botocore_config
+from cartography.client.core.tx import load
 from cartography.graph.job import GraphJob
 from cartography.models.aws.ec2.securitygroup_instance import EC2SecurityGroupInstanceSchema
+from cartography.models.aws.ec2.securitygroup_rules import IpPermissionEgressSchema
+from cartography.models.aws.ec2.securitygroup_rules import IpPermissionInboundSchema
+from cartography.models.aws.ec2.securitygroup_rules import IpRangeSchema
+from cartography.models.aws.ec2.securitygroups import EC2SecurityGroupSchema
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
-from cartography.util import run_cleanup_job
+from cartography.util import get_cleanup_job
+from cartography.util import run_graph_jobs
 from cartography.util import timeit
 
 logger = logging.getLogger(__name__)
@@ -27,79 +34,38 @@ def get_ec2_security_group_data(boto3_session: boto3.session.Session, region: st
     return security_groups
 
 
-@timeit
-def load_ec2_security_group_rule(neo4j_session: neo4j.Session, group: Dict, rule_type: str, update_tag: int) -> None:
-    INGEST_RULE_TEMPLATE = Template("""
-    MERGE (rule:$rule_label{ruleid: $RuleId})
-    ON CREATE SET rule :IpRule, rule.firstseen = timestamp(), rule.fromport = $FromPort, rule.toport = $ToPort,
-    rule.protocol = $Protocol
-    SET rule.lastupdated = $update_tag
-    WITH rule
-    MATCH (group:EC2SecurityGroup{groupid: $GroupId})
-    MERGE (group)<-[r:MEMBER_OF_EC2_SECURITY_GROUP]-(rule)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $update_tag;
-    """)
-
-    ingest_rule_group_pair = """
-    MERGE (group:EC2SecurityGroup{id: $GroupId})
-    ON CREATE SET group.firstseen = timestamp(), group.groupid = $GroupId
-    SET group.lastupdated = $update_tag
-    WITH group
-    MATCH (inbound:IpRule{ruleid: $RuleId})
-    MERGE (inbound)-[r:MEMBER_OF_EC2_SECURITY_GROUP]->(group)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $update_tag
+def transform_ec2_security_group_data(data: List[Dict]) -> Tuple[List[Dict], List[Dict], List[Dict], List[Dict]]:
     """
-
-    ingest_range = """
-    MERGE (range:IpRange{id: $RangeId})
-    ON CREATE SET range.firstseen = timestamp(), range.range = $RangeId
-    SET range.lastupdated = $update_tag
-    WITH range
-    MATCH (rule:IpRule{ruleid: $RuleId})
-    MERGE (rule)<-[r:MEMBER_OF_IP_RULE]-(range)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $update_tag
+    Flattens the security groups returned by describe-security-groups.
+    :param data: The security groups
+    :return: A tuple of the security groups, their inbound rules, their outbound rules, and the IP ranges of all rules
     """
-
-    group_id = group["GroupId"]
-    rule_type_map = {"IpPermissions": "IpPermissionInbound", "IpPermissionsEgress": "IpPermissionEgress"}
-
-    if group.get(rule_type):
-        for rule in group[rule_type]:
-            protocol = rule.get("IpProtocol", "all")
-            from_port = rule.get("FromPort")
-            to_port = rule.get("ToPort")
-
-            ruleid = f"{group_id}/{rule_type}/{from_port}{to_port}{protocol}"
-            # NOTE Cypher query syntax is incompatible with Python string formatting, so we have to do this awkward
-            # NOTE manual formatting instead.
-            neo4j_session.run(
-                INGEST_RULE_TEMPLATE.safe_substitute(rule_label=rule_type_map[rule_type]),
-                RuleId=ruleid,
-                FromPort=from_port,
-                ToPort=to_port,
-                Protocol=protocol,
-                GroupId=group_id,
-                update_tag=update_tag,
-            )
-
-            neo4j_session.run(
-                ingest_rule_group_pair,
-                GroupId=group_id,
-                RuleId=ruleid,
-                update_tag=update_tag,
-            )
-
-            for ip_range in rule["IpRanges"]:
-                range_id = ip_range["CidrIp"]
-                neo4j_session.run(
-                    ingest_range,
-                    RangeId=range_id,
-                    RuleId=ruleid,
-                    update_tag=update_tag,
-                )
+    groups: List[Dict] = []
+    rules: Dict[str, List[Dict]] = {"IpPermissions": [], "IpPermissionsEgress": []}
+    ranges: List[Dict] = []
+    for group in data:
+        group_id = group["GroupId"]
+        groups.append({
+            'GroupId': group_id,
+            'GroupName': group.get("GroupName"),
+            'Description': group.get("Description"),
+            'VpcId': group.get("VpcId"),
+        })
+        for rule_type, rule_list in rules.items():
+            for rule in group.get(rule_type) or []:
+                protocol = rule.get("IpProtocol", "all")
+                from_port = rule.get("FromPort")
+                to_port = rule.get("ToPort")
+                ruleid = f"{group_id}/{rule_type}/{from_port}{to_port}{protocol}"
+                rule_list.append({
+                    'RuleId': ruleid,
+                    'GroupId': group_id,
+                    'Protocol': protocol,
+                    'FromPort': from_port,
+                    'ToPort': to_port,
+                })
+                ranges.extend({'RangeId': ip_range["CidrIp"], 'RuleId': ruleid} for ip_range in rule["IpRanges"])
+    return groups, rules["IpPermissions"], rules["IpPermissionsEgress"], ranges
 
 
 @timeit
@@ -107,48 +73,47 @@ def load_ec2_security_groupinfo(
     neo4j_session: neo4j.Session, data: List[Dict], region: str,
     current_aws_account_id: str, update_tag: int,
 ) -> None:
-    ingest_security_group = """
-    MERGE (group:EC2SecurityGroup{id: $GroupId})
-    ON CREATE SET group.firstseen = timestamp(), group.groupid = $GroupId
-    SET group.name = $GroupName, group.description = $Description, group.region = $Region,
-    group.lastupdated = $update_tag
-    WITH group
-    MATCH (aa:AWSAccount{id: $AWS_ACCOUNT_ID})
-    MERGE (aa)-[r:RESOURCE]->(group)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $update_tag
-    WITH group
-    MATCH (vpc:AWSVpc{id: $VpcId})
-    MERGE (vpc)-[rg:MEMBER_OF_EC2_SECURITY_GROUP]->(group)
-    ON CREATE SET rg.firstseen = timestamp()
-    """
-
-    for group in data:
-        group_id = group["GroupId"]
-
-        neo4j_session.run(
-            ingest_security_group,
-            GroupId=group_id,
-            GroupName=group.get("GroupName"),
-            Description=group.get("Description"),
-            VpcId=group.get("VpcId", None),
-            Region=region,
-            AWS_ACCOUNT_ID=current_aws_account_id,
-            update_tag=update_tag,
-        )
-
-        load_ec2_security_group_rule(neo4j_session, group, "IpPermissions", update_tag)
-        load_ec2_security_group_rule(neo4j_session, group, "IpPermissionsEgress", update_tag)
+    groups, inbound_rules, egress_rules, ranges = transform_ec2_security_group_data(data)
+    load(
+        neo4j_session,
+        EC2SecurityGroupSchema(),
+        groups,
+        Region=region,
+        AWS_ID=current_aws_account_id,
+        lastupdated=update_tag,
+    )
+    load(
+        neo4j_session,
+        IpPermissionInboundSchema(),
+        inbound_rules,
+        AWS_ID=current_aws_account_id,
+        lastupdated=update_tag,
+    )
+    load(
+        neo4j_session,
+        IpPermissionEgressSchema(),
+        egress_rules,
+        AWS_ID=current_aws_account_id,
+        lastupdated=update_tag,
+    )
+    load(neo4j_session, IpRangeSchema(), ranges, lastupdated=update_tag)
 
 
 @timeit
 def cleanup_ec2_security_groupinfo(neo4j_session: neo4j.Session, common_job_parameters: Dict) -> None:
-    run_cleanup_job(
-        'aws_import_ec2_security_groupinfo_cleanup.json',
+    # The JSON job reaches stale IpRanges through their IpRules and EC2SecurityGroups, so it shares labels with the
+    # other jobs and runs before them. It also deletes stale IpRules through their EC2SecurityGroups, since rules
+    # written by earlier versions only have a `ruleid` and no RESOURCE relationship for the schema cleanup to follow.
+    run_graph_jobs(
         neo4j_session,
-        common_job_parameters,
+        [
+            get_cleanup_job('aws_import_ec2_security_groupinfo_cleanup.json', common_job_parameters),
+            GraphJob.from_node_schema(IpPermissionInboundSchema(), common_job_parameters),
+            GraphJob.from_node_schema(IpPermissionEgressSchema(), common_job_parameters),
+            GraphJob.from_node_schema(EC2SecurityGroupSchema(), common_job_parameters),
+            GraphJob.from_node_schema(EC2SecurityGroupInstanceSchema(), common_job_parameters),
+        ],
     )
-    GraphJob.from_node_schema(EC2SecurityGroupInstanceSchema(), common_job_parameters).run(neo4j_session)
 
 
 @timeit
@@ -156,8 +121,7 @@ def sync_ec2_security_groupinfo(
     neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str], current_aws_account_id: str,
     update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, data in aws_fan_out_regions(get_ec2_security_group_data, boto3_session, regions):
         logger.info("Syncing EC2 security groups for region '%s' in account '%s'.", region, current_aws_account_id)
-        data = get_ec2_security_group_data(boto3_session, region)
         load_ec2_security_groupinfo(neo4j_session, data, region, current_aws_account_id, update_tag)
     cleanup_ec2_security_groupinfo(neo4j_session, common_job_parameters)
@@ -1,17 +1,22 @@
 import logging
 from typing import Dict
+from typing import Iterator
 from typing import List
+from typing import Set
 
 import boto3
 import neo4j
 from botocore.exceptions import ClientError
 
 from cartography.util import aws_handle_regions
+from cartography.util import iter_batches
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_BATCH_SIZE = 10000
+
 
 @timeit
 def get_snapshots_in_use(neo4j_session: neo4j.Session, region: str, current_aws_account_id: str) -> List[str]:
@@ -26,20 +31,27 @@ def get_snapshots_in_use(neo4j_session: neo4j.Session, region: str, current_aws_
 
 @timeit
 @aws_handle_regions
-def get_snapshots(boto3_session: boto3.session.Session, region: str, in_use_snapshot_ids: List[str]) -> List[Dict]:
+def get_snapshots(
+    boto3_session: boto3.session.Session, region: str, in_use_snapshot_ids: List[str],
+) -> Iterator[Dict]:
+    """
+    Yields the snapshots owned by the account, followed by the in-use snapshots it does not own, page by page as they
+    are fetched so that they can be streamed into the graph.
+    """
     client = boto3_session.client('ec2', region_name=region)
     paginator = client.get_paginator('describe_snapshots')
-    snapshots: List[Dict] = []
+    self_owned_snapshot_ids: Set[str] = set()
     for page in paginator.paginate(OwnerIds=['self']):
-        snapshots.extend(page['Snapshots'])
+        for snapshot in page['Snapshots']:
+            self_owned_snapshot_ids.add(snapshot['SnapshotId'])
+            yield snapshot
 
     # fetch in-use snapshots not in self_owned snapshots
-    self_owned_snapshot_ids = {s['SnapshotId'] for s in snapshots}
     other_snapshot_ids = set(in_use_snapshot_ids) - self_owned_snapshot_ids
     if other_snapshot_ids:
         try:
             for page in paginator.paginate(SnapshotIds=list(other_snapshot_ids)):
-                snapshots.extend(page['Snapshots'])
+                yield from page['Snapshots']
         except ClientError as e:
             if e.response['Error']['Code'] == 'InvalidSnapshot.NotFound':
                 logger.warning(
@@ -49,8 +61,6 @@ def get_snapshots(boto3_session: boto3.session.Session, region: str, in_use_snap
             else:
                 raise
 
-    return snapshots
-
 
 @timeit
 def load_snapshots(
@@ -140,8 +150,11 @@ def sync_ebs_snapshots(
     for region in regions:
         logger.debug("Syncing snapshots for region '%s' in account '%s'.", region, current_aws_account_id)
         snapshots_in_use = get_snapshots_in_use(neo4j_session, region, current_aws_account_id)
-        data = get_snapshots(boto3_session, region, snapshots_in_use)
-        load_snapshots(neo4j_session, data, region, current_aws_account_id, update_tag)
-        snapshot_volumes = get_snapshot_volumes(data)
-        load_snapshot_volume_relations(neo4j_session, snapshot_volumes, current_aws_account_id, update_tag)
+        snapshots = get_snapshots(boto3_session, region, snapshots_in_use)
+        # Stream the snapshots into the graph one batch at a time to keep memory bounded. The cleanup below only runs
+        # once all batches have been loaded with the current update tag.
+        for data in iter_batches(snapshots, size=SNAPSHOT_BATCH_SIZE):
+            load_snapshots(neo4j_session, data, region, current_aws_account_id, update_tag)
+            snapshot_volumes = get_snapshot_volumes(data)
+            load_snapshot_volume_relations(neo4j_session, snapshot_volumes, current_aws_account_id, update_tag)
     cleanup_snapshots(neo4j_session, common_job_parameters)
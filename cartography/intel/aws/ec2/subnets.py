@@ -8,8 +8,10 @@ import neo4j
 from .util import get_botocore_config
 from cartography.graph.job import GraphJob
 from cartography.models.aws.ec2.subnet_instance import EC2SubnetInstanceSchema
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
-from cartography.util import run_cleanup_job
+from cartography.util import get_cleanup_job
+from cartography.util import run_graph_jobs
 from cartography.util import timeit
 
 logger = logging.getLogger(__name__)
@@ -77,8 +79,13 @@ def load_subnets(
 
 @timeit
 def cleanup_subnets(neo4j_session: neo4j.Session, common_job_parameters: Dict) -> None:
-    run_cleanup_job('aws_ingest_subnets_cleanup.json', neo4j_session, common_job_parameters)
-    GraphJob.from_node_schema(EC2SubnetInstanceSchema(), common_job_parameters).run(neo4j_session)
+    run_graph_jobs(
+        neo4j_session,
+        [
+            get_cleanup_job('aws_ingest_subnets_cleanup.json', common_job_parameters),
+            GraphJob.from_node_schema(EC2SubnetInstanceSchema(), common_job_parameters),
+        ],
+    )
 
 
 @timeit
@@ -86,8 +93,7 @@ def sync_subnets(
         neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str],
         current_aws_account_id: str, update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, data in aws_fan_out_regions(get_subnet_data, boto3_session, regions):
         logger.info("Syncing EC2 subnets for region '%s' in account '%s'.", region, current_aws_account_id)
-        data = get_subnet_data(boto3_session, region)
         load_subnets(neo4j_session, data, region, current_aws_account_id, update_tag)
     cleanup_subnets(neo4j_session, common_job_parameters)
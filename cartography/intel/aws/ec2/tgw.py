@@ -1,12 +1,15 @@
 import logging
 from typing import Dict
 from typing import List
+from typing import Tuple
 
 import boto3
 import botocore.exceptions
 import neo4j
 
 from .util import get_botocore_config
+from cartography.client.core.tx import shared_node_writes
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
@@ -67,6 +70,19 @@ def get_tgw_vpc_attachments(boto3_session: boto3.session.Session, region: str) -
     return tgw_vpc_attachments
 
 
+def get_transit_gateway_data(
+    boto3_session: boto3.session.Session, region: str,
+) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Returns the transit gateways, transit gateway attachments, and transit gateway VPC attachments in the given region.
+    """
+    return (
+        get_transit_gateways(boto3_session, region),
+        get_tgw_attachments(boto3_session, region),
+        get_tgw_vpc_attachments(boto3_session, region),
+    )
+
+
 @timeit
 def load_transit_gateways(
     neo4j_session: neo4j.Session, data: List[Dict], region: str, current_aws_account_id: str,
@@ -95,17 +111,19 @@ def load_transit_gateways(
     for tgw in data:
         tgw_id = tgw["TransitGatewayId"]
 
-        neo4j_session.run(
-            ingest_transit_gateway,
-            TgwId=tgw_id,
-            ARN=tgw["TransitGatewayArn"],
-            Description=tgw.get("Description"),
-            Region=region,
-            AWS_ACCOUNT_ID=current_aws_account_id,
-            OwnerId=tgw["OwnerId"],
-            State=tgw["State"],
-            update_tag=update_tag,
-        )
+        # The owner of a shared transit gateway is another account.
+        with shared_node_writes({'AWSAccount'}):
+            neo4j_session.run(
+                ingest_transit_gateway,
+                TgwId=tgw_id,
+                ARN=tgw["TransitGatewayArn"],
+                Description=tgw.get("Description"),
+                Region=region,
+                AWS_ACCOUNT_ID=current_aws_account_id,
+                OwnerId=tgw["OwnerId"],
+                State=tgw["State"],
+                update_tag=update_tag,
+            )
         _attach_shared_transit_gateway(
             neo4j_session, tgw, region, current_aws_account_id, update_tag,
         )
@@ -241,17 +259,16 @@ def sync_transit_gateways(
     neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str], current_aws_account_id: str,
     update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, (tgws, tgw_attachments, tgw_vpc_attachments) in aws_fan_out_regions(
+        get_transit_gateway_data, boto3_session, regions,
+    ):
         logger.info("Syncing AWS Transit Gateways for region '%s' in account '%s'.", region, current_aws_account_id)
-        tgws = get_transit_gateways(boto3_session, region)
         load_transit_gateways(neo4j_session, tgws, region, current_aws_account_id, update_tag)
 
         logger.debug(
             "Syncing AWS Transit Gateway Attachments for region '%s' in account '%s'.",
             region, current_aws_account_id,
         )
-        tgw_attachments = get_tgw_attachments(boto3_session, region)
-        tgw_vpc_attachments = get_tgw_vpc_attachments(boto3_session, region)
         load_tgw_attachments(
             neo4j_session, tgw_attachments + tgw_vpc_attachments,
             region, current_aws_account_id, update_tag,
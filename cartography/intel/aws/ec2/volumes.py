@@ -10,6 +10,7 @@ from cartography.client.core.tx import load
 from cartography.graph.job import GraphJob
 from cartography.intel.aws.util.arns import build_arn
 from cartography.models.aws.ec2.volumes import EBSVolumeSchema
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import timeit
 
@@ -95,9 +96,8 @@ def sync_ebs_volumes(
         update_tag: int,
         common_job_parameters: Dict[str, Any],
 ) -> None:
-    for region in regions:
+    for region, data in aws_fan_out_regions(get_volumes, boto3_session, regions):
         logger.debug("Syncing volumes for region '%s' in account '%s'.", region, current_aws_account_id)
-        data = get_volumes(boto3_session, region)
         transformed_data = transform_volumes(data, region, current_aws_account_id)
         load_volumes(neo4j_session, transformed_data, region, current_aws_account_id, update_tag)
     cleanup_volumes(neo4j_session, common_job_parameters)
@@ -6,6 +6,8 @@ import boto3
 import neo4j
 
 from .util import get_botocore_config
+from cartography.client.core.tx import shared_node_writes
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
@@ -76,10 +78,12 @@ def load_vpc_peerings(
 
     """
 
-    neo4j_session.run(
-        ingest_vpc_peerings, vpc_peerings=data, update_tag=update_tag,
-        region=region, aws_account_id=aws_account_id,
-    )
+    # Both sides of a peering connection can be in other accounts.
+    with shared_node_writes({'AWSAccount'}):
+        neo4j_session.run(
+            ingest_vpc_peerings, vpc_peerings=data, update_tag=update_tag,
+            region=region, aws_account_id=aws_account_id,
+        )
 
 
 @timeit
@@ -158,9 +162,8 @@ def sync_vpc_peerings(
     neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str],
     current_aws_account_id: str, update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, data in aws_fan_out_regions(get_vpc_peerings_data, boto3_session, regions):
         logger.debug("Syncing EC2 VPC peering for region '%s' in account '%s'.", region, current_aws_account_id)
-        data = get_vpc_peerings_data(boto3_session, region)
         load_vpc_peerings(neo4j_session, data, region, current_aws_account_id, update_tag)
         load_accepter_cidrs(neo4j_session, data, region, current_aws_account_id, update_tag)
         load_requester_cidrs(neo4j_session, data, region, current_aws_account_id, update_tag)
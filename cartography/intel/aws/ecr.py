@@ -2,16 +2,17 @@ import logging
 from typing import Any
 from typing import Dict
 from typing import List
+from typing import Tuple
 
 import boto3
 import neo4j
 
 from cartography.util import aws_handle_regions
 from cartography.util import batch
+from cartography.util import get_bounded_executor
+from cartography.util import get_cached_boto3_session
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
-from cartography.util import to_asynchronous
-from cartography.util import to_synchronous
 
 logger = logging.getLogger(__name__)
 
@@ -152,11 +153,14 @@ def _get_image_data(
     return as a mapping from repositoryUri to image object
     '''
     image_data = {}
+    # Clients are shared by the executor's threads, so they must be created through the thread-safe client cache.
+    boto3_session = get_cached_boto3_session(boto3_session)
 
-    async def async_get_images(repo: Dict[str, Any]) -> None:
-        repo_image_obj = await to_asynchronous(get_ecr_repository_images, boto3_session, region, repo['repositoryName'])
-        image_data[repo['repositoryUri']] = repo_image_obj
-    to_synchronous(*[async_get_images(repo) for repo in repositories])
+    def get_images(repo: Dict[str, Any]) -> Tuple[str, List[Dict]]:
+        return repo['repositoryUri'], get_ecr_repository_images(boto3_session, region, repo['repositoryName'])
+
+    for repo_uri, repo_image_obj in get_bounded_executor().map_unordered('ecr', get_images, repositories):
+        image_data[repo_uri] = repo_image_obj
 
     return image_data
 
@@ -9,7 +9,8 @@ import neo4j
 from cartography.util import aws_handle_regions
 from cartography.util import camel_to_snake
 from cartography.util import dict_date_to_epoch
-from cartography.util import run_cleanup_job
+from cartography.util import get_cleanup_job
+from cartography.util import run_graph_jobs
 from cartography.util import timeit
 
 logger = logging.getLogger(__name__)
@@ -542,7 +543,14 @@ def load_ecs_containers(
 
 @timeit
 def cleanup_ecs(neo4j_session: neo4j.Session, common_job_parameters: Dict) -> None:
-    run_cleanup_job('aws_import_ecs_cleanup.json', neo4j_session, common_job_parameters)
+    # Task definitions are not reached through clusters, so their cleanup can run alongside the cluster cleanup.
+    run_graph_jobs(
+        neo4j_session,
+        [
+            get_cleanup_job('aws_import_ecs_cleanup.json', common_job_parameters),
+            get_cleanup_job('aws_import_ecs_task_definitions_cleanup.json', common_job_parameters),
+        ],
+    )
 
 
 @timeit
@@ -9,6 +9,7 @@ import neo4j
 from cartography.client.core.tx import load
 from cartography.graph.job import GraphJob
 from cartography.models.aws.eks.clusters import EKSClusterSchema
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import timeit
 
@@ -33,6 +34,17 @@ def get_eks_describe_cluster(boto3_session: boto3.session.Session, region: str,
     return response['cluster']
 
 
+def get_eks_cluster_data(boto3_session: boto3.session.Session, region: str) -> Dict[str, Dict]:
+    """
+    Returns a dict of cluster name to the describe_cluster output for every EKS cluster in the given region.
+    """
+    clusters: List[str] = get_eks_clusters(boto3_session, region)
+    cluster_data = {}
+    for cluster_name in clusters:
+        cluster_data[cluster_name] = get_eks_describe_cluster(boto3_session, region, cluster_name)
+    return cluster_data
+
+
 @timeit
 def load_eks_clusters(
         neo4j_session: neo4j.Session,
@@ -92,13 +104,8 @@ def sync(
         update_tag: int,
         common_job_parameters: Dict[str, Any],
 ) -> None:
-    for region in regions:
+    for region, cluster_data in aws_fan_out_regions(get_eks_cluster_data, boto3_session, regions):
         logger.info("Syncing EKS for region '%s' in account '%s'.", region, current_aws_account_id)
-
-        clusters: List[str] = get_eks_clusters(boto3_session, region)
-        cluster_data = {}
-        for cluster_name in clusters:
-            cluster_data[cluster_name] = get_eks_describe_cluster(boto3_session, region, cluster_name)
         transformed_list = transform(cluster_data)
 
         load_eks_clusters(neo4j_session, transformed_list, region, current_aws_account_id, update_tag)
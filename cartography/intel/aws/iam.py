@@ -9,8 +9,17 @@ from typing import Tuple
 import boto3
 import neo4j
 
+from cartography.client.core.tx import load
+from cartography.graph.job import GraphJob
 from cartography.intel.aws.permission_relationships import parse_statement_node
 from cartography.intel.aws.permission_relationships import principal_allowed_on_resource
+from cartography.models.aws.iam.access_key import AccountAccessKeySchema
+from cartography.models.aws.iam.group import AWSGroupSchema
+from cartography.models.aws.iam.role import AWSRoleSchema
+from cartography.models.aws.iam.trusted_principal import AWSTrustedPrincipalAccountSchema
+from cartography.models.aws.iam.trusted_principal import AWSTrustedPrincipalSchema
+from cartography.models.aws.iam.user import AWSUserSchema
+from cartography.models.aws.iam.user_group import AWSUserGroupSchema
 from cartography.stats import get_stats_client
 from cartography.util import merge_module_sync_metadata
 from cartography.util import run_cleanup_job
@@ -241,63 +250,47 @@ def get_account_access_key_data(boto3_session: boto3.session.Session, username:
     return access_keys
 
 
+def transform_users(users: List[Dict]) -> List[Dict]:
+    return [
+        {
+            **user,
+            'CreateDate': str(user['CreateDate']),
+            'PasswordLastUsed': str(user.get('PasswordLastUsed', '')),
+        }
+        for user in users
+    ]
+
+
 @timeit
 def load_users(
     neo4j_session: neo4j.Session, users: List[Dict], current_aws_account_id: str, aws_update_tag: int,
 ) -> None:
-    ingest_user = """
-    MERGE (unode:AWSUser{arn: $ARN})
-    ON CREATE SET unode:AWSPrincipal, unode.userid = $USERID, unode.firstseen = timestamp(),
-    unode.createdate = $CREATE_DATE
-    SET unode.name = $USERNAME, unode.path = $PATH, unode.passwordlastused = $PASSWORD_LASTUSED,
-    unode.lastupdated = $aws_update_tag
-    WITH unode
-    MATCH (aa:AWSAccount{id: $AWS_ACCOUNT_ID})
-    MERGE (aa)-[r:RESOURCE]->(unode)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $aws_update_tag
-    """
     logger.info(f"Loading {len(users)} IAM users.")
-    for user in users:
-        neo4j_session.run(
-            ingest_user,
-            ARN=user["Arn"],
-            USERID=user["UserId"],
-            CREATE_DATE=str(user["CreateDate"]),
-            USERNAME=user["UserName"],
-            PATH=user["Path"],
-            PASSWORD_LASTUSED=str(user.get("PasswordLastUsed", "")),
-            AWS_ACCOUNT_ID=current_aws_account_id,
-            aws_update_tag=aws_update_tag,
-        )
+    load(
+        neo4j_session,
+        AWSUserSchema(),
+        transform_users(users),
+        AWS_ID=current_aws_account_id,
+        lastupdated=aws_update_tag,
+    )
+
+
+def transform_groups(groups: List[Dict]) -> List[Dict]:
+    return [{**group, 'CreateDate': str(group['CreateDate'])} for group in groups]
 
 
 @timeit
 def load_groups(
     neo4j_session: neo4j.Session, groups: List[Dict], current_aws_account_id: str, aws_update_tag: int,
 ) -> None:
-    ingest_group = """
-    MERGE (gnode:AWSGroup{arn: $ARN})
-    ON CREATE SET gnode.groupid = $GROUP_ID, gnode.firstseen = timestamp(), gnode.createdate = $CREATE_DATE
-    SET gnode:AWSPrincipal, gnode.name = $GROUP_NAME, gnode.path = $PATH,gnode.lastupdated = $aws_update_tag
-    WITH gnode
-    MATCH (aa:AWSAccount{id: $AWS_ACCOUNT_ID})
-    MERGE (aa)-[r:RESOURCE]->(gnode)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $aws_update_tag
-    """
     logger.info(f"Loading {len(groups)} IAM groups to the graph.")
-    for group in groups:
-        neo4j_session.run(
-            ingest_group,
-            ARN=group["Arn"],
-            GROUP_ID=group["GroupId"],
-            CREATE_DATE=str(group["CreateDate"]),
-            GROUP_NAME=group["GroupName"],
-            PATH=group["Path"],
-            AWS_ACCOUNT_ID=current_aws_account_id,
-            aws_update_tag=aws_update_tag,
-        )
+    load(
+        neo4j_session,
+        AWSGroupSchema(),
+        transform_groups(groups),
+        AWS_ID=current_aws_account_id,
+        lastupdated=aws_update_tag,
+    )
 
 
 def _parse_principal_entries(principal: Dict) -> List[Tuple[Any, Any]]:
@@ -315,115 +308,101 @@ def _parse_principal_entries(principal: Dict) -> List[Tuple[Any, Any]]:
     return principal_entries
 
 
+def transform_roles(roles: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Flattens the trust policies of the given roles.
+    :param roles: The roles as returned by list_roles.
+    :return: A tuple of
+    - the roles, with one dict per role and trusted principal that holds the principal's ARN as `TrustedPrincipalArn`.
+      Roles that trust no principals are included once with `TrustedPrincipalArn` set to None.
+    - the trusted principals, deduplicated by ARN, as dicts of `arn`, `type`, and `account_id` which is None if the ARN
+      does not name an account, e.g. for service principals like ec2.amazonaws.com.
+    """
+    role_rows: List[Dict] = []
+    trusted_principals: Dict[str, Dict] = {}
+    # TODO support conditions
+    for role in roles:
+        role_row = {**role, 'CreateDate': str(role['CreateDate'])}
+        principal_arns = []
+        for statement in role["AssumeRolePolicyDocument"]["Statement"]:
+            for principal_type, principal_value in _parse_principal_entries(statement["Principal"]):
+                principal_arns.append(principal_value)
+                trusted_principals.setdefault(
+                    principal_value,
+                    {
+                        'arn': principal_value,
+                        'type': principal_type,
+                        'account_id': get_account_from_arn(principal_value) or None,
+                    },
+                )
+        if not principal_arns:
+            role_rows.append({**role_row, 'TrustedPrincipalArn': None})
+        for principal_arn in principal_arns:
+            role_rows.append({**role_row, 'TrustedPrincipalArn': principal_arn})
+    return role_rows, list(trusted_principals.values())
+
+
 @timeit
 def load_roles(
     neo4j_session: neo4j.Session, roles: List[Dict], current_aws_account_id: str, aws_update_tag: int,
 ) -> None:
-    ingest_role = """
-    MERGE (rnode:AWSPrincipal{arn: $Arn})
-    ON CREATE SET rnode.firstseen = timestamp()
-    SET
-        rnode:AWSRole,
-        rnode.roleid = $RoleId,
-        rnode.createdate = $CreateDate,
-        rnode.name = $RoleName,
-        rnode.path = $Path,
-        rnode.lastupdated = $aws_update_tag
-    WITH rnode
-    MATCH (aa:AWSAccount{id: $AWS_ACCOUNT_ID})
-    MERGE (aa)-[r:RESOURCE]->(rnode)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $aws_update_tag
-    """
+    logger.info(f"Loading {len(roles)} IAM roles to the graph.")
+    role_rows, trusted_principals = transform_roles(roles)
 
-    ingest_policy_statement = """
-    MERGE (spnnode:AWSPrincipal{arn: $SpnArn})
-    ON CREATE SET spnnode.firstseen = timestamp()
-    SET spnnode.lastupdated = $aws_update_tag, spnnode.type = $SpnType
-    WITH spnnode
-    MATCH (role:AWSRole{arn: $RoleArn})
-    MERGE (role)-[r:TRUSTS_AWS_PRINCIPAL]->(spnnode)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $aws_update_tag
-    """
+    # The trusted principals and their accounts are loaded first so that the roles' TRUSTS_AWS_PRINCIPAL relationships
+    # can be attached to them.
+    trusted_account_ids = {principal['account_id'] for principal in trusted_principals if principal['account_id']}
+    load(
+        neo4j_session,
+        AWSTrustedPrincipalAccountSchema(),
+        [{'account_id': account_id} for account_id in sorted(trusted_account_ids)],
+        lastupdated=aws_update_tag,
+    )
+    load(
+        neo4j_session,
+        AWSTrustedPrincipalSchema(),
+        trusted_principals,
+        lastupdated=aws_update_tag,
+    )
+    load(
+        neo4j_session,
+        AWSRoleSchema(),
+        role_rows,
+        AWS_ID=current_aws_account_id,
+        lastupdated=aws_update_tag,
+    )
 
-    # Note - why we don't set inscope or foreign attribute on the account
-    #
-    # we are agnostic here if this is the AWSAccount is part of the sync scope or
-    # a foreign AWS account that contains a trusted principal. The account could also be inscope
-    # but not sync yet.
-    # - The inscope attribute - set when the account is being sync.
-    # - The foreign attribute - the attribute assignment logic is in aws_foreign_accounts.json analysis job
-    # - Why seperate statement is needed - the arn may point to service level principals ex - ec2.amazonaws.com
-    ingest_spnmap_statement = """
-    MERGE (aa:AWSAccount{id: $SpnAccountId})
-    ON CREATE SET aa.firstseen = timestamp()
-    SET aa.lastupdated = $aws_update_tag
-    WITH aa
-    MATCH (spnnode:AWSPrincipal{arn: $SpnArn})
-    WITH spnnode, aa
-    MERGE (aa)-[r:RESOURCE]->(spnnode)
-    ON CREATE SET r.firstseen = timestamp()
-    """
 
-    # TODO support conditions
-    logger.info(f"Loading {len(roles)} IAM roles to the graph.")
-    for role in roles:
-        neo4j_session.run(
-            ingest_role,
-            Arn=role["Arn"],
-            RoleId=role["RoleId"],
-            CreateDate=str(role["CreateDate"]),
-            RoleName=role["RoleName"],
-            Path=role["Path"],
-            AWS_ACCOUNT_ID=current_aws_account_id,
-            aws_update_tag=aws_update_tag,
-        )
+@timeit
+def load_group_memberships(
+    neo4j_session: neo4j.Session, group_memberships: Dict, current_aws_account_id: str, aws_update_tag: int,
+) -> None:
+    memberships = [
+        {'UserArn': info["Arn"], 'GroupArn': group_arn}
+        for group_arn, membership_data in group_memberships.items()
+        for info in membership_data.get("Users", [])
+    ]
+    load(
+        neo4j_session,
+        AWSUserGroupSchema(),
+        memberships,
+        AWS_ID=current_aws_account_id,
+        lastupdated=aws_update_tag,
+    )
 
-        for statement in role["AssumeRolePolicyDocument"]["Statement"]:
-            principal_entries = _parse_principal_entries(statement["Principal"])
-            for principal_type, principal_value in principal_entries:
-                neo4j_session.run(
-                    ingest_policy_statement,
-                    SpnArn=principal_value,
-                    SpnType=principal_type,
-                    RoleArn=role['Arn'],
-                    aws_update_tag=aws_update_tag,
-                )
-                spn_arn = get_account_from_arn(principal_value)
-                if spn_arn:
-                    neo4j_session.run(
-                        ingest_spnmap_statement,
-                        SpnArn=principal_value,
-                        SpnAccountId=get_account_from_arn(principal_value),
-                        aws_update_tag=aws_update_tag,
-                    )
-
-
-@timeit
-def load_group_memberships(neo4j_session: neo4j.Session, group_memberships: Dict, aws_update_tag: int) -> None:
-    ingest_membership = """
-    MATCH (group:AWSGroup{arn: $GroupArn})
-    WITH group
-    MATCH (user:AWSUser{arn: $PrincipalArn})
-    MERGE (user)-[r:MEMBER_AWS_GROUP]->(group)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $aws_update_tag
-    WITH user, group
+    # Users inherit the policies of the groups that they are members of.
+    inherit_group_policies = """
+    MATCH (:AWSAccount{id: $AWS_ACCOUNT_ID})-[:RESOURCE]->(user:AWSUser)-[m:MEMBER_AWS_GROUP]->(group:AWSGroup)
+    WHERE m.lastupdated = $aws_update_tag
     MATCH (group)-[:POLICY]->(policy:AWSPolicy)
-    MERGE (user)-[r2:POLICY]->(policy)
-    SET r2.lastupdated = $aws_update_tag
+    MERGE (user)-[r:POLICY]->(policy)
+    SET r.lastupdated = $aws_update_tag
     """
-
-    for group_arn, membership_data in group_memberships.items():
-        for info in membership_data.get("Users", []):
-            principal_arn = info["Arn"]
-            neo4j_session.run(
-                ingest_membership,
-                GroupArn=group_arn,
-                PrincipalArn=principal_arn,
-                aws_update_tag=aws_update_tag,
-            )
+    neo4j_session.run(
+        inherit_group_policies,
+        AWS_ACCOUNT_ID=current_aws_account_id,
+        aws_update_tag=aws_update_tag,
+    )
 
 
 @timeit
@@ -493,39 +472,26 @@ def sync_assumerole_relationships(
     )
 
 
-@timeit
-def load_user_access_keys(neo4j_session: neo4j.Session, user_access_keys: Dict, aws_update_tag: int) -> None:
-    # TODO change the node label to reflect that this is a user access key, not an account access key
-    ingest_account_key = """
-    MATCH (user:AWSUser{arn: $UserARN})
-    WITH user
-    MERGE (key:AccountAccessKey{accesskeyid: $AccessKeyId})
-    ON CREATE SET key.firstseen = timestamp(), key.createdate = $CreateDate
-    SET key.status = $Status,
-        key.lastupdated = $aws_update_tag,
-        key.lastuseddate = $LastUsedDate,
-        key.lastusedservice = $LastUsedService,
-        key.lastusedregion = $LastUsedRegion
-    WITH user,key
-    MERGE (user)-[r:AWS_ACCESS_KEY]->(key)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $aws_update_tag
-    """
+def transform_user_access_keys(user_access_keys: Dict) -> List[Dict]:
+    return [
+        {**key, 'UserArn': arn, 'CreateDate': str(key['CreateDate'])}
+        for arn, access_keys in user_access_keys.items()
+        for key in access_keys["AccessKeyMetadata"]
+        if key.get('AccessKeyId')
+    ]
 
-    for arn, access_keys in user_access_keys.items():
-        for key in access_keys["AccessKeyMetadata"]:
-            if key.get('AccessKeyId'):
-                neo4j_session.run(
-                    ingest_account_key,
-                    UserARN=arn,
-                    AccessKeyId=key['AccessKeyId'],
-                    CreateDate=str(key['CreateDate']),
-                    Status=key['Status'],
-                    LastUsedDate=key['LastUsedDate'],
-                    LastUsedService=key['LastUsedService'],
-                    LastUsedRegion=key['LastUsedRegion'],
-                    aws_update_tag=aws_update_tag,
-                )
+
+@timeit
+def load_user_access_keys(
+    neo4j_session: neo4j.Session, user_access_keys: Dict, current_aws_account_id: str, aws_update_tag: int,
+) -> None:
+    load(
+        neo4j_session,
+        AccountAccessKeySchema(),
+        transform_user_access_keys(user_access_keys),
+        AWS_ID=current_aws_account_id,
+        lastupdated=aws_update_tag,
+    )
 
 
 def ensure_list(obj: Any) -> List[Any]:
@@ -673,7 +639,7 @@ def sync_users(
 
     sync_user_managed_policies(boto3_session, data, neo4j_session, aws_update_tag)
 
-    run_cleanup_job('aws_import_users_cleanup.json', neo4j_session, common_job_parameters)
+    GraphJob.from_node_schema(AWSUserSchema(), common_job_parameters).run(neo4j_session)
 
 
 @timeit
@@ -709,7 +675,7 @@ def sync_groups(
 
     sync_group_managed_policies(boto3_session, data, neo4j_session, aws_update_tag)
 
-    run_cleanup_job('aws_import_groups_cleanup.json', neo4j_session, common_job_parameters)
+    GraphJob.from_node_schema(AWSGroupSchema(), common_job_parameters).run(neo4j_session)
 
 
 def sync_group_managed_policies(
@@ -743,6 +709,8 @@ def sync_roles(
 
     sync_role_managed_policies(current_aws_account_id, boto3_session, data, neo4j_session, aws_update_tag)
 
+    # AWSRoleSchema merges on the AWSPrincipal label, so its schema-generated cleanup would also delete this account's
+    # users, groups and trusted principals. Roles keep their own cleanup job.
     run_cleanup_job('aws_import_roles_cleanup.json', neo4j_session, common_job_parameters)
 
 
@@ -776,12 +744,8 @@ def sync_group_memberships(
             "return group.name as name, group.arn as arn;"
     groups = neo4j_session.run(query, AWS_ACCOUNT_ID=current_aws_account_id)
     groups_membership = {group["arn"]: get_group_membership_data(boto3_session, group["name"]) for group in groups}
-    load_group_memberships(neo4j_session, groups_membership, aws_update_tag)
-    run_cleanup_job(
-        'aws_import_groups_membership_cleanup.json',
-        neo4j_session,
-        common_job_parameters,
-    )
+    load_group_memberships(neo4j_session, groups_membership, current_aws_account_id, aws_update_tag)
+    GraphJob.from_node_schema(AWSUserGroupSchema(), common_job_parameters).run(neo4j_session)
 
 
 @timeit
@@ -792,11 +756,14 @@ def sync_user_access_keys(
     logger.info("Syncing IAM user access keys for account '%s'.", current_aws_account_id)
     query = "MATCH (user:AWSUser)<-[:RESOURCE]-(:AWSAccount{id: $AWS_ACCOUNT_ID}) " \
             "RETURN user.name as name, user.arn as arn"
-    for user in neo4j_session.run(query, AWS_ACCOUNT_ID=current_aws_account_id):
+    users = neo4j_session.run(query, AWS_ACCOUNT_ID=current_aws_account_id).data()
+    account_access_keys = {}
+    for user in users:
         access_keys = get_account_access_key_data(boto3_session, user["name"])
         if access_keys:
-            account_access_keys = {user["arn"]: access_keys}
-            load_user_access_keys(neo4j_session, account_access_keys, aws_update_tag)
+            account_access_keys[user["arn"]] = access_keys
+    load_user_access_keys(neo4j_session, account_access_keys, current_aws_account_id, aws_update_tag)
+    GraphJob.from_node_schema(AccountAccessKeySchema(), common_job_parameters).run(neo4j_session)
     run_cleanup_job(
         'aws_import_account_access_key_cleanup.json',
         neo4j_session,
@@ -804,6 +771,29 @@ def sync_user_access_keys(
     )
 
 
+@timeit
+def migrate_principal_ids(neo4j_session: neo4j.Session) -> None:
+    """
+    Earlier versions MERGEd AWSPrincipals on `arn` and AccountAccessKeys on `accesskeyid` without setting `id`, which
+    the node schemas MERGE on now. Copies those keys to `id` so that the nodes of a graph written by an earlier version
+    are updated in place instead of duplicated. Once every node has an `id`, this changes nothing.
+    """
+    neo4j_session.run(
+        """
+        MATCH (p:AWSPrincipal)
+        WHERE p.id IS NULL AND p.arn IS NOT NULL
+        SET p.id = p.arn
+        """,
+    )
+    neo4j_session.run(
+        """
+        MATCH (k:AccountAccessKey)
+        WHERE k.id IS NULL AND k.accesskeyid IS NOT NULL
+        SET k.id = k.accesskeyid
+        """,
+    )
+
+
 @timeit
 def sync(
     neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str], current_aws_account_id: str,
@@ -1,6 +1,7 @@
 import logging
 from typing import Any
 from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Tuple
 
@@ -13,11 +14,15 @@ from cartography.models.aws.inspector.findings import AWSInspectorFindingSchema
 from cartography.models.aws.inspector.packages import AWSInspectorPackageSchema
 from cartography.util import aws_handle_regions
 from cartography.util import aws_paginate
+from cartography.util import aws_paginate_iter
+from cartography.util import iter_batches
 from cartography.util import timeit
 
 
 logger = logging.getLogger(__name__)
 
+INSPECTOR_BATCH_SIZE = 10000
+
 
 @timeit
 @aws_handle_regions
@@ -25,13 +30,14 @@ def get_inspector_findings(
         session: boto3.session.Session,
         region: str,
         current_aws_account_id: str,
-) -> List[Dict[str, Any]]:
+) -> Iterator[Dict[str, Any]]:
     """
     We must list_findings by filtering the request, otherwise the request could tiemout.
     First, we filter by account_id. And since there may be millions of CLOSED findings that may never go away,
     we will only fetch those in ACTIVE or SUPPRESSED statuses.
     list_members will get us all the accounts that
     have delegated access to the account specified by current_aws_account_id.
+    Findings are yielded page by page as they are fetched so that they can be streamed into the graph.
     """
     client = session.client('inspector2', region_name=region)
 
@@ -39,28 +45,24 @@ def get_inspector_findings(
     # the current host account may not be considered a "member", but we still fetch its findings
     accounts = [current_aws_account_id] + [m['accountId'] for m in members]
 
-    findings = []
     for account in accounts:
         logger.info(f'Getting findings for member account {account} in region {region}')
-        findings.extend(
-            aws_paginate(
-                client, 'list_findings', 'findings', filterCriteria={
-                    'awsAccountId': [
-                        {
-                            'comparison': 'EQUALS',
-                            'value': account,
-                        },
-                    ],
-                    'findingStatus': [
-                        {
-                            'comparison': 'NOT_EQUALS',
-                            'value': 'CLOSED',
-                        },
-                    ],
-                },
-            ),
+        yield from aws_paginate_iter(
+            client, 'list_findings', 'findings', filterCriteria={
+                'awsAccountId': [
+                    {
+                        'comparison': 'EQUALS',
+                        'value': account,
+                    },
+                ],
+                'findingStatus': [
+                    {
+                        'comparison': 'NOT_EQUALS',
+                        'value': 'CLOSED',
+                    },
+                ],
+            },
         )
-    return findings
 
 
 def transform_inspector_findings(results: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
@@ -209,9 +211,12 @@ def sync(
     for region in regions:
         logger.info(f"Syncing AWS Inspector findings for account {current_aws_account_id} and region {region}")
         findings = get_inspector_findings(boto3_session, region, current_aws_account_id)
-        finding_data, package_data = transform_inspector_findings(findings)
-        logger.info(f"Loading {len(finding_data)} findings")
-        load_inspector_findings(neo4j_session, finding_data, region, update_tag, current_aws_account_id)
-        logger.info(f"Loading {len(package_data)} packages")
-        load_inspector_packages(neo4j_session, package_data, region, update_tag, current_aws_account_id)
+        # Stream the findings through transform and load one batch at a time to keep memory bounded. The cleanup below
+        # only runs once all batches have been loaded with the current update tag.
+        for findings_batch in iter_batches(findings, size=INSPECTOR_BATCH_SIZE):
+            finding_data, package_data = transform_inspector_findings(findings_batch)
+            logger.info(f"Loading {len(finding_data)} findings")
+            load_inspector_findings(neo4j_session, finding_data, region, update_tag, current_aws_account_id)
+            logger.info(f"Loading {len(package_data)} packages")
+            load_inspector_packages(neo4j_session, package_data, region, update_tag, current_aws_account_id)
         cleanup(neo4j_session, common_job_parameters)
@@ -96,9 +96,9 @@ def load_aws_accounts(
     SET aa.lastupdated = $aws_update_tag, aa.name = $ACCOUNT_NAME, aa.inscope=true
     REMOVE aa.foreign
     WITH aa
-    MERGE (root:AWSPrincipal{arn: $RootArn})
+    MERGE (root:AWSPrincipal{id: $RootArn})
     ON CREATE SET root.firstseen = timestamp(), root.type = 'AWS'
-    SET root.lastupdated = $aws_update_tag
+    SET root.lastupdated = $aws_update_tag, root.arn = $RootArn
     WITH aa, root
     MERGE (aa)-[r:RESOURCE]->(root)
     ON CREATE SET r.firstseen = timestamp()
@@ -5,6 +5,7 @@ from typing import List
 import boto3
 import neo4j
 
+from cartography.client.core.tx import shared_node_writes
 from cartography.util import aws_handle_regions
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
@@ -114,18 +115,20 @@ def _attach_ec2_security_groups(neo4j_session: neo4j.Session, cluster: Dict, aws
 def _attach_iam_roles(neo4j_session: neo4j.Session, cluster: Dict, aws_update_tag: int) -> None:
     attach_cluster_to_role = """
     MATCH (c:RedshiftCluster{id:$ClusterArn})
-    MERGE (p:AWSPrincipal{arn:$RoleArn})
+    MERGE (p:AWSPrincipal{id:$RoleArn})
+    ON CREATE SET p.arn = $RoleArn
     MERGE (c)-[s:STS_ASSUMEROLE_ALLOW]->(p)
     ON CREATE SET s.firstseen = timestamp()
     SET s.lastupdated = $aws_update_tag
     """
     for role in cluster.get('IamRoles', []):
-        neo4j_session.run(
-            attach_cluster_to_role,
-            ClusterArn=cluster['arn'],
-            RoleArn=role['IamRoleArn'],
-            aws_update_tag=aws_update_tag,
-        )
+        with shared_node_writes({'AWSPrincipal'}):
+            neo4j_session.run(
+                attach_cluster_to_role,
+                ClusterArn=cluster['arn'],
+                RoleArn=role['IamRoleArn'],
+                aws_update_tag=aws_update_tag,
+            )
 
 
 @timeit
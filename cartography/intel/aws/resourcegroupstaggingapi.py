@@ -1,4 +1,5 @@
 import logging
+import time
 from string import Template
 from typing import Dict
 from typing import List
@@ -6,9 +7,9 @@ from typing import List
 import boto3
 import neo4j
 
+from cartography.client.core.tx import AdaptiveBatchSizer
 from cartography.intel.aws.iam import get_role_tags
 from cartography.util import aws_handle_regions
-from cartography.util import batch
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
 
@@ -188,7 +189,10 @@ def load_tags(
     current_aws_account_id: str,
     aws_update_tag: int,
 ) -> None:
-    for tag_data_batch in batch(tag_data, size=100):
+    # Every tag mapping expands to one MERGE per tag, so batches start out much smaller than in `load_graph_data()`.
+    batch_sizer = AdaptiveBatchSizer(initial_size=100, min_size=10, max_size=1000)
+    for tag_data_batch in batch_sizer.batches(tag_data):
+        start = time.monotonic()
         neo4j_session.write_transaction(
             _load_tags_tx,
             tag_data=tag_data_batch,
@@ -197,6 +201,7 @@ def load_tags(
             current_aws_account_id=current_aws_account_id,
             aws_update_tag=aws_update_tag,
         )
+        batch_sizer.record(len(tag_data_batch), time.monotonic() - start)
 
 
 @timeit
@@ -1,4 +1,6 @@
 from typing import Dict
+from typing import List
+from typing import Set
 
 from . import apigateway
 from . import config
@@ -48,8 +50,6 @@ RESOURCE_FUNCTIONS: Dict = {
     'dynamodb': dynamodb.sync,
     'ec2:launch_templates': sync_ec2_launch_templates,
     'ec2:autoscalinggroup': sync_ec2_auto_scaling_groups,
-    # `ec2:instance` must be included before `ssm` and `ec2:images`,
-    # they rely on EC2Instance data provided by this module.
     'ec2:instance': sync_ec2_instances,
     'ec2:images': sync_ec2_images,
     'ec2:keypair': sync_ec2_key_pairs,
@@ -87,3 +87,66 @@ RESOURCE_FUNCTIONS: Dict = {
     'inspector': inspector.sync,
     'config': config.sync,
 }
+
+
+def _chain(sync_names: List[str]) -> Dict[str, Set[str]]:
+    """
+    Makes each of the given syncs depend on the one before it so that they run one after another.
+    """
+    return {name: {previous} for previous, name in zip(sync_names, sync_names[1:])}
+
+
+# The EC2 syncs MERGE many of the same node labels (EC2Subnet, EC2SecurityGroup, NetworkInterface, AWSVpc, EBSVolume,
+# ...), which must not happen from concurrent transactions, so they run one after another in this order.
+EC2_SYNCS: List[str] = [
+    'ec2:launch_templates',
+    'ec2:autoscalinggroup',
+    'ec2:instance',
+    'ec2:images',
+    'ec2:keypair',
+    'ec2:load_balancer',
+    'ec2:load_balancer_v2',
+    'ec2:network_interface',
+    'ec2:security_group',
+    'ec2:subnet',
+    'ec2:tgw',
+    'ec2:vpc',
+    'ec2:vpc_peering',
+    'ec2:internet_gateway',
+    'ec2:reserved_instances',
+    'ec2:volumes',
+    'ec2:snapshots',
+    'elastic_ip_addresses',
+]
+
+# Maps a sync in RESOURCE_FUNCTIONS to the syncs that must finish before it starts when they are requested together.
+# A sync depends on another if it reads data that the other one writes to the graph, or if both MERGE the same node
+# labels. Syncs without a path between them in this graph may run concurrently within an AWS account. Dependencies are
+# transitive even through syncs that are not requested, e.g. `rds` waits for `ec2:instance` through `ec2:subnet`.
+RESOURCE_DEPENDENCIES: Dict[str, Set[str]] = {
+    **_chain(EC2_SYNCS),
+    # EC2Images and SSM data are attached to EC2Instances.
+    'ec2:images': {'ec2:instance'},
+    'ssm': {'ec2:instance'},
+    # Transit gateways and VPC peerings MERGE AWSAccount nodes for the accounts that own shared transit gateways and
+    # peer VPCs, as IAM does for trusted accounts.
+    'ec2:tgw': {'ec2:subnet', 'iam'},
+    'ec2:vpc_peering': {'ec2:vpc', 'iam'},
+    # Inspector findings are attached to EC2Instances and ECR repositories and images.
+    'inspector': {'ec2:instance', 'ecr'},
+    # Lambda functions are attached to their execution AWSPrincipals.
+    'lambda_function': {'iam'},
+    # RDS and Elasticsearch MERGE EC2Subnets and EC2SecurityGroups.
+    'rds': {'ec2:subnet', 'ec2:security_group'},
+    'elasticsearch': {'ec2:subnet', 'ec2:security_group'},
+    # Redshift MERGEs AWSPrincipals, AWSVpcs and EC2SecurityGroups.
+    'redshift': {'iam', 'ec2:vpc', 'ec2:security_group'},
+    # DNS records are attached to EC2Instances and load balancers.
+    'route53': {'ec2:instance', 'ec2:load_balancer', 'ec2:load_balancer_v2'},
+    # Permission relationships are drawn between principals and resources that must already be in the graph.
+    'permission_relationships': (
+        set(RESOURCE_FUNCTIONS.keys()) - {'permission_relationships', 'resourcegroupstaggingapi'}
+    ),
+    # AWS Tags - Must always be last.
+    'resourcegroupstaggingapi': set(RESOURCE_FUNCTIONS.keys()) - {'resourcegroupstaggingapi'},
+}
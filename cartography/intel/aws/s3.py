@@ -1,4 +1,3 @@
-import asyncio
 import hashlib
 import json
 import logging
@@ -17,12 +16,12 @@ from botocore.exceptions import EndpointConnectionError
 from policyuniverse.policy import Policy
 
 from cartography.stats import get_stats_client
+from cartography.util import get_bounded_executor
+from cartography.util import get_cached_boto3_session
 from cartography.util import merge_module_sync_metadata
 from cartography.util import run_analysis_job
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
-from cartography.util import to_asynchronous
-from cartography.util import to_synchronous
 
 logger = logging.getLogger(__name__)
 stat_handler = get_stats_client(__name__)
@@ -55,36 +54,25 @@ def get_s3_bucket_details(
     Iterates over all S3 buckets. Yields bucket name (string), S3 bucket policies (JSON), ACLs (JSON),
     default encryption policy (JSON), Versioning (JSON), and Public Access Block (JSON)
     """
-    # a local store for s3 clients so that we may re-use clients for an AWS region
-    s3_regional_clients: Dict[Any, Any] = {}
+    # Clients are shared by the executor's threads, so they must be created through the thread-safe client cache.
+    boto3_session = get_cached_boto3_session(boto3_session)
 
     BucketDetail = Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any]]
 
-    async def _get_bucket_detail(bucket: Dict[str, Any]) -> BucketDetail:
+    def _get_bucket_detail(bucket: Dict[str, Any]) -> BucketDetail:
         # Note: bucket['Region'] is sometimes None because
         # client.get_bucket_location() does not return a location constraint for buckets
         # in us-east-1 region
-        client = s3_regional_clients.get(bucket['Region'])
-        if not client:
-            client = boto3_session.client('s3', bucket['Region'])
-            s3_regional_clients[bucket['Region']] = client
-        (
-            acl,
-            policy,
-            encryption,
-            versioning,
-            public_access_block,
-        ) = await asyncio.gather(
-            to_asynchronous(get_acl, bucket, client),
-            to_asynchronous(get_policy, bucket, client),
-            to_asynchronous(get_encryption, bucket, client),
-            to_asynchronous(get_versioning, bucket, client),
-            to_asynchronous(get_public_access_block, bucket, client),
-        )
+        client = boto3_session.client('s3', bucket['Region'])
+        acl = get_acl(bucket, client)
+        policy = get_policy(bucket, client)
+        encryption = get_encryption(bucket, client)
+        versioning = get_versioning(bucket, client)
+        public_access_block = get_public_access_block(bucket, client)
         return bucket['Name'], acl, policy, encryption, versioning, public_access_block
 
-    bucket_details = to_synchronous(*[_get_bucket_detail(bucket) for bucket in bucket_data['Buckets']])
-    yield from bucket_details
+    # Stream the details of a bounded number of buckets at a time instead of requesting all buckets at once.
+    yield from get_bounded_executor().map_unordered('s3', _get_bucket_detail, bucket_data['Buckets'])
 
 
 @timeit
@@ -5,6 +5,7 @@ from typing import List
 import boto3
 import neo4j
 
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
 from cartography.util import dict_date_to_epoch
 from cartography.util import run_cleanup_job
@@ -77,8 +78,7 @@ def sync(
     neo4j_session: neo4j.Session, boto3_session: boto3.session.Session, regions: List[str], current_aws_account_id: str,
     update_tag: int, common_job_parameters: Dict,
 ) -> None:
-    for region in regions:
+    for region, secrets in aws_fan_out_regions(get_secret_list, boto3_session, regions):
         logger.info("Syncing Secrets Manager for region '%s' in account '%s'.", region, current_aws_account_id)
-        secrets = get_secret_list(boto3_session, region)
         load_secrets(neo4j_session, secrets, region, current_aws_account_id, update_tag)
     cleanup_secrets(neo4j_session, common_job_parameters)
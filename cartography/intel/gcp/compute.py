@@ -3,17 +3,27 @@
 import json
 import logging
 from collections import namedtuple
-from string import Template
 from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
 from typing import Set
+from typing import Tuple
 
 import neo4j
 from googleapiclient.discovery import HttpError
 from googleapiclient.discovery import Resource
 
+from cartography.client.core.tx import load
+from cartography.models.gcp.compute.firewall import GCPFirewallSchema
+from cartography.models.gcp.compute.instance import GCPInstanceSchema
+from cartography.models.gcp.compute.ip_rule import GCPIpRangeSchema
+from cartography.models.gcp.compute.ip_rule import GCPIpRuleSchema
+from cartography.models.gcp.compute.network_interface import GCPNetworkInterfaceSchema
+from cartography.models.gcp.compute.network_tag import GCPNetworkTagSchema
+from cartography.models.gcp.compute.nic_access_config import GCPNicAccessConfigSchema
+from cartography.models.gcp.compute.vpc_reference import GCPSubnetReferenceSchema
+from cartography.models.gcp.compute.vpc_reference import GCPVpcReferenceSchema
 from cartography.util import run_cleanup_job
 from cartography.util import timeit
 
@@ -496,52 +506,107 @@ def _parse_port_string_to_rule(port: Optional[str], protocol: str, fw_partial_ur
     }
 
 
+def transform_gcp_nics(instances: List[Dict]) -> List[Dict]:
+    """
+    Flattens the network interfaces of the given instances to one dict per NIC.
+    :param instances: The output of transform_gcp_instances()
+    :return: A list of NICs, each with `nic_id` and the `instance_partial_uri` of its instance
+    """
+    nics = []
+    for instance in instances:
+        for nic in instance.get('networkInterfaces', []):
+            # Make an ID for GCPNetworkInterface nodes because GCP doesn't define one but we need to uniquely identify
+            # them
+            nics.append({
+                **nic,
+                'nic_id': f"{instance['partial_uri']}/networkinterfaces/{nic['name']}",
+                'instance_partial_uri': instance['partial_uri'],
+            })
+    return nics
+
+
+def transform_gcp_nic_access_configs(nics: List[Dict]) -> List[Dict]:
+    """
+    Flattens the access configurations of the given NICs to one dict per access configuration.
+    :param nics: The output of transform_gcp_nics()
+    :return: A list of access configurations, each with `access_config_id` and the `nic_id` of its NIC
+    """
+    access_configs = []
+    for nic in nics:
+        for ac in nic.get('accessConfigs', []):
+            # Make an ID for GCPNicAccessConfig nodes because GCP doesn't define one but we need to uniquely identify
+            # them
+            access_configs.append({
+                **ac,
+                'access_config_id': f"{nic['nic_id']}/accessconfigs/{ac['type']}",
+                'nic_id': nic['nic_id'],
+            })
+    return access_configs
+
+
+def transform_gcp_vpc_references(data: List[Dict]) -> List[Dict]:
+    """
+    :param data: NICs from transform_gcp_nics() or firewalls from transform_gcp_firewall()
+    :return: One dict per distinct `vpc_partial_uri` in the given data, to load with GCPVpcReferenceSchema
+    """
+    vpc_partial_uris = dict.fromkeys(d['vpc_partial_uri'] for d in data)
+    return [{'vpc_partial_uri': vpc_partial_uri} for vpc_partial_uri in vpc_partial_uris]
+
+
+def transform_gcp_subnet_references(nics: List[Dict]) -> List[Dict]:
+    """
+    :param nics: The output of transform_gcp_nics()
+    :return: One dict per distinct subnet of the given NICs, with the `vpc_partial_uri` of its VPC, to load with
+    GCPSubnetReferenceSchema
+    """
+    subnets = {
+        nic['subnet_partial_uri']: {
+            'subnet_partial_uri': nic['subnet_partial_uri'],
+            'vpc_partial_uri': nic['vpc_partial_uri'],
+        } for nic in nics
+    }
+    return list(subnets.values())
+
+
+def transform_gcp_instance_tags(instances: List[Dict]) -> List[Dict]:
+    """
+    Flattens the network tags of the given instances to one dict per tag and NIC, since a tag is defined in the VPC of
+    each of the instance's NICs.
+    :param instances: The output of transform_gcp_instances()
+    :return: A list of network tags to load with GCPNetworkTagSchema
+    """
+    tags = []
+    for instance in instances:
+        for tag in instance.get('tags', {}).get('items', []):
+            for nic in instance.get('networkInterfaces', []):
+                tags.append({
+                    'tag_id': _create_gcp_network_tag_id(nic['vpc_partial_uri'], tag),
+                    'value': tag,
+                    'instance_partial_uri': instance['partial_uri'],
+                    'vpc_partial_uri': nic['vpc_partial_uri'],
+                })
+    return tags
+
+
 @timeit
 def load_gcp_instances(neo4j_session: neo4j.Session, data: List[Dict], gcp_update_tag: int) -> None:
     """
-    Ingest GCP instance objects to Neo4j
+    Ingest GCP instance objects, their network interfaces, access configurations and tags to Neo4j
     :param neo4j_session: The Neo4j session object
     :param data: List of GCP instances to ingest. Basically the output of
     https://cloud.google.com/compute/docs/reference/rest/v1/instances/list
     :param gcp_update_tag: The timestamp value to set our new Neo4j nodes with
     :return: Nothing
     """
-    query = """
-    MERGE (p:GCPProject{id:$ProjectId})
-    ON CREATE SET p.firstseen = timestamp()
-    SET p.lastupdated = $gcp_update_tag
-
-    MERGE (i:Instance:GCPInstance{id:$PartialUri})
-    ON CREATE SET i.firstseen = timestamp(),
-    i.partial_uri = $PartialUri
-    SET i.self_link = $SelfLink,
-    i.instancename = $InstanceName,
-    i.hostname = $Hostname,
-    i.zone_name = $ZoneName,
-    i.project_id = $ProjectId,
-    i.status = $Status,
-    i.lastupdated = $gcp_update_tag
-    WITH i, p
-
-    MERGE (p)-[r:RESOURCE]->(i)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $gcp_update_tag
-    """
-    for instance in data:
-        neo4j_session.run(
-            query,
-            ProjectId=instance['project_id'],
-            PartialUri=instance['partial_uri'],
-            SelfLink=instance['selfLink'],
-            InstanceName=instance['name'],
-            ZoneName=instance['zone_name'],
-            Hostname=instance.get('hostname', None),
-            Status=instance['status'],
-            gcp_update_tag=gcp_update_tag,
-        )
-        _attach_instance_tags(neo4j_session, instance, gcp_update_tag)
-        _attach_gcp_nics(neo4j_session, instance, gcp_update_tag)
-        _attach_gcp_vpc(neo4j_session, instance['partial_uri'], gcp_update_tag)
+    nics = transform_gcp_nics(data)
+    # NICs of a Shared VPC service project are part of subnets of the host project, which may not have been synced yet.
+    load(neo4j_session, GCPVpcReferenceSchema(), transform_gcp_vpc_references(nics), lastupdated=gcp_update_tag)
+    load(neo4j_session, GCPSubnetReferenceSchema(), transform_gcp_subnet_references(nics), lastupdated=gcp_update_tag)
+    load(neo4j_session, GCPInstanceSchema(), data, lastupdated=gcp_update_tag)
+    load(neo4j_session, GCPNetworkTagSchema(), transform_gcp_instance_tags(data), lastupdated=gcp_update_tag)
+    load(neo4j_session, GCPNetworkInterfaceSchema(), nics, lastupdated=gcp_update_tag)
+    load(neo4j_session, GCPNicAccessConfigSchema(), transform_gcp_nic_access_configs(nics), lastupdated=gcp_update_tag)
+    _attach_gcp_vpcs(neo4j_session, [instance['partial_uri'] for instance in data], gcp_update_tag)
 
 
 @timeit
@@ -742,150 +807,17 @@ def _attach_fwd_rule_to_vpc(neo4j_session: neo4j.Session, fwd: Dict, gcp_update_
 
 
 @timeit
-def _attach_instance_tags(neo4j_session: neo4j.Session, instance: Resource, gcp_update_tag: int) -> None:
-    """
-    Attach tags to GCP instance and to the VPCs that they are defined in.
-    :param neo4j_session: The session
-    :param instance: The instance object
-    :param gcp_update_tag: The timestamp
-    :return: Nothing
-    """
-    query = """
-    MATCH (i:GCPInstance{id:$InstanceId})
-
-    MERGE (t:GCPNetworkTag{id:$TagId})
-    ON CREATE SET t.tag_id = $TagId,
-    t.value = $TagValue,
-    t.firstseen = timestamp()
-    SET t.lastupdated = $gcp_update_tag
-
-    MERGE (i)-[h:TAGGED]->(t)
-    ON CREATE SET h.firstseen = timestamp()
-    SET h.lastupdated = $gcp_update_tag
-
-    WITH t
-    MATCH (vpc:GCPVpc{id:$VpcPartialUri})
-
-    MERGE (vpc)<-[d:DEFINED_IN]-(t)
-    ON CREATE SET d.firstseen = timestamp()
-    SET d.lastupdated = $gcp_update_tag
-    """
-    for tag in instance.get('tags', {}).get('items', []):
-        for nic in instance.get('networkInterfaces', []):
-            tag_id = _create_gcp_network_tag_id(nic['vpc_partial_uri'], tag)
-            neo4j_session.run(
-                query,
-                InstanceId=instance['partial_uri'],
-                TagId=tag_id,
-                TagValue=tag,
-                VpcPartialUri=nic['vpc_partial_uri'],
-                gcp_update_tag=gcp_update_tag,
-            )
-
-
-@timeit
-def _attach_gcp_nics(neo4j_session: neo4j.Session, instance: Resource, gcp_update_tag: int) -> None:
+def _attach_gcp_vpcs(neo4j_session: neo4j.Session, instance_ids: List[str], gcp_update_tag: int) -> None:
     """
-    Attach GCP Network Interfaces to GCP Instances and GCP Subnets.
-    Then, attach GCP Instances directly to VPCs.
-    :param neo4j_session: The Neo4j session
-    :param instance: The GCP instance
-    :param gcp_update_tag: Timestamp to set the nodes
-    :return: Nothing
-    """
-    query = """
-    MATCH (i:GCPInstance{id:$InstanceId})
-    MERGE (nic:GCPNetworkInterface:NetworkInterface{id:$NicId})
-    ON CREATE SET nic.firstseen = timestamp(),
-    nic.nic_id = $NicId
-    SET nic.private_ip = $NetworkIP,
-    nic.name = $NicName,
-    nic.lastupdated = $gcp_update_tag
-
-    MERGE (i)-[r:NETWORK_INTERFACE]->(nic)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $gcp_update_tag
-
-    MERGE (subnet:GCPSubnet{id:$SubnetPartialUri})
-    ON CREATE SET subnet.firstseen = timestamp(),
-    subnet.partial_uri = $SubnetPartialUri
-    SET subnet.lastupdated = $gcp_update_tag
-
-    MERGE (nic)-[p:PART_OF_SUBNET]->(subnet)
-    ON CREATE SET p.firstseen = timestamp()
-    SET p.lastupdated = $gcp_update_tag
-    """
-    for nic in instance.get('networkInterfaces', []):
-        # Make an ID for GCPNetworkInterface nodes because GCP doesn't define one but we need to uniquely identify them
-        nic_id = f"{instance['partial_uri']}/networkinterfaces/{nic['name']}"
-        neo4j_session.run(
-            query,
-            InstanceId=instance['partial_uri'],
-            NicId=nic_id,
-            NetworkIP=nic.get('networkIP'),
-            NicName=nic['name'],
-            gcp_update_tag=gcp_update_tag,
-            SubnetPartialUri=nic['subnet_partial_uri'],
-        )
-        _attach_gcp_nic_access_configs(neo4j_session, nic_id, nic, gcp_update_tag)
-
-
-@timeit
-def _attach_gcp_nic_access_configs(
-    neo4j_session: neo4j.Session, nic_id: str, nic: Resource, gcp_update_tag: int,
-) -> None:
-    """
-    Attach an access configuration to the GCP NIC.
-    :param neo4j_session: The Neo4j session
-    :param instance: The GCP instance
-    :param gcp_update_tag: The timestamp to set updated nodes to
-    :return: Nothing
-    """
-    query = """
-    MATCH (nic{id:$NicId})
-    MERGE (ac:GCPNicAccessConfig{id:$AccessConfigId})
-    ON CREATE SET ac.firstseen = timestamp(),
-    ac.access_config_id = $AccessConfigId
-    SET ac.type=$Type,
-    ac.name = $Name,
-    ac.public_ip = $NatIP,
-    ac.set_public_ptr = $SetPublicPtr,
-    ac.public_ptr_domain_name = $PublicPtrDomainName,
-    ac.network_tier = $NetworkTier,
-    ac.lastupdated = $gcp_update_tag
-
-    MERGE (nic)-[r:RESOURCE]->(ac)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $gcp_update_tag
-    """
-    for ac in nic.get('accessConfigs', []):
-        # Make an ID for GCPNicAccessConfig nodes because GCP doesn't define one but we need to uniquely identify them
-        access_config_id = f"{nic_id}/accessconfigs/{ac['type']}"
-        neo4j_session.run(
-            query,
-            NicId=nic_id,
-            AccessConfigId=access_config_id,
-            Type=ac['type'],
-            Name=ac['name'],
-            NatIP=ac.get('natIP', None),
-            SetPublicPtr=ac.get('setPublicPtr', None),
-            PublicPtrDomainName=ac.get('publicPtrDomainName', None),
-            NetworkTier=ac.get('networkTier', None),
-            gcp_update_tag=gcp_update_tag,
-        )
-
-
-@timeit
-def _attach_gcp_vpc(neo4j_session: neo4j.Session, instance_id: str, gcp_update_tag: int) -> None:
-    """
-    Attach a GCP instance directly to a VPC
+    Attach GCP instances directly to the VPCs of their NICs' subnets
     :param neo4j_session: neo4j_session
-    :param instance: The GCP instance object
+    :param instance_ids: The partial URIs of the GCP instances
     :param gcp_update_tag:
     :return: Nothing
     """
     query = """
-    MATCH (i:GCPInstance{id:$InstanceId})-[:NETWORK_INTERFACE]->(nic:GCPNetworkInterface)
+    UNWIND $InstanceIds AS instance_id
+    MATCH (i:GCPInstance{id:instance_id})-[:NETWORK_INTERFACE]->(nic:GCPNetworkInterface)
           -[p:PART_OF_SUBNET]->(sn:GCPSubnet)<-[r:RESOURCE]-(vpc:GCPVpc)
     MERGE (i)-[m:MEMBER_OF_GCP_VPC]->(vpc)
     ON CREATE SET m.firstseen = timestamp()
@@ -893,142 +825,71 @@ def _attach_gcp_vpc(neo4j_session: neo4j.Session, instance_id: str, gcp_update_t
     """
     neo4j_session.run(
         query,
-        InstanceId=instance_id,
+        InstanceIds=instance_ids,
         gcp_update_tag=gcp_update_tag,
     )
 
 
-@timeit
-def load_gcp_ingress_firewalls(neo4j_session: neo4j.Session, fw_list: List[Resource], gcp_update_tag: int) -> None:
+def transform_gcp_firewall_ip_rules(fw_list: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
     """
-    Load the firewall list to Neo4j
-    :param fw_list: The transformed list of firewalls
-    :return: Nothing
-    """
-    query = """
-    MERGE (fw:GCPFirewall{id:$FwPartialUri})
-    ON CREATE SET fw.firstseen = timestamp(),
-    fw.partial_uri = $FwPartialUri
-    SET fw.direction = $Direction,
-    fw.disabled = $Disabled,
-    fw.name = $Name,
-    fw.priority = $Priority,
-    fw.self_link = $SelfLink,
-    fw.has_target_service_accounts = $HasTargetServiceAccounts,
-    fw.lastupdated = $gcp_update_tag
-
-    MERGE (vpc:GCPVpc{id:$VpcPartialUri})
-    ON CREATE SET vpc.firstseen = timestamp(),
-    vpc.partial_uri = $VpcPartialUri
-    SET vpc.lastupdated = $gcp_update_tag
-
-    MERGE (vpc)-[r:RESOURCE]->(fw)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $gcp_update_tag
+    Flattens the allow and deny rules of the given firewalls.
+    It is possible for sourceRanges to not be specified for a firewall. If sourceRanges is not specified then the
+    firewall must specify sourceTags. Since an IP range cannot have a tag applied to it, it is ok if we don't ingest the
+    rules of such firewalls.
+    :param fw_list: The output of transform_gcp_firewall()
+    :return: A tuple of the rules to load with GCPIpRuleSchema and the source ranges to load with GCPIpRangeSchema
     """
+    rules = []
+    ranges = []
     for fw in fw_list:
-        neo4j_session.run(
-            query,
-            FwPartialUri=fw['id'],
-            Direction=fw['direction'],
-            Disabled=fw['disabled'],
-            Name=fw['name'],
-            Priority=fw['priority'],
-            SelfLink=fw['selfLink'],
-            VpcPartialUri=fw['vpc_partial_uri'],
-            HasTargetServiceAccounts=fw['has_target_service_accounts'],
-            gcp_update_tag=gcp_update_tag,
-        )
-        _attach_firewall_rules(neo4j_session, fw, gcp_update_tag)
-        _attach_target_tags(neo4j_session, fw, gcp_update_tag)
+        source_ranges = fw.get('sourceRanges', [])
+        if not source_ranges:
+            continue
+        for list_type, fw_key in (
+            ('transformed_allow_list', 'allowed_by_fw_partial_uri'),
+            ('transformed_deny_list', 'denied_by_fw_partial_uri'),
+        ):
+            for rule in fw[list_type]:
+                rules.append({
+                    'ruleid': rule['ruleid'],
+                    'protocol': rule['protocol'],
+                    'fromport': rule.get('fromport'),
+                    'toport': rule.get('toport'),
+                    fw_key: fw['id'],
+                })
+                ranges.extend({'range': ip_range, 'ruleid': rule['ruleid']} for ip_range in source_ranges)
+    return rules, ranges
+
+
+def transform_gcp_firewall_target_tags(fw_list: List[Dict]) -> List[Dict]:
+    """
+    :param fw_list: The output of transform_gcp_firewall()
+    :return: One dict per firewall and target tag, to load with GCPNetworkTagSchema
+    """
+    return [
+        {
+            'tag_id': _create_gcp_network_tag_id(fw['vpc_partial_uri'], tag),
+            'value': tag,
+            'firewall_partial_uri': fw['id'],
+        }
+        for fw in fw_list
+        for tag in fw.get('targetTags', [])
+    ]
 
 
 @timeit
-def _attach_firewall_rules(neo4j_session: neo4j.Session, fw: Resource, gcp_update_tag: int) -> None:
-    """
-    Attach the allow_rules to the Firewall object
-    :param neo4j_session: The Neo4j session
-    :param fw: The Firewall object
-    :param gcp_update_tag: The timestamp
-    :return: Nothing
-    """
-    template = Template("""
-    MATCH (fw:GCPFirewall{id:$FwPartialUri})
-
-    MERGE (rule:IpRule:IpPermissionInbound:GCPIpRule{id:$RuleId})
-    ON CREATE SET rule.firstseen = timestamp(),
-    rule.ruleid = $RuleId
-    SET rule.protocol = $Protocol,
-    rule.fromport = $FromPort,
-    rule.toport = $ToPort,
-    rule.lastupdated = $gcp_update_tag
-
-    MERGE (rng:IpRange{id:$Range})
-    ON CREATE SET rng.firstseen = timestamp(),
-    rng.range = $Range
-    SET rng.lastupdated = $gcp_update_tag
-
-    MERGE (rng)-[m:MEMBER_OF_IP_RULE]->(rule)
-    ON CREATE SET m.firstseen = timestamp()
-    SET m.lastupdated = $gcp_update_tag
-
-    MERGE (fw)<-[r:$fw_rule_relationship_label]-(rule)
-    ON CREATE SET r.firstseen = timestamp()
-    SET r.lastupdated = $gcp_update_tag
-    """)
-    for list_type in 'transformed_allow_list', 'transformed_deny_list':
-        if list_type == 'transformed_allow_list':
-            label = "ALLOWED_BY"
-        else:
-            label = "DENIED_BY"
-        for rule in fw[list_type]:
-            # It is possible for sourceRanges to not be specified for this rule
-            # If sourceRanges is not specified then the rule must specify sourceTags.
-            # Since an IP range cannot have a tag applied to it, it is ok if we don't ingest this rule.
-            for ip_range in fw.get('sourceRanges', []):
-                neo4j_session.run(
-                    template.safe_substitute(fw_rule_relationship_label=label),
-                    FwPartialUri=fw['id'],
-                    RuleId=rule['ruleid'],
-                    Protocol=rule['protocol'],
-                    FromPort=rule.get('fromport'),
-                    ToPort=rule.get('toport'),
-                    Range=ip_range,
-                    gcp_update_tag=gcp_update_tag,
-                )
-
-
-@timeit
-def _attach_target_tags(neo4j_session: neo4j.Session, fw: Resource, gcp_update_tag: int) -> None:
+def load_gcp_ingress_firewalls(neo4j_session: neo4j.Session, fw_list: List[Resource], gcp_update_tag: int) -> None:
     """
-    Attach target tags to the firewall object
-    :param neo4j_session: The neo4j session
-    :param fw: The firewall object
-    :param gcp_update_tag: The timestamp
+    Load the firewall list, the firewalls' rules and source ranges, and their target tags to Neo4j
+    :param fw_list: The transformed list of firewalls
     :return: Nothing
     """
-    query = """
-    MATCH (fw:GCPFirewall{id:$FwPartialUri})
-
-    MERGE (t:GCPNetworkTag{id:$TagId})
-    ON CREATE SET t.firstseen = timestamp(),
-    t.tag_id = $TagId,
-    t.value = $TagValue
-    SET t.lastupdated = $gcp_update_tag
-
-    MERGE (fw)-[h:TARGET_TAG]->(t)
-    ON CREATE SET h.firstseen = timestamp()
-    SET h.lastupdated = $gcp_update_tag
-    """
-    for tag in fw.get('targetTags', []):
-        tag_id = _create_gcp_network_tag_id(fw['vpc_partial_uri'], tag)
-        neo4j_session.run(
-            query,
-            FwPartialUri=fw['id'],
-            TagId=tag_id,
-            TagValue=tag,
-            gcp_update_tag=gcp_update_tag,
-        )
+    rules, ranges = transform_gcp_firewall_ip_rules(fw_list)
+    load(neo4j_session, GCPVpcReferenceSchema(), transform_gcp_vpc_references(fw_list), lastupdated=gcp_update_tag)
+    load(neo4j_session, GCPFirewallSchema(), fw_list, lastupdated=gcp_update_tag)
+    load(neo4j_session, GCPIpRuleSchema(), rules, lastupdated=gcp_update_tag)
+    load(neo4j_session, GCPIpRangeSchema(), ranges, lastupdated=gcp_update_tag)
+    load(neo4j_session, GCPNetworkTagSchema(), transform_gcp_firewall_target_tags(fw_list), lastupdated=gcp_update_tag)
 
 
 @timeit
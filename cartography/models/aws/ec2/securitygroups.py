@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+
+from cartography.models.aws.ec2.securitygroup_instance import EC2SecurityGroupToAWSAccount
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class EC2SecurityGroupNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('GroupId')
+    groupid: PropertyRef = PropertyRef('GroupId', extra_index=True)
+    name: PropertyRef = PropertyRef('GroupName')
+    description: PropertyRef = PropertyRef('Description')
+    region: PropertyRef = PropertyRef('Region', set_in_kwargs=True)
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class EC2SecurityGroupToAWSVpcRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class EC2SecurityGroupToAWSVpc(CartographyRelSchema):
+    target_node_label: str = 'AWSVpc'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('VpcId')},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "MEMBER_OF_EC2_SECURITY_GROUP"
+    properties: EC2SecurityGroupToAWSVpcRelProperties = EC2SecurityGroupToAWSVpcRelProperties()
+
+
+@dataclass(frozen=True)
+class EC2SecurityGroupSchema(CartographyNodeSchema):
+    """
+    Security groups as known by describe-security-groups
+    """
+    label: str = 'EC2SecurityGroup'
+    properties: EC2SecurityGroupNodeProperties = EC2SecurityGroupNodeProperties()
+    sub_resource_relationship: EC2SecurityGroupToAWSAccount = EC2SecurityGroupToAWSAccount()
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            EC2SecurityGroupToAWSVpc(),
+        ],
+    )
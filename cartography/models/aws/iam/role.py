@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.nodes import ExtraNodeLabels
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class AWSRoleNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('Arn')
+    arn: PropertyRef = PropertyRef('Arn', extra_index=True)
+    roleid: PropertyRef = PropertyRef('RoleId')
+    name: PropertyRef = PropertyRef('RoleName')
+    path: PropertyRef = PropertyRef('Path')
+    createdate: PropertyRef = PropertyRef('CreateDate')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSRoleToAwsAccountRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSRoleToAWSAccount(CartographyRelSchema):
+    target_node_label: str = 'AWSAccount'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('AWS_ID', set_in_kwargs=True)},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "RESOURCE"
+    properties: AWSRoleToAwsAccountRelProperties = AWSRoleToAwsAccountRelProperties()
+
+
+@dataclass(frozen=True)
+class AWSRoleToAWSPrincipalRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSRoleToAWSPrincipal(CartographyRelSchema):
+    target_node_label: str = 'AWSPrincipal'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('TrustedPrincipalArn')},
+    )
+    direction: LinkDirection = LinkDirection.OUTWARD
+    rel_label: str = "TRUSTS_AWS_PRINCIPAL"
+    properties: AWSRoleToAWSPrincipalRelProperties = AWSRoleToAWSPrincipalRelProperties()
+
+
+@dataclass(frozen=True)
+class AWSRoleSchema(CartographyNodeSchema):
+    # Roles are merged on the AWSPrincipal label so that principals that were discovered before their role was synced,
+    # e.g. from the trust policy of a role in another account, become the AWSRole instead of a duplicate of it.
+    label: str = 'AWSPrincipal'
+    extra_node_labels: ExtraNodeLabels = ExtraNodeLabels(['AWSRole'])
+    properties: AWSRoleNodeProperties = AWSRoleNodeProperties()
+    sub_resource_relationship: AWSRoleToAWSAccount = AWSRoleToAWSAccount()
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            AWSRoleToAWSPrincipal(),
+        ],
+    )
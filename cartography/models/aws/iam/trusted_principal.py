@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class AWSTrustedPrincipalAccountNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('account_id')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSTrustedPrincipalAccountSchema(CartographyNodeSchema):
+    """
+    The AWSAccounts that the principals trusted by a role belong to. We are agnostic here about whether the account is
+    in the sync scope or a foreign account: the `inscope` attribute is set when the account itself is synced, and the
+    `foreign` attribute is assigned by the aws_foreign_accounts.json analysis job.
+    """
+    label: str = 'AWSAccount'
+    properties: AWSTrustedPrincipalAccountNodeProperties = AWSTrustedPrincipalAccountNodeProperties()
+
+
+@dataclass(frozen=True)
+class AWSTrustedPrincipalNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('arn')
+    arn: PropertyRef = PropertyRef('arn', extra_index=True)
+    type: PropertyRef = PropertyRef('type')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSTrustedPrincipalToAwsAccountRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSTrustedPrincipalToAWSAccount(CartographyRelSchema):
+    target_node_label: str = 'AWSAccount'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('account_id')},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "RESOURCE"
+    properties: AWSTrustedPrincipalToAwsAccountRelProperties = AWSTrustedPrincipalToAwsAccountRelProperties()
+
+
+@dataclass(frozen=True)
+class AWSTrustedPrincipalSchema(CartographyNodeSchema):
+    """
+    A principal named in the trust policy of an AWSRole. The principal may be in another account, or not be an account
+    principal at all, e.g. a service principal like ec2.amazonaws.com. So it is attached to the account that its ARN
+    names, if any, rather than to the account being synced, and it has no sub resource. Stale trusted principals are
+    cleaned up by aws_import_principals_cleanup.json and aws_post_ingestion_principals_cleanup.json.
+    """
+    label: str = 'AWSPrincipal'
+    properties: AWSTrustedPrincipalNodeProperties = AWSTrustedPrincipalNodeProperties()
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            AWSTrustedPrincipalToAWSAccount(),
+        ],
+    )
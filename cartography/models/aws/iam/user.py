@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.nodes import ExtraNodeLabels
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class AWSUserNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('Arn')
+    arn: PropertyRef = PropertyRef('Arn', extra_index=True)
+    userid: PropertyRef = PropertyRef('UserId')
+    name: PropertyRef = PropertyRef('UserName')
+    path: PropertyRef = PropertyRef('Path')
+    createdate: PropertyRef = PropertyRef('CreateDate')
+    passwordlastused: PropertyRef = PropertyRef('PasswordLastUsed')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSUserToAwsAccountRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSUserToAWSAccount(CartographyRelSchema):
+    target_node_label: str = 'AWSAccount'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('AWS_ID', set_in_kwargs=True)},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "RESOURCE"
+    properties: AWSUserToAwsAccountRelProperties = AWSUserToAwsAccountRelProperties()
+
+
+@dataclass(frozen=True)
+class AWSUserSchema(CartographyNodeSchema):
+    label: str = 'AWSUser'
+    extra_node_labels: ExtraNodeLabels = ExtraNodeLabels(['AWSPrincipal'])
+    properties: AWSUserNodeProperties = AWSUserNodeProperties()
+    sub_resource_relationship: AWSUserToAWSAccount = AWSUserToAWSAccount()
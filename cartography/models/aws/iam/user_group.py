@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.nodes import ExtraNodeLabels
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class AWSUserGroupNodeProperties(CartographyNodeProperties):
+    """
+    Selection of properties of an AWSUser that is a member of an AWSGroup. The rest of the user's properties are set by
+    AWSUserSchema.
+    """
+    id: PropertyRef = PropertyRef('UserArn')
+    arn: PropertyRef = PropertyRef('UserArn', extra_index=True)
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSUserGroupToAwsAccountRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSUserGroupToAWSAccount(CartographyRelSchema):
+    target_node_label: str = 'AWSAccount'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('AWS_ID', set_in_kwargs=True)},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "RESOURCE"
+    properties: AWSUserGroupToAwsAccountRelProperties = AWSUserGroupToAwsAccountRelProperties()
+
+
+@dataclass(frozen=True)
+class AWSUserToAWSGroupRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class AWSUserToAWSGroup(CartographyRelSchema):
+    target_node_label: str = 'AWSGroup'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('GroupArn')},
+    )
+    direction: LinkDirection = LinkDirection.OUTWARD
+    rel_label: str = "MEMBER_AWS_GROUP"
+    properties: AWSUserToAWSGroupRelProperties = AWSUserToAWSGroupRelProperties()
+
+
+@dataclass(frozen=True)
+class AWSUserGroupSchema(CartographyNodeSchema):
+    label: str = 'AWSUser'
+    extra_node_labels: ExtraNodeLabels = ExtraNodeLabels(['AWSPrincipal'])
+    properties: AWSUserGroupNodeProperties = AWSUserGroupNodeProperties()
+    sub_resource_relationship: AWSUserGroupToAWSAccount = AWSUserGroupToAWSAccount()
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            AWSUserToAWSGroup(),
+        ],
+    )
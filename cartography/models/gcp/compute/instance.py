@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.nodes import ExtraNodeLabels
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class GCPInstanceNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('partial_uri')
+    partial_uri: PropertyRef = PropertyRef('partial_uri')
+    self_link: PropertyRef = PropertyRef('selfLink')
+    instancename: PropertyRef = PropertyRef('name')
+    hostname: PropertyRef = PropertyRef('hostname')
+    zone_name: PropertyRef = PropertyRef('zone_name')
+    project_id: PropertyRef = PropertyRef('project_id')
+    status: PropertyRef = PropertyRef('status')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPInstanceToGCPProjectRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPInstanceToGCPProject(CartographyRelSchema):
+    target_node_label: str = 'GCPProject'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('project_id')},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "RESOURCE"
+    properties: GCPInstanceToGCPProjectRelProperties = GCPInstanceToGCPProjectRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPInstanceSchema(CartographyNodeSchema):
+    label: str = 'GCPInstance'
+    extra_node_labels: ExtraNodeLabels = ExtraNodeLabels(['Instance'])
+    properties: GCPInstanceNodeProperties = GCPInstanceNodeProperties()
+    # Instances are cleaned up by gcp_compute_instance_cleanup.json, which is not scoped to a project yet (see
+    # https://github.com/lyft/cartography/issues/381), so the project is not modeled as the sub resource.
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            GCPInstanceToGCPProject(),
+        ],
+    )
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.nodes import ExtraNodeLabels
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class GCPIpRuleNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('ruleid')
+    ruleid: PropertyRef = PropertyRef('ruleid')
+    protocol: PropertyRef = PropertyRef('protocol')
+    fromport: PropertyRef = PropertyRef('fromport')
+    toport: PropertyRef = PropertyRef('toport')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPIpRuleToGCPFirewallRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPIpRuleAllowedByGCPFirewall(CartographyRelSchema):
+    target_node_label: str = 'GCPFirewall'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('allowed_by_fw_partial_uri')},
+    )
+    direction: LinkDirection = LinkDirection.OUTWARD
+    rel_label: str = "ALLOWED_BY"
+    properties: GCPIpRuleToGCPFirewallRelProperties = GCPIpRuleToGCPFirewallRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPIpRuleDeniedByGCPFirewall(CartographyRelSchema):
+    target_node_label: str = 'GCPFirewall'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('denied_by_fw_partial_uri')},
+    )
+    direction: LinkDirection = LinkDirection.OUTWARD
+    rel_label: str = "DENIED_BY"
+    properties: GCPIpRuleToGCPFirewallRelProperties = GCPIpRuleToGCPFirewallRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPIpRuleSchema(CartographyNodeSchema):
+    """
+    An allow or deny entry of a GCP firewall for one protocol and port range. Each row sets exactly one of
+    `allowed_by_fw_partial_uri` and `denied_by_fw_partial_uri`.
+    """
+    label: str = 'GCPIpRule'
+    extra_node_labels: ExtraNodeLabels = ExtraNodeLabels(['IpRule', 'IpPermissionInbound'])
+    properties: GCPIpRuleNodeProperties = GCPIpRuleNodeProperties()
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            GCPIpRuleAllowedByGCPFirewall(),
+            GCPIpRuleDeniedByGCPFirewall(),
+        ],
+    )
+
+
+@dataclass(frozen=True)
+class GCPIpRangeNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('range')
+    range: PropertyRef = PropertyRef('range')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPIpRangeToGCPIpRuleRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPIpRangeToGCPIpRule(CartographyRelSchema):
+    target_node_label: str = 'GCPIpRule'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('ruleid')},
+    )
+    direction: LinkDirection = LinkDirection.OUTWARD
+    rel_label: str = "MEMBER_OF_IP_RULE"
+    properties: GCPIpRangeToGCPIpRuleRelProperties = GCPIpRangeToGCPIpRuleRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPIpRangeSchema(CartographyNodeSchema):
+    """
+    The source ranges of GCP firewalls. IpRange nodes are shared with the AWS security group rules.
+    """
+    label: str = 'IpRange'
+    properties: GCPIpRangeNodeProperties = GCPIpRangeNodeProperties()
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            GCPIpRangeToGCPIpRule(),
+        ],
+    )
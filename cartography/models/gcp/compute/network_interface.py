@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.nodes import ExtraNodeLabels
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class GCPNetworkInterfaceNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('nic_id')
+    nic_id: PropertyRef = PropertyRef('nic_id')
+    private_ip: PropertyRef = PropertyRef('networkIP')
+    name: PropertyRef = PropertyRef('name')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPNetworkInterfaceToGCPInstanceRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPNetworkInterfaceToGCPInstance(CartographyRelSchema):
+    target_node_label: str = 'GCPInstance'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('instance_partial_uri')},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "NETWORK_INTERFACE"
+    properties: GCPNetworkInterfaceToGCPInstanceRelProperties = GCPNetworkInterfaceToGCPInstanceRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPNetworkInterfaceToGCPSubnetRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPNetworkInterfaceToGCPSubnet(CartographyRelSchema):
+    target_node_label: str = 'GCPSubnet'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('subnet_partial_uri')},
+    )
+    direction: LinkDirection = LinkDirection.OUTWARD
+    rel_label: str = "PART_OF_SUBNET"
+    properties: GCPNetworkInterfaceToGCPSubnetRelProperties = GCPNetworkInterfaceToGCPSubnetRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPNetworkInterfaceSchema(CartographyNodeSchema):
+    label: str = 'GCPNetworkInterface'
+    extra_node_labels: ExtraNodeLabels = ExtraNodeLabels(['NetworkInterface'])
+    properties: GCPNetworkInterfaceNodeProperties = GCPNetworkInterfaceNodeProperties()
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            GCPNetworkInterfaceToGCPInstance(),
+            GCPNetworkInterfaceToGCPSubnet(),
+        ],
+    )
@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class GCPNetworkTagNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('tag_id')
+    tag_id: PropertyRef = PropertyRef('tag_id')
+    value: PropertyRef = PropertyRef('value')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPNetworkTagToGCPInstanceRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPNetworkTagToGCPInstance(CartographyRelSchema):
+    target_node_label: str = 'GCPInstance'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('instance_partial_uri')},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "TAGGED"
+    properties: GCPNetworkTagToGCPInstanceRelProperties = GCPNetworkTagToGCPInstanceRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPNetworkTagToGCPVpcRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPNetworkTagToGCPVpc(CartographyRelSchema):
+    target_node_label: str = 'GCPVpc'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('vpc_partial_uri')},
+    )
+    direction: LinkDirection = LinkDirection.OUTWARD
+    rel_label: str = "DEFINED_IN"
+    properties: GCPNetworkTagToGCPVpcRelProperties = GCPNetworkTagToGCPVpcRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPNetworkTagToGCPFirewallRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPNetworkTagToGCPFirewall(CartographyRelSchema):
+    target_node_label: str = 'GCPFirewall'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('firewall_partial_uri')},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "TARGET_TAG"
+    properties: GCPNetworkTagToGCPFirewallRelProperties = GCPNetworkTagToGCPFirewallRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPNetworkTagSchema(CartographyNodeSchema):
+    """
+    Network tags are applied to instances and defined in the VPCs of the instances' NICs, and firewalls target them.
+    A row only creates the relationships whose target is set: instance tags set `instance_partial_uri` and
+    `vpc_partial_uri`, and firewall target tags set `firewall_partial_uri`.
+    """
+    label: str = 'GCPNetworkTag'
+    properties: GCPNetworkTagNodeProperties = GCPNetworkTagNodeProperties()
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            GCPNetworkTagToGCPInstance(),
+            GCPNetworkTagToGCPVpc(),
+            GCPNetworkTagToGCPFirewall(),
+        ],
+    )
@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class GCPVpcReferenceNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('vpc_partial_uri')
+    partial_uri: PropertyRef = PropertyRef('vpc_partial_uri')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPVpcReferenceSchema(CartographyNodeSchema):
+    """
+    VPCs that network interfaces, network tags and firewalls refer to. With Shared VPC, a NIC in a service project is
+    attached to a VPC of the host project, which may not have been synced yet. So the VPC is MERGEd with only its id,
+    and the rest of its properties are set when its own project is synced.
+    """
+    label: str = 'GCPVpc'
+    properties: GCPVpcReferenceNodeProperties = GCPVpcReferenceNodeProperties()
+
+
+@dataclass(frozen=True)
+class GCPSubnetReferenceNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('subnet_partial_uri')
+    partial_uri: PropertyRef = PropertyRef('subnet_partial_uri')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPSubnetReferenceToGCPVpcRelProperties(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class GCPSubnetReferenceToGCPVpc(CartographyRelSchema):
+    target_node_label: str = 'GCPVpc'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('vpc_partial_uri')},
+    )
+    direction: LinkDirection = LinkDirection.INWARD
+    rel_label: str = "RESOURCE"
+    properties: GCPSubnetReferenceToGCPVpcRelProperties = GCPSubnetReferenceToGCPVpcRelProperties()
+
+
+@dataclass(frozen=True)
+class GCPSubnetReferenceSchema(CartographyNodeSchema):
+    """
+    Subnets that network interfaces are part of, which can belong to the host project of a Shared VPC, like
+    GCPVpcReferenceSchema. The subnet is attached to its VPC so that instances in a service project still become
+    members of the host project's VPC.
+    """
+    label: str = 'GCPSubnet'
+    properties: GCPSubnetReferenceNodeProperties = GCPSubnetReferenceNodeProperties()
+    other_relationships: OtherRelationships = OtherRelationships(
+        [
+            GCPSubnetReferenceToGCPVpc(),
+        ],
+    )
@@ -1,14 +1,19 @@
 import argparse
 import logging
+import multiprocessing
 import time
 from collections import OrderedDict
+from functools import partial
 from typing import Callable
+from typing import Dict
+from typing import Iterable
 from typing import List
+from typing import Optional
+from typing import Set
 from typing import Tuple
 from typing import Union
 
 import neo4j.exceptions
-from neo4j import GraphDatabase
 from statsd import StatsClient
 
 import cartography.intel.analysis
@@ -30,8 +35,35 @@ import cartography.intel.lastpass
 import cartography.intel.oci
 import cartography.intel.okta
 import cartography.intel.semgrep
+from cartography.client.core.session import build_neo4j_driver
+from cartography.client.core.session import Neo4jSessionFactory
+from cartography.client.core.session import set_session_factory
+from cartography.client.core.tx import get_bad_rows
+from cartography.client.core.tx import get_change_counts
+from cartography.client.core.tx import reset_bad_rows
+from cartography.client.core.tx import reset_change_counts
+from cartography.client.core.tx import reset_index_registry
+from cartography.client.core.tx import set_change_detection
+from cartography.client.core.tx import set_max_load_writers
+from cartography.client.core.tx import set_shared_node_lock
+from cartography.client.core.tx import set_two_phase_ingestion
 from cartography.config import Config
+from cartography.graph.bulkimport import BulkImportCsvExporter
+from cartography.graph.bulkimport import set_bulk_import_exporter
+from cartography.graph.job import set_max_concurrent_jobs
+from cartography.graph.jobregistry import get_job_registry
+from cartography.graph.statement import get_precheck_counts
+from cartography.graph.statement import reset_precheck_counts
+from cartography.graph.statement import set_adaptive_iterations
+from cartography.graph.statement import set_cleanup_precheck
+from cartography.graph.statement import set_server_side_iterations
 from cartography.stats import set_stats_client
+from cartography.util import DEFAULT_MAX_IN_FLIGHT_CALLS
+from cartography.util import get_bounded_executor
+from cartography.util import get_dependency_order
+from cartography.util import get_transitive_dependencies
+from cartography.util import reset_aws_rate_limiters
+from cartography.util import run_with_dependencies
 from cartography.util import STATUS_FAILURE
 from cartography.util import STATUS_SUCCESS
 
@@ -60,6 +92,27 @@ TOP_LEVEL_MODULES = OrderedDict({  # preserve order so that the default sync alw
     'analysis': cartography.intel.analysis.run,
 })
 
+# Stages that must have finished before a given stage is allowed to start, because the stage draws relationships to
+# nodes that they create. Every stage implicitly depends on `create-indexes`, and `analysis` implicitly depends on every
+# other stage; see `get_stage_dependencies()`. Dependencies are transitive, and only enforced between stages that are
+# actually part of a sync. tests/unit/cartography/test_sync.py checks these against the target labels of the schemas.
+STAGE_DEPENDENCIES: Dict[str, Set[str]] = {
+    # crxcavator attaches ChromeExtensions to GSuiteUser nodes.
+    'crxcavator': {'gsuite'},
+    # cve attaches CVEs to the SpotlightVulnerabilities of crowdstrike.
+    'cve': {'crowdstrike'},
+    # duo attaches DuoUsers to the Humans of okta.
+    'duo': {'okta'},
+    # lastpass attaches LastpassUsers to the Humans of okta.
+    'lastpass': {'okta'},
+    # okta draws ALLOWED_BY relationships from OktaGroups to AWSRoles.
+    'okta': {'aws'},
+    # semgrep attaches findings to GitHubRepositories, and to the CVEs of cve and crowdstrike.
+    'semgrep': {'github', 'cve'},
+}
+FIRST_STAGES = {'create-indexes'}
+LAST_STAGES = {'analysis'}
+
 
 class Sync:
     """
@@ -68,14 +121,16 @@ class Sync:
     The role of the sync task is to ensure the data in the graph database represents reality. It does this by executing
     a sequence of sync "stages" which are responsible for retrieving data from various sources (APIs, files, etc.),
     pushing that data to Neo4j, and removing now-invalid nodes and relationships from the graph. An instance of this
-    class can be configured to run any number of stages in a specific order.
+    class can be configured to run any number of stages in a specific order. Stages may declare the other stages they
+    depend on; stages whose dependencies are satisfied can then be run concurrently.
     """
 
     def __init__(self):
         # NOTE we may need meta-stages at some point to allow hooking into pre-sync, sync, and post-sync
         self._stages = OrderedDict()
+        self._dependencies: Dict[str, Set[str]] = {}
 
-    def add_stage(self, name: str, func: Callable) -> None:
+    def add_stage(self, name: str, func: Callable, depends_on: Optional[Iterable[str]] = None) -> None:
         """
         Add one stage to the sync task.
 
@@ -83,8 +138,12 @@ class Sync:
         :param name: The name of the stage.
         :type func: Callable
         :param func: The object to call when the stage is executed.
+        :type depends_on: Iterable[string]
+        :param depends_on: Optional. Names of stages that must finish before this stage starts. Dependencies on stages
+            that are not part of this sync are ignored.
         """
         self._stages[name] = func
+        self._dependencies[name] = set(depends_on) if depends_on else set()
 
     def add_stages(self, stages: List[Tuple[str, Callable]]) -> None:
         """
@@ -96,9 +155,28 @@ class Sync:
         for name, func in stages:
             self.add_stage(name, func)
 
+    def set_dependencies(self, dependencies: Dict[str, Set[str]]) -> None:
+        """
+        Declare dependencies for stages already added to the sync task.
+
+        :type dependencies: Dict[string, Set[string]]
+        :param dependencies: A mapping of stage name to the names of the stages that must finish before it starts.
+        """
+        for name, depends_on in dependencies.items():
+            if name in self._stages:
+                self._dependencies[name] = set(depends_on)
+
+    def _get_run_order(self) -> List[str]:
+        """
+        :return: The stage names in a dependency-respecting order. Ties are broken by the order in which stages were
+            added, so a sync without dependencies runs exactly in insertion order.
+        """
+        return get_dependency_order(self._stages.keys(), self._dependencies)
+
     def run(self, neo4j_driver: neo4j.Driver, config: Union[Config, argparse.Namespace]) -> int:
         """
-        Execute all stages in the sync task in sequence.
+        Execute all stages in the sync task. Stages run in sequence unless `config.max_concurrent_stages` is greater
+        than 1, in which case stages whose dependencies have finished run concurrently, each on its own Neo4j session.
 
         :type neo4j_driver: neo4j.Driver
         :param neo4j_driver: Neo4j driver object.
@@ -106,21 +184,132 @@ class Sync:
         :param config: Configuration for the sync run.
         """
         logger.info("Starting sync with update tag '%d'", config.update_tag)
-        with neo4j_driver.session(database=config.neo4j_database) as neo4j_session:
-            for stage_name, stage_func in self._stages.items():
-                logger.info("Starting sync stage '%s'", stage_name)
-                try:
-                    stage_func(neo4j_session, config)
-                except (KeyboardInterrupt, SystemExit):
-                    logger.warning("Sync interrupted during stage '%s'.", stage_name)
-                    raise
-                except Exception:
-                    logger.exception("Unhandled exception during sync stage '%s'", stage_name)
-                    raise  # TODO this should be configurable
-                logger.info("Finishing sync stage '%s'", stage_name)
+        # Parse and validate the packaged jobs once up front, so that a malformed job fails the sync before any stage
+        # has written to the graph.
+        get_job_registry()
+        # Allow stages to open their own sessions for concurrent work, see cartography.client.core.session.
+        set_session_factory(Neo4jSessionFactory(neo4j_driver, config.neo4j_database))
+        set_max_load_writers(getattr(config, 'max_load_writers', None) or 1)
+        reset_index_registry()
+        set_change_detection(bool(getattr(config, 'change_detection', False)))
+        set_two_phase_ingestion(bool(getattr(config, 'two_phase_ingestion', False)))
+        set_adaptive_iterations(bool(getattr(config, 'adaptive_iterations', False)))
+        set_server_side_iterations(bool(getattr(config, 'server_side_iterations', False)))
+        set_cleanup_precheck(bool(getattr(config, 'cleanup_precheck', False)))
+        set_max_concurrent_jobs(getattr(config, 'max_concurrent_jobs', None) or 1)
+        get_bounded_executor().set_default_max_in_flight(
+            getattr(config, 'aws_max_in_flight_calls', None) or DEFAULT_MAX_IN_FLIGHT_CALLS,
+        )
+        reset_change_counts()
+        reset_precheck_counts()
+        reset_aws_rate_limiters()
+        reset_bad_rows()
+        bulk_import_csv_dir = getattr(config, 'bulk_import_csv_dir', None)
+        exporter = BulkImportCsvExporter(bulk_import_csv_dir) if bulk_import_csv_dir else None
+        set_bulk_import_exporter(exporter)
+        max_concurrent_stages = getattr(config, 'max_concurrent_stages', None) or 1
+        if max_concurrent_stages > 1:
+            # Stages like aws and gcp MERGE the same IpRange nodes. A multiprocessing lock can also be handed to the
+            # worker processes of AWS accounts.
+            set_shared_node_lock(multiprocessing.RLock())
+        try:
+            if max_concurrent_stages > 1:
+                self._run_concurrently(neo4j_driver, config, max_concurrent_stages)
+            else:
+                with neo4j_driver.session(database=config.neo4j_database) as neo4j_session:
+                    for stage_name in self._get_run_order():
+                        _run_stage(stage_name, self._stages[stage_name], neo4j_session, config)
+        finally:
+            set_session_factory(None)
+            set_max_load_writers(1)
+            set_change_detection(False)
+            set_two_phase_ingestion(False)
+            set_adaptive_iterations(False)
+            set_server_side_iterations(False)
+            set_cleanup_precheck(False)
+            set_max_concurrent_jobs(1)
+            get_bounded_executor().set_default_max_in_flight(DEFAULT_MAX_IN_FLIGHT_CALLS)
+            set_bulk_import_exporter(None)
+            set_shared_node_lock(None)
+        if exporter:
+            paths = exporter.write()
+            logger.info("Wrote %d bulk import CSV files to '%s'.", len(paths), exporter.directory)
+        for schema_name, counts in sorted(get_change_counts().items()):
+            logger.info(
+                "Change detection for %s: %d nodes changed, %d unchanged.",
+                schema_name, counts['changed'], counts['unchanged'],
+            )
+        for job_name, counts in sorted(get_precheck_counts().items()):
+            logger.info(
+                "Cleanup precheck for %s: skipped %d deletes, ran %d.", job_name, counts['skipped'], counts['run'],
+            )
+        for stat_key, bad_rows in sorted(get_bad_rows().items()):
+            logger.warning("Skipped %d %s rows that could not be written.", len(bad_rows), stat_key)
         logger.info("Finishing sync with update tag '%d'", config.update_tag)
         return STATUS_SUCCESS
 
+    def _run_concurrently(
+        self,
+        neo4j_driver: neo4j.Driver,
+        config: Union[Config, argparse.Namespace],
+        max_concurrent_stages: int,
+    ) -> None:
+        """
+        Run the stages on a pool of `max_concurrent_stages` threads. A stage is started as soon as all of its
+        dependencies have finished. If a stage fails, no further stages are started and the error is re-raised once the
+        stages already in progress have finished.
+        """
+        def run_with_own_session(stage_name: str) -> None:
+            with neo4j_driver.session(database=config.neo4j_database) as neo4j_session:
+                _run_stage(stage_name, self._stages[stage_name], neo4j_session, config)
+
+        run_with_dependencies(
+            {stage_name: partial(run_with_own_session, stage_name) for stage_name in self._get_run_order()},
+            self._dependencies,
+            max_concurrent_stages,
+            thread_name_prefix='cartography-stage',
+        )
+
+
+def _run_stage(
+    stage_name: str,
+    stage_func: Callable,
+    neo4j_session: neo4j.Session,
+    config: Union[Config, argparse.Namespace],
+) -> None:
+    logger.info("Starting sync stage '%s'", stage_name)
+    try:
+        stage_func(neo4j_session, config)
+    except (KeyboardInterrupt, SystemExit):
+        logger.warning("Sync interrupted during stage '%s'.", stage_name)
+        raise
+    except Exception:
+        logger.exception("Unhandled exception during sync stage '%s'", stage_name)
+        raise  # TODO this should be configurable
+    logger.info("Finishing sync stage '%s'", stage_name)
+
+
+def get_stage_dependencies(stage_names: Iterable[str]) -> Dict[str, Set[str]]:
+    """
+    Returns the dependencies between the given top-level stages: `create-indexes` runs before everything, `analysis`
+    runs after everything, and the cross-module dependencies declared in STAGE_DEPENDENCIES are preserved.
+    STAGE_DEPENDENCIES is followed transitively before it is filtered to the given stages, so that e.g. semgrep still
+    waits for crowdstrike when cve is not part of the sync.
+    :param stage_names: The names of the stages included in a sync.
+    :return: A mapping of stage name to the set of stage names that must finish before it.
+    """
+    stage_names = list(stage_names)
+    transitive_dependencies = get_transitive_dependencies(STAGE_DEPENDENCIES)
+    dependencies: Dict[str, Set[str]] = {}
+    for name in stage_names:
+        depends_on = set(transitive_dependencies.get(name, set()))
+        if name in LAST_STAGES:
+            depends_on.update(other for other in stage_names if other not in LAST_STAGES)
+        elif name not in FIRST_STAGES:
+            depends_on.update(FIRST_STAGES)
+        dependencies[name] = {dep for dep in depends_on if dep in stage_names and dep != name}
+    return dependencies
+
 
 def run_with_config(sync: Sync, config: Union[Config, argparse.Namespace]) -> int:
     """
@@ -148,10 +337,11 @@ def run_with_config(sync: Sync, config: Union[Config, argparse.Namespace]) -> in
     if config.neo4j_user or config.neo4j_password:
         neo4j_auth = (config.neo4j_user, config.neo4j_password)
     try:
-        neo4j_driver = GraphDatabase.driver(
+        neo4j_driver = build_neo4j_driver(
             config.neo4j_uri,
-            auth=neo4j_auth,
-            max_connection_lifetime=config.neo4j_max_connection_lifetime,
+            config.neo4j_user,
+            config.neo4j_password,
+            config.neo4j_max_connection_lifetime,
         )
     except neo4j.exceptions.ServiceUnavailable as e:
         logger.debug("Error occurred during Neo4j connect.", exc_info=True)
@@ -202,6 +392,7 @@ def build_default_sync() -> Sync:
     sync.add_stages([
         (stage_name, stage_func) for stage_name, stage_func in TOP_LEVEL_MODULES.items()
     ])
+    sync.set_dependencies(get_stage_dependencies(TOP_LEVEL_MODULES.keys()))
     return sync
 
 
@@ -238,4 +429,5 @@ def build_sync(selected_modules_as_str: str) -> Sync:
     sync.add_stages(
         [(sync_name, TOP_LEVEL_MODULES[sync_name]) for sync_name in selected_modules],
     )
+    sync.set_dependencies(get_stage_dependencies(selected_modules))
     return sync
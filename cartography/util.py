@@ -1,20 +1,29 @@
-import asyncio
+import inspect
 import logging
 import re
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from functools import partial
 from functools import wraps
+from itertools import islice
 from string import Template
 from typing import Any
-from typing import Awaitable
 from typing import BinaryIO
 from typing import Callable
 from typing import cast
 from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Mapping
 from typing import Optional
 from typing import Set
+from typing import Tuple
 from typing import TypeVar
 from typing import Union
 
@@ -23,7 +32,13 @@ import boto3
 import botocore
 import neo4j
 
+from cartography.client.core.session import get_session_factory
+from cartography.client.core.session import Neo4jSessionFactory
+from cartography.graph.job import get_max_concurrent_jobs
 from cartography.graph.job import GraphJob
+from cartography.graph.jobregistry import get_job_registry
+from cartography.graph.jobregistry import JobSpec
+from cartography.graph.jobregistry import parse_job
 from cartography.graph.statement import get_job_shortname
 from cartography.stats import get_stats_client
 from cartography.stats import ScopedStatsClient
@@ -41,6 +56,35 @@ STATUS_SUCCESS = 0
 STATUS_FAILURE = 1
 STATUS_KEYBOARD_INTERRUPT = 130
 DEFAULT_BATCH_SIZE = 1000
+DEFAULT_MAX_REGION_WORKERS = 8
+DEFAULT_MAX_EXECUTOR_WORKERS = 32
+DEFAULT_MAX_IN_FLIGHT_CALLS = 16
+
+# https://github.com/boto/botocore/blob/develop/botocore/retries/standard.py
+AWS_THROTTLING_ERROR_CODES = frozenset([
+    'BandwidthLimitExceeded',
+    'EC2ThrottledException',
+    'LimitExceededException',
+    'PriorRequestNotComplete',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'SlowDown',
+    'ThrottledException',
+    'Throttling',
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'TransactionInProgressException',
+])
+AWS_TRANSIENT_ERROR_CODES = frozenset([
+    'InternalError',
+    'InternalFailure',
+    'RequestTimeout',
+    'RequestTimeoutException',
+    'ServiceUnavailable',
+    'ServiceUnavailableException',
+])
 
 
 def run_analysis_job(
@@ -57,15 +101,17 @@ def run_analysis_job(
     not scoped to a single sub resource. That is they will apply to _all_ AWS accounts/_all_ GCP projects/_all_ Okta
     organizations/etc.
     """
-    GraphJob.run_from_json(
-        neo4j_session,
-        read_text(
-            package,
-            filename,
-        ),
-        common_job_parameters,
-        get_job_shortname(filename),
-    )
+    _get_job(package, filename).bind(common_job_parameters).run(neo4j_session)
+
+
+def _get_job(package: str, filename: str) -> JobSpec:
+    """
+    Returns the job from the job registry, or reads and parses it if it is not packaged with cartography.
+    """
+    job = get_job_registry().get(package, filename)
+    if job is None:
+        job = parse_job(read_text(package, filename), get_job_shortname(filename))
+    return job
 
 
 def run_analysis_and_ensure_deps(
@@ -122,15 +168,48 @@ def run_cleanup_job(
     filename: str, neo4j_session: neo4j.Session, common_job_parameters: Dict,
     package: str = 'cartography.data.jobs.cleanup',
 ) -> None:
-    GraphJob.run_from_json(
-        neo4j_session,
-        read_text(
-            package,
-            filename,
-        ),
-        common_job_parameters,
-        get_job_shortname(filename),
-    )
+    get_cleanup_job(filename, common_job_parameters, package).run(neo4j_session)
+
+
+def get_cleanup_job(
+    filename: str, common_job_parameters: Dict,
+    package: str = 'cartography.data.jobs.cleanup',
+) -> GraphJob:
+    """
+    Returns the cleanup job in `filename` with the given parameters, to run along with other jobs in
+    `run_graph_jobs()`.
+    """
+    return _get_job(package, filename).bind(common_job_parameters)
+
+
+def run_graph_jobs(neo4j_session: neo4j.Session, jobs: List[GraphJob]) -> None:
+    """
+    Runs the given jobs, such as the cleanup jobs of a module. Jobs that share a label in their `labels` run one after
+    another in the given order; the others run concurrently on their own sessions, up to the number set with
+    `cartography.graph.job.set_max_concurrent_jobs()`. Without a registered session factory, or if that number is 1,
+    all jobs run in sequence on `neo4j_session`. If a job raises, no more jobs are started and the first exception is
+    re-raised.
+    """
+    session_factory = get_session_factory()
+    max_concurrent_jobs = get_max_concurrent_jobs()
+    if max_concurrent_jobs <= 1 or session_factory is None or len(jobs) <= 1:
+        for job in jobs:
+            job.run(neo4j_session)
+        return
+
+    job_session_factory: Neo4jSessionFactory = session_factory
+
+    def run_job(job: GraphJob) -> None:
+        with job_session_factory.new_session() as job_session:
+            job.run(job_session)
+
+    # Jobs are keyed by position, since several jobs can share a name.
+    funcs: Dict[str, Callable[[], Any]] = {str(i): partial(run_job, job) for i, job in enumerate(jobs)}
+    dependencies = {
+        str(i): {str(j) for j in range(i) if jobs[i].labels & jobs[j].labels}
+        for i in range(len(jobs))
+    }
+    run_with_dependencies(funcs, dependencies, max_concurrent_jobs, thread_name_prefix='cartography-job')
 
 
 def merge_module_sync_metadata(
@@ -173,6 +252,7 @@ def load_resource_binary(package: str, resource_name: str) -> BinaryIO:
 
 
 R = TypeVar('R')
+T = TypeVar('T')
 F = TypeVar('F', bound=Callable[..., Any])
 
 
@@ -209,23 +289,282 @@ def aws_paginate(
     Helper method for boilerplate boto3 pagination
     The **kwargs will be forwarded to the paginator
     '''
+    return list(aws_paginate_iter(client, method_name, object_name, **kwargs))
+
+
+def aws_paginate_iter(
+    client: boto3.client,
+    method_name: str,
+    object_name: str,
+    **kwargs: Any,
+) -> Iterator[Dict]:
+    '''
+    Like aws_paginate(), but yields the items page by page as they are fetched instead of collecting all of them in a
+    list first, so that large inventories can be streamed into the graph with bounded memory.
+    The **kwargs will be forwarded to the paginator
+    '''
     paginator = client.get_paginator(method_name)
-    items = []
     i = 0
     for i, page in enumerate(paginator.paginate(**kwargs), start=1):
         if i % 100 == 0:
             logger.info(f'fetching page number {i}')
         if object_name in page:
-            items.extend(page[object_name])
+            yield from page[object_name]
         else:
             logger.warning(
                 f'''aws_paginate: Key "{object_name}" is not present, check if this is a typo.
 If not, then the AWS datatype somehow does not have this key.''',
             )
-    return items
 
 
-AWSGetFunc = TypeVar('AWSGetFunc', bound=Callable[..., List])
+class AWSRateLimiter:
+    """
+    Token bucket that paces the API calls made to one AWS service in one region of one account, and adapts its rate to
+    throttling responses with additive-increase/multiplicative-decrease (AIMD): every throttled call halves the rate,
+    and every successful call raises it by 1 / rate, i.e. by about one call per second for every second of calls made
+    at the full rate. This lets concurrent fetchers converge on the rate AWS will serve instead of all retrying at once.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float = 25.0,
+        min_rate: float = 0.5,
+        max_rate: float = 100.0,
+        decrease_factor: float = 0.5,
+    ):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.decrease_factor = decrease_factor
+        self.throttle_count = 0
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until a call may be made at the current rate.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                # Allow bursts of up to one second of calls.
+                self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait_seconds = (1.0 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + 1.0 / self.rate)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            self.throttle_count += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            # Drop the accumulated burst so that the lower rate takes effect right away.
+            self._tokens = min(self._tokens, 0.0)
+
+
+# Global _aws_rate_limiters, shared by all AWS fetchers of this process.
+_aws_rate_limiters: Dict[Tuple[str, str, str], AWSRateLimiter] = {}
+_aws_rate_limiters_lock = threading.Lock()
+_aws_rate_limiter_stats = get_stats_client('aws.rate_limiter')
+
+
+def get_aws_rate_limiter(account_id: str, service_name: str, region: str) -> AWSRateLimiter:
+    """
+    Returns the rate limiter for the given AWS account, service and region, creating it if needed.
+    """
+    key = (account_id, service_name, region)
+    with _aws_rate_limiters_lock:
+        if key not in _aws_rate_limiters:
+            _aws_rate_limiters[key] = AWSRateLimiter()
+        return _aws_rate_limiters[key]
+
+
+def reset_aws_rate_limiters(account_id: Optional[str] = None) -> None:
+    """
+    Drops the rate limiters of the given AWS account once it has been synced, or all of them at the start of a sync, so
+    that the registry does not grow with every account and every sync of a long-running process.
+    """
+    with _aws_rate_limiters_lock:
+        for key in list(_aws_rate_limiters):
+            if account_id is None or key[0] == account_id:
+                del _aws_rate_limiters[key]
+
+
+def get_aws_throttle_counts(account_id: str) -> Dict[str, int]:
+    """
+    Returns the number of throttled calls per "service:region" of the given AWS account that had any.
+    """
+    with _aws_rate_limiters_lock:
+        return {
+            f'{service_name}:{region}': limiter.throttle_count
+            for (limiter_account_id, service_name, region), limiter in _aws_rate_limiters.items()
+            if limiter_account_id == account_id and limiter.throttle_count
+        }
+
+
+def register_aws_rate_limiter(client: botocore.client.BaseClient, account_id: str) -> None:
+    """
+    Makes every request attempt of the given boto3 client, including botocore's own retries, wait on the shared rate
+    limiter of its account, service and region, and feeds the responses back into the limiter.
+    """
+    service_name = client.meta.service_model.service_name
+    region = client.meta.region_name or 'global'
+    limiter = get_aws_rate_limiter(account_id, service_name, region)
+
+    def before_request(**kwargs: Any) -> None:
+        limiter.acquire()
+
+    def after_response(
+        response: Optional[Tuple[Any, Dict]] = None,
+        caught_exception: Optional[Exception] = None,
+        **kwargs: Any,
+    ) -> None:
+        if response is None:
+            return
+        http_response, parsed = response
+        error_code = parsed.get('Error', {}).get('Code')
+        if http_response.status_code == 429 or error_code in AWS_THROTTLING_ERROR_CODES:
+            limiter.on_throttle()
+            _aws_rate_limiter_stats.incr(f'{service_name}.throttled')
+        elif http_response.status_code < 400:
+            limiter.on_success()
+
+    client.meta.events.register('request-created', before_request)
+    client.meta.events.register('needs-retry', after_response)
+
+
+class CachedBoto3Session:
+    """
+    Proxy for a boto3 session that caches the clients and resources it creates, so that calling
+    `boto3_session.client('ec2', region_name=region)` in every get function does not load the service model and build
+    a new client each time. Clients are cached per (service, region, client arguments) and shared by all threads, since
+    boto3 clients are thread-safe. boto3 resources are not, so they are cached per thread. Creation is serialized
+    because boto3 sessions are not thread-safe either. All other attributes are forwarded to the wrapped session.
+
+    If `account_id` is given, every client is paced by the shared AWSRateLimiter of its account, service and region.
+
+    Cache hits and misses are counted on the instance and reported to statsd as `aws.boto3_client_cache.hit` and
+    `aws.boto3_client_cache.miss`.
+    """
+    _stats = get_stats_client('aws.boto3_client_cache')
+
+    def __init__(self, boto3_session: boto3.session.Session, account_id: Optional[str] = None):
+        self.boto3_session = boto3_session
+        self.account_id = account_id
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple, Any] = {}
+        self._thread_local = threading.local()
+
+    def client(self, *args: Any, **kwargs: Any) -> Any:
+        key = self._cache_key(self.boto3_session.client, args, kwargs)
+        with self._lock:
+            if key not in self._clients:
+                self._record_lookup(hit=False)
+                client = self.boto3_session.client(*args, **kwargs)
+                if self.account_id:
+                    register_aws_rate_limiter(client, self.account_id)
+                self._clients[key] = client
+            else:
+                self._record_lookup(hit=True)
+            return self._clients[key]
+
+    def resource(self, *args: Any, **kwargs: Any) -> Any:
+        key = self._cache_key(self.boto3_session.resource, args, kwargs)
+        resources = self._thread_local.__dict__.setdefault('resources', {})
+        with self._lock:
+            if key not in resources:
+                self._record_lookup(hit=False)
+                resource = self.boto3_session.resource(*args, **kwargs)
+                if self.account_id:
+                    register_aws_rate_limiter(resource.meta.client, self.account_id)
+                resources[key] = resource
+            else:
+                self._record_lookup(hit=True)
+            return resources[key]
+
+    def _record_lookup(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._stats.incr('hit' if hit else 'miss')
+
+    @staticmethod
+    def _cache_key(create_func: Callable, args: Tuple, kwargs: Dict[str, Any]) -> Tuple:
+        """
+        Normalizes the arguments of `create_func` into a hashable key, so that e.g. `client('s3', 'us-east-1')` and
+        `client('s3', region_name='us-east-1')` share a client. botocore Config objects do not implement equality, so
+        they are keyed by the options they were created with.
+        """
+        arguments: Dict[str, Any]
+        try:
+            arguments = dict(inspect.signature(create_func).bind(*args, **kwargs).arguments)
+        except (TypeError, ValueError):
+            arguments = {'args': args, **kwargs}
+        key = []
+        for name, value in sorted(arguments.items()):
+            if isinstance(value, botocore.config.Config):
+                value = ('Config', repr(sorted(value._user_provided_options.items())))
+            elif isinstance(value, (dict, list)):
+                value = repr(value)
+            key.append((name, value))
+        return tuple(key)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.boto3_session, name)
+
+
+def get_cached_boto3_session(
+    boto3_session: boto3.session.Session, account_id: Optional[str] = None,
+) -> boto3.session.Session:
+    """
+    Wraps the given boto3 session in a CachedBoto3Session unless it is one already.
+    """
+    if isinstance(boto3_session, CachedBoto3Session):
+        return boto3_session
+    return cast(boto3.session.Session, CachedBoto3Session(boto3_session, account_id))
+
+
+def aws_fan_out_regions(
+    get_func: Callable[[boto3.session.Session, str], R],
+    boto3_session: boto3.session.Session,
+    regions: List[str],
+    max_workers: int = DEFAULT_MAX_REGION_WORKERS,
+) -> List[Tuple[str, R]]:
+    '''
+    Calls `get_func(boto3_session, region)` for every region on a bounded thread pool and returns the results as
+    (region, result) tuples in the same order as `regions`. Most of the time spent syncing an AWS resource type is
+    waiting on API round trips to distant regions, so fetching all regions at once and then transforming and loading
+    them in order is much faster than doing everything one region at a time.
+
+    If a call raises, the remaining calls are cancelled and the exception of the earliest failing region is re-raised.
+
+    Use:
+    for region, data in aws_fan_out_regions(get_ec2_key_pairs, boto3_session, regions):
+        load_ec2_key_pairs(neo4j_session, data, region, ...)
+    '''
+    if max_workers <= 1 or len(regions) <= 1:
+        return [(region, get_func(boto3_session, region)) for region in regions]
+
+    boto3_session = get_cached_boto3_session(boto3_session)
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(regions)), thread_name_prefix='cartography-aws-region')
+    try:
+        futures = [pool.submit(get_func, boto3_session, region) for region in regions]
+        return [(region, future.result()) for region, future in zip(regions, futures)]
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+AWSGetFunc = TypeVar('AWSGetFunc', bound=Callable[..., Iterable])
 
 # fix for AWS TooManyRequestsException
 # https://github.com/lyft/cartography/issues/297
@@ -234,7 +573,7 @@ AWSGetFunc = TypeVar('AWSGetFunc', bound=Callable[..., List])
 # https://github.com/lyft/cartography/issues/25
 
 
-def backoff_handler(details: Dict) -> None:
+def backoff_handler(details: Mapping[str, Any]) -> None:
     """
     Handler that will be executed on exception by backoff mechanism
     """
@@ -250,7 +589,8 @@ def aws_handle_regions(func: AWSGetFunc) -> AWSGetFunc:
     The convenience of this decorator is that it auto-catches some of the potential
      Exceptions related to opt-in regions, and returns the specified `default_return_value`.
 
-    This should be used on `get_` functions that normally return a list of items.
+    This should be used on `get_` functions that normally return a list of items, or on generator `get_` functions
+     that yield them.
     """
     ERROR_CODES = [
         'AccessDenied',
@@ -262,16 +602,34 @@ def aws_handle_regions(func: AWSGetFunc) -> AWSGetFunc:
         'InternalServerErrorException',
     ]
 
+    if inspect.isgeneratorfunction(func):
+        # Streaming get functions yield items while they are being fetched, so they cannot be retried as a whole
+        # without yielding duplicates. Their API calls are still retried by botocore and paced by the AWSRateLimiter.
+        @wraps(func)
+        def inner_generator(*args, **kwargs):  # type: ignore
+            try:
+                yield from func(*args, **kwargs)
+            except botocore.exceptions.ClientError as e:
+                # Stopping early leaves the region with the items yielded so far, where the non-streaming version would
+                # have returned no items at all.
+                if e.response['Error']['Code'] in ERROR_CODES:
+                    logger.warning("{} in this region. Skipping...".format(e.response['Error']['Message']))
+                    return
+                raise
+        return cast(AWSGetFunc, inner_generator)
+
     @wraps(func)
     # fix for AWS TooManyRequestsException
     # https://github.com/lyft/cartography/issues/297
     # https://github.com/lyft/cartography/issues/243
     # https://github.com/lyft/cartography/issues/65
     # https://github.com/lyft/cartography/issues/25
+    # Only throttling and transient errors are retried; the shared AWSRateLimiter slows the clients down as well.
     @backoff.on_exception(
         backoff.expo,
-        botocore.exceptions.ClientError,
+        Exception,
         max_time=600,
+        giveup=lambda e: not is_retryable_aws_exception(e),
         on_backoff=backoff_handler,
     )
     def inner_function(*args, **kwargs):  # type: ignore
@@ -332,13 +690,140 @@ def batch(items: Iterable, size: int = DEFAULT_BATCH_SIZE) -> List[List]:
     ]
 
 
+def iter_batches(items: Iterable[T], size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[T]]:
+    '''
+    Like batch(), but lazily consumes `items` and yields one batch at a time, so only `size` items are held at once.
+
+    Use:
+    for data_batch in iter_batches(aws_paginate_iter(client, 'describe_snapshots', 'Snapshots'), size=1000):
+        load_snapshots(neo4j_session, data_batch, ...)
+    '''
+    item_iter = iter(items)
+    while True:
+        data_batch = list(islice(item_iter, size))
+        if not data_batch:
+            return
+        yield data_batch
+
+
+def get_transitive_dependencies(dependencies: Dict[str, Set[str]]) -> Dict[str, Set[str]]:
+    '''
+    Returns the transitive closure of `dependencies`: every name is mapped to all of the names that it depends on,
+    directly or through other names.
+
+    Use:
+    get_transitive_dependencies({'c': {'b'}, 'b': {'a'}}) -> {'c': {'a', 'b'}, 'b': {'a'}}
+    '''
+    closure: Dict[str, Set[str]] = {}
+    for name, direct_dependencies in dependencies.items():
+        result: Set[str] = set()
+        pending = list(direct_dependencies)
+        while pending:
+            dependency = pending.pop()
+            if dependency not in result:
+                result.add(dependency)
+                pending.extend(dependencies.get(dependency, set()))
+        closure[name] = result
+    return closure
+
+
+def get_dependency_order(names: Iterable[str], dependencies: Dict[str, Set[str]]) -> List[str]:
+    '''
+    Returns the given names ordered so that every name comes after all of the names it depends on. Ties are broken by
+    the original order of `names`, so names without dependencies keep their relative order. Dependencies are followed
+    transitively before dependencies on names that are not in `names` are ignored, so with {'c': {'b'}, 'b': {'a'}},
+    'c' still comes after 'a' when 'b' is not in `names`.
+
+    Use:
+    get_dependency_order(['c', 'a', 'b'], {'c': {'b'}}) -> ['a', 'b', 'c']
+
+    :param names: The names to order.
+    :param dependencies: A mapping of name to the set of names that must come before it.
+    :return: The ordered list of names. Raises ValueError if the dependencies are circular.
+    '''
+    dependencies = get_transitive_dependencies(dependencies)
+    remaining = list(dict.fromkeys(names))
+    name_set = set(remaining)
+    order: List[str] = []
+    done: Set[str] = set()
+    while remaining:
+        ready = next(
+            (
+                name for name in remaining
+                if all(dep in done or dep not in name_set or dep == name for dep in dependencies.get(name, set()))
+            ),
+            None,
+        )
+        if ready is None:
+            raise ValueError(f"Circular dependencies between {remaining}.")
+        order.append(ready)
+        done.add(ready)
+        remaining.remove(ready)
+    return order
+
+
+def run_with_dependencies(
+    funcs: Dict[str, Callable[[], Any]],
+    dependencies: Dict[str, Set[str]],
+    max_workers: int,
+    thread_name_prefix: str = '',
+) -> None:
+    '''
+    Calls every function in `funcs` on a pool of up to `max_workers` threads. A function is only started once all of the
+    functions it depends on have returned; among the functions that are ready, the ones that come first in `funcs` are
+    started first. If a function raises, no more functions are started and the first exception is re-raised once the
+    functions that are already running have returned.
+
+    :param funcs: A mapping of name to the function to call.
+    :param dependencies: A mapping of name to the set of names whose functions must return before it is called.
+    Dependencies are followed transitively, and then dependencies on names that are not in `funcs` are ignored.
+    :param max_workers: The maximum number of functions to run at the same time.
+    :param thread_name_prefix: Prefix for the names of the worker threads.
+    '''
+    dependencies = get_transitive_dependencies(dependencies)
+    pending = get_dependency_order(funcs.keys(), dependencies)
+    finished: Set[str] = set()
+    running: Dict[Future, str] = {}
+    error: Optional[BaseException] = None
+
+    def is_ready(name: str) -> bool:
+        return all(dep in finished or dep not in funcs or dep == name for dep in dependencies.get(name, set()))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix) as pool:
+        try:
+            while pending or running:
+                if error is None:
+                    for name in [name for name in pending if is_ready(name)]:
+                        pending.remove(name)
+                        running[pool.submit(funcs[name])] = name
+                if not running:
+                    break
+
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    future_error = future.exception()
+                    if future_error is not None:
+                        error = error or future_error
+                    else:
+                        finished.add(name)
+        except (KeyboardInterrupt, SystemExit):
+            logger.warning("Interrupted while running %s.", sorted(running.values()))
+            for future in running:
+                future.cancel()
+            raise
+
+    if error is not None:
+        raise error
+
+
 def is_throttling_exception(exc: Exception) -> bool:
     '''
     Returns True if the exception is caused by a client libraries throttling mechanism
     '''
     # https://boto3.amazonaws.com/v1/documentation/api/1.19.9/guide/error-handling.html
     if isinstance(exc, botocore.exceptions.ClientError):
-        if exc.response['Error']['Code'] in ['LimitExceededException', 'Throttling']:
+        if exc.response['Error']['Code'] in AWS_THROTTLING_ERROR_CODES:
             return True
     # add other exceptions here, if needed, like:
     # https://cloud.google.com/python/docs/reference/storage/1.39.0/retry_timeout#configuring-retries
@@ -347,77 +832,138 @@ def is_throttling_exception(exc: Exception) -> bool:
     return False
 
 
-def to_asynchronous(func: Callable[..., R], *args: Any, **kwargs: Any) -> Awaitable[R]:
+def is_retryable_aws_exception(exc: Exception) -> bool:
     '''
-    Returns a Future that will run a function and its arguments in the default threadpool.
-    Helper until we start using python 3.9's asyncio.to_thread
-
-    Calls are also wrapped within a backoff decorator to handle throttling errors.
-
-    :param func: the function to be wrapped by the Future
-    :param args: a series of arguments to be passed into func
-    :param kwargs: a series of keyword arguments to be passed into func
-
-    example:
-    def my_func(arg1, arg2, kwarg1):
-        return arg1 + arg2 + kwarg1
-
-    # normal synchronous call:
-    result = my_func(1, 2, kwarg1=3)
-
-    # asynchronous call:
-    future = to_asynchronous(my_func, 1, 2, kwarg1=3)
-
-    # the result is stored in the future, and can be retrieved
-    # from within another async function with:
-    await future
-
-    # or from within a synchronous function with our helper:
-    to_synchronous(future)
-
-    NOTE: to use this in a Jupyter notebook, you need to do:
-    # import nest_asyncio
-    # nest_asyncio.apply()
+    Returns True if the AWS call that raised the exception may succeed when retried: the call was throttled, AWS had a
+    transient server-side error, or the connection failed. Errors like AccessDenied or validation errors are not
+    retryable.
     '''
-    CartographyThrottlingException = type('CartographyThrottlingException', (Exception,), {})
+    if is_throttling_exception(exc):
+        return True
+    if isinstance(exc, botocore.exceptions.ClientError):
+        status_code = exc.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        return exc.response['Error']['Code'] in AWS_TRANSIENT_ERROR_CODES or status_code in (500, 502, 503, 504)
+    return isinstance(exc, (botocore.exceptions.ConnectionError, botocore.exceptions.HTTPClientError))
 
-    @wraps(func)
-    def wrapper(*args: Any, **kwargs: Any) -> R:
-        try:
-            return func(*args, **kwargs)
-        except Exception as exc:
-            if is_throttling_exception(exc):
-                raise CartographyThrottlingException from exc
-            raise
 
+def _with_retries(func: Callable[..., R]) -> Callable[..., R]:
     # don't use @backoff as decorator, to preserve typing
-    wrapped = backoff.on_exception(backoff.expo, CartographyThrottlingException)(wrapper)
-    call = partial(wrapped, *args, **kwargs)
-    return asyncio.get_event_loop().run_in_executor(None, call)
+    return backoff.on_exception(
+        backoff.expo,
+        Exception,
+        max_time=600,
+        giveup=lambda e: not is_retryable_aws_exception(e),
+        on_backoff=backoff_handler,
+    )(func)
 
 
-def to_synchronous(*awaitables: Awaitable[Any]) -> List[Any]:
+class BoundedExecutor:
     '''
-    Synchronously waits for the Awaitable(s) to complete and returns their result(s).
-    See https://docs.python.org/3.8/library/asyncio-task.html#asyncio-awaitables
-
-    :param awaitables: a series of Awaitable objects, with each object being its own argument.
-        i.e., not a single list of Awaitables
+    Runs blocking API calls on one thread pool per service, sized to the number of calls that may be in flight for that
+    service, so that fanning out over thousands of items neither floods one API nor queues thousands of pending calls
+    and responses at once. Calls to a service beyond its limit wait in the queue of that service's pool without holding
+    a thread, so a throttled service cannot starve the calls to other services.
 
-    example:
-    async def my_async_func(my_arg):
-        return my_arg
-
-    async def another_async_func(my_arg2):
-        return my_arg2
-
-    remember that an invocation of an async function returns a Future (Awaitable),
-    which needs to be awaited to get the result. You cannot await a Future from within
-    a non-async function, so you could use this helper to get the result from a Future
-
-    future_1 = my_async_func(1)
-    future_2 = another_async_func(2)
+    Use:
+    executor = get_bounded_executor()
+    executor.set_max_in_flight('s3', 8)
+    for result in executor.map_unordered('s3', get_bucket_details, buckets):
+        ...
+    '''
 
-    results = to_synchronous(future_1, future_2)
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_EXECUTOR_WORKERS,
+        default_max_in_flight: int = DEFAULT_MAX_IN_FLIGHT_CALLS,
+    ):
+        # The maximum number of threads of the pool of a single service.
+        self.max_workers = max_workers
+        self.default_max_in_flight = default_max_in_flight
+        self._max_in_flight: Dict[str, int] = {}
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def get_max_in_flight(self, service: str) -> int:
+        return self._max_in_flight.get(service, self.default_max_in_flight)
+
+    def set_max_in_flight(self, service: str, max_in_flight: int) -> None:
+        '''
+        Sets the maximum number of calls to `service` that may run at the same time. Calls that were already submitted
+        still run on the pool of the old limit.
+        '''
+        with self._lock:
+            self._max_in_flight[service] = max_in_flight
+            old_pool = self._pools.pop(service, None)
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def set_default_max_in_flight(self, max_in_flight: int) -> None:
+        '''
+        Sets the maximum number of calls that may run at the same time for every service without its own limit from
+        `set_max_in_flight()`. Calls that were already submitted still run on the pools of the old limit.
+        '''
+        with self._lock:
+            self.default_max_in_flight = max_in_flight
+            old_pools = [
+                self._pools.pop(service) for service in list(self._pools) if service not in self._max_in_flight
+            ]
+        for old_pool in old_pools:
+            old_pool.shutdown(wait=False)
+
+    def _get_pool(self, service: str) -> ThreadPoolExecutor:
+        with self._lock:
+            if service not in self._pools:
+                self._pools[service] = ThreadPoolExecutor(
+                    max_workers=max(min(self.get_max_in_flight(service), self.max_workers), 1),
+                    thread_name_prefix=f'cartography-bounded-{service}',
+                )
+            return self._pools[service]
+
+    def submit(self, service: str, func: Callable[..., R], *args: Any, **kwargs: Any) -> 'Future[R]':
+        '''
+        Schedules `func(*args, **kwargs)` on the pool of `service`. Does not block the caller.
+        '''
+        return self._get_pool(service).submit(func, *args, **kwargs)
+
+    def map_unordered(self, service: str, func: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        '''
+        Calls `func` on every item and yields the results in the order the calls finish. Items are only pulled from
+        `items` as earlier calls finish, so at most `get_max_in_flight(service)` calls and unconsumed results are held
+        at a time. Calls that raise a throttling or transient AWS error are retried. If a call fails, the calls that
+        were not started yet are cancelled and the exception is re-raised.
+        '''
+        call = _with_retries(func)
+        max_in_flight = self.get_max_in_flight(service)
+        item_iter = iter(items)
+        in_flight: Set[Future] = set()
+        try:
+            for item in item_iter:
+                in_flight.add(self.submit(service, call, item))
+                if len(in_flight) < max_in_flight:
+                    continue
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+# Global _bounded_executor, created on first use.
+_bounded_executor: Optional[BoundedExecutor] = None
+_bounded_executor_lock = threading.Lock()
+
+
+def get_bounded_executor() -> BoundedExecutor:
+    '''
+    Returns the process-wide BoundedExecutor.
     '''
-    return asyncio.get_event_loop().run_until_complete(asyncio.gather(*awaitables))
+    global _bounded_executor
+    with _bounded_executor_lock:
+        if _bounded_executor is None:
+            _bounded_executor = BoundedExecutor()
+        return _bounded_executor
@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from cartography.models.core.common import PropertyRef
+from cartography.models.core.nodes import CartographyNodeProperties
+from cartography.models.core.nodes import CartographyNodeSchema
+from cartography.models.core.nodes import ExtraNodeLabels
+from cartography.models.core.relationships import CartographyRelProperties
+from cartography.models.core.relationships import CartographyRelSchema
+from cartography.models.core.relationships import LinkDirection
+from cartography.models.core.relationships import make_target_node_matcher
+from cartography.models.core.relationships import OtherRelationships
+from cartography.models.core.relationships import TargetNodeMatcher
+
+
+@dataclass(frozen=True)
+class SampleNodeProperties(CartographyNodeProperties):
+    id: PropertyRef = PropertyRef('Id')
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+# Test defining the sub resource that InterestingAsset and SimpleNode hang off.
+@dataclass(frozen=True)
+class SubResourceSchema(CartographyNodeSchema):
+    label: str = 'SubResource'
+    properties: SampleNodeProperties = SampleNodeProperties()
+
+
+# Test defining a node that shares the extra label AnotherNodeLabel with InterestingAsset.
+@dataclass(frozen=True)
+class OtherAssetSchema(CartographyNodeSchema):
+    label: str = 'OtherAsset'
+    properties: SampleNodeProperties = SampleNodeProperties()
+    extra_node_labels: Optional[ExtraNodeLabels] = ExtraNodeLabels(['AnotherNodeLabel'])
+
+
+# Test defining a relationship that matches its target by an extra label:
+# (:PointerAsset)-[:POINTS_TO]->(:AnotherNodeLabel)
+@dataclass(frozen=True)
+class PointerAssetToAnotherNodeLabelRelProps(CartographyRelProperties):
+    lastupdated: PropertyRef = PropertyRef('lastupdated', set_in_kwargs=True)
+
+
+@dataclass(frozen=True)
+class PointerAssetToAnotherNodeLabelRel(CartographyRelSchema):
+    target_node_label: str = 'AnotherNodeLabel'
+    target_node_matcher: TargetNodeMatcher = make_target_node_matcher(
+        {'id': PropertyRef('target_id')},
+    )
+    direction: LinkDirection = LinkDirection.OUTWARD
+    rel_label: str = "POINTS_TO"
+    properties: PointerAssetToAnotherNodeLabelRelProps = PointerAssetToAnotherNodeLabelRelProps()
+
+
+@dataclass(frozen=True)
+class PointerAssetSchema(CartographyNodeSchema):
+    label: str = 'PointerAsset'
+    properties: SampleNodeProperties = SampleNodeProperties()
+    other_relationships: OtherRelationships = OtherRelationships([PointerAssetToAnotherNodeLabelRel()])
@@ -4,6 +4,7 @@ from cartography.client.core.tx import read_list_of_tuples_tx
 from cartography.client.core.tx import read_list_of_values_tx
 from cartography.client.core.tx import read_single_dict_tx
 from cartography.client.core.tx import read_single_value_tx
+from cartography.client.core.tx import reset_index_registry
 from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetSchema
 
 
@@ -115,6 +116,9 @@ def test_read_list_of_tuples_tx(neo4j_session):
 
 
 def test_ensure_indexes(neo4j_session):
+    # Arrange: forget indexes that an earlier test in this process may have created
+    reset_index_registry()
+
     # Act
     ensure_indexes(neo4j_session, InterestingAssetSchema())
 
@@ -83,3 +83,31 @@ def test_load_security_groups_relationships(neo4j_session):
     }
 
     assert actual == expected_nodes
+
+
+def test_load_security_group_rule_ranges(neo4j_session):
+    data = tests.data.aws.ec2.security_groups.DESCRIBE_SGS
+    cartography.intel.aws.ec2.security_groups.load_ec2_security_groupinfo(
+        neo4j_session,
+        data,
+        TEST_REGION,
+        TEST_ACCOUNT_ID,
+        TEST_UPDATE_TAG,
+    )
+
+    result = neo4j_session.run(
+        """
+        MATCH (r:IpRange)-[:MEMBER_OF_IP_RULE]->(rule:IpRule)-[:MEMBER_OF_EC2_SECURITY_GROUP]->
+            (:EC2SecurityGroup{id: 'sg-028e2522c72719996'})
+        RETURN r.range, rule.ruleid;
+        """,
+    )
+    actual = {(r['r.range'], r['rule.ruleid']) for r in result}
+
+    assert actual == {
+        ('203.0.113.0/24', 'sg-028e2522c72719996/IpPermissions/8080tcp'),
+        ('203.0.113.0/24', 'sg-028e2522c72719996/IpPermissions/443443tcp'),
+        ('0.0.0.0/0', 'sg-028e2522c72719996/IpPermissionsEgress/8080tcp'),
+        ('8.8.8.8/32', 'sg-028e2522c72719996/IpPermissionsEgress/NoneNone-1'),
+        ('0.0.0.0/0', 'sg-028e2522c72719996/IpPermissionsEgress/443443tcp'),
+    }
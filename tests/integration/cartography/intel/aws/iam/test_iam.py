@@ -54,6 +54,25 @@ def test_load_users(neo4j_session):
     )
 
 
+def test_migrate_principal_ids_updates_principals_of_earlier_versions(neo4j_session):
+    _create_base_account(neo4j_session)
+    user_arn = 'arn:aws:iam::000000000000:user/example-user-legacy'
+    # Earlier versions MERGEd users on arn only.
+    neo4j_session.run(
+        "MERGE (u:AWSUser:AWSPrincipal{arn: $Arn}) SET u.lastupdated = 1, u.legacy = true",
+        Arn=user_arn,
+    )
+    data = [{**tests.data.aws.iam.LIST_USERS['Users'][0], 'Arn': user_arn, 'UserName': 'example-user-legacy'}]
+
+    cartography.intel.aws.iam.migrate_principal_ids(neo4j_session)
+    cartography.intel.aws.iam.load_users(neo4j_session, data, TEST_ACCOUNT_ID, TEST_UPDATE_TAG)
+
+    assert check_nodes(neo4j_session, 'AWSUser', ['id', 'arn', 'legacy']) >= {(user_arn, user_arn, True)}
+    assert neo4j_session.run(
+        "MATCH (u:AWSUser{arn: $Arn}) RETURN count(u) AS count", Arn=user_arn,
+    ).single()['count'] == 1
+
+
 def test_load_groups(neo4j_session):
     data = tests.data.aws.iam.LIST_GROUPS['Groups']
 
@@ -91,10 +110,12 @@ def test_load_roles(neo4j_session):
     }
     # Act: Load the roles as bare Principals without other labels. This replicates the case where we discover a
     # role from another account via an AssumeRolePolicy document or similar ways. See #1133.
+    # AWSPrincipals are keyed by their ARN in the `id` field.
     neo4j_session.run(
         '''
         UNWIND $data as item
-            MERGE (p:AWSPrincipal{arn: item.Arn})
+            MERGE (p:AWSPrincipal{id: item.Arn})
+            SET p.arn = item.Arn
         ''',
         data=data,
     )
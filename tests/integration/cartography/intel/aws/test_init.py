@@ -41,6 +41,17 @@ def make_aws_sync_test_kwargs(neo4j_session: neo4j.Session, mock_boto3_session:
     }
 
 
+def assert_sync_called_with(sync_func: mock.MagicMock, expected_kwargs: Dict[str, Any]) -> None:
+    """
+    Asserts that the AWS sync was last called with the given kwargs, where the boto3 session it received is the
+    client cache wrapping the expected boto3 session.
+    """
+    actual_kwargs = dict(sync_func.call_args.kwargs)
+    assert isinstance(actual_kwargs['boto3_session'], cartography.util.CachedBoto3Session)
+    actual_kwargs['boto3_session'] = actual_kwargs['boto3_session'].boto3_session
+    assert actual_kwargs == expected_kwargs
+
+
 @mock.patch.object(cartography.intel.aws.organizations, 'sync', return_value=None)
 @mock.patch('cartography.intel.aws.boto3.Session')
 @mock.patch.object(cartography.intel.aws, '_sync_one_account', return_value=None)
@@ -59,15 +70,15 @@ def test_sync_multiple_accounts(
     # Ensure we call _sync_one_account on all accounts in our list.
     mock_sync_one.assert_any_call(
         neo4j_session, mock_boto3_session(), '000000000000', TEST_UPDATE_TAG, GRAPH_JOB_PARAMETERS,
-        aws_requested_syncs=[],
+        aws_requested_syncs=[], max_workers=1,
     )
     mock_sync_one.assert_any_call(
         neo4j_session, mock_boto3_session(), '000000000001', TEST_UPDATE_TAG, GRAPH_JOB_PARAMETERS,
-        aws_requested_syncs=[],
+        aws_requested_syncs=[], max_workers=1,
     )
     mock_sync_one.assert_any_call(
         neo4j_session, mock_boto3_session(), '000000000002', TEST_UPDATE_TAG, GRAPH_JOB_PARAMETERS,
-        aws_requested_syncs=[],
+        aws_requested_syncs=[], max_workers=1,
     )
 
     # Ensure _sync_one_account and _autodiscover is called once for each account
@@ -78,6 +89,71 @@ def test_sync_multiple_accounts(
     assert mock_cleanup.call_count == 1
 
 
+@mock.patch.object(cartography.intel.aws.organizations, 'sync', return_value=None)
+@mock.patch('cartography.intel.aws.boto3.Session')
+@mock.patch.object(cartography.intel.aws, 'get_session_factory')
+@mock.patch.object(cartography.intel.aws, '_sync_one_account', return_value=None)
+@mock.patch.object(cartography.intel.aws, '_autodiscover_accounts', return_value=None)
+@mock.patch.object(cartography.intel.aws, 'run_cleanup_job', return_value=None)
+def test_sync_multiple_accounts_concurrently(
+    mock_cleanup, mock_autodiscover, mock_sync_one, mock_session_factory, mock_boto3_session, mock_sync_orgs,
+    neo4j_session,
+):
+    test_config = cartography.config.Config(
+        neo4j_uri='bolt://localhost:7687',
+        aws_account_concurrency=2,
+    )
+    common_job_parameters = {'UPDATE_TAG': TEST_UPDATE_TAG}
+    worker_session = mock_session_factory.return_value.new_session.return_value.__enter__.return_value
+
+    cartography.intel.aws._sync_multiple_accounts(
+        neo4j_session, TEST_ACCOUNTS, TEST_UPDATE_TAG, common_job_parameters, False, config=test_config,
+    )
+
+    # Each account is synced on a worker session with its own copy of the job parameters.
+    for account_id in TEST_ACCOUNTS.values():
+        mock_sync_one.assert_any_call(
+            worker_session, mock_boto3_session(), account_id, TEST_UPDATE_TAG,
+            {'UPDATE_TAG': TEST_UPDATE_TAG, 'AWS_ID': account_id},
+            aws_requested_syncs=[], max_workers=1,
+        )
+    assert mock_sync_one.call_count == len(TEST_ACCOUNTS.keys())
+    assert mock_autodiscover.call_count == len(TEST_ACCOUNTS.keys())
+    assert mock_session_factory.return_value.new_session.call_count == len(TEST_ACCOUNTS.keys())
+    assert common_job_parameters == {'UPDATE_TAG': TEST_UPDATE_TAG}
+    assert mock_cleanup.call_count == 1
+
+
+@mock.patch.object(cartography.intel.aws.organizations, 'sync', return_value=None)
+@mock.patch('cartography.intel.aws.boto3.Session')
+@mock.patch.object(cartography.intel.aws, 'get_session_factory')
+@mock.patch.object(cartography.intel.aws, '_sync_one_account')
+@mock.patch.object(cartography.intel.aws, '_autodiscover_accounts', return_value=None)
+@mock.patch.object(cartography.intel.aws, 'run_cleanup_job', return_value=None)
+def test_sync_multiple_accounts_concurrently_aggregates_exceptions_with_aws_best_effort_mode(
+    mock_cleanup, mock_autodiscover, mock_sync_one, mock_session_factory, mock_boto3_session, mock_sync_orgs,
+    neo4j_session,
+):
+    test_config = cartography.config.Config(
+        neo4j_uri='bolt://localhost:7687',
+        aws_account_concurrency=3,
+    )
+    mock_sync_one.side_effect = KeyError('foo')
+
+    with raises(Exception) as e:
+        cartography.intel.aws._sync_multiple_accounts(
+            neo4j_session, TEST_ACCOUNTS, TEST_UPDATE_TAG, {'UPDATE_TAG': TEST_UPDATE_TAG}, True, config=test_config,
+        )
+
+    # Every account was still attempted and every failure was reported.
+    message = str(e.value)
+    assert message.count('KeyError') == len(TEST_ACCOUNTS.keys())
+    for account_id in TEST_ACCOUNTS.values():
+        assert account_id in message
+    assert mock_sync_one.call_count == len(TEST_ACCOUNTS.keys())
+    assert mock_cleanup.call_count == 0
+
+
 @mock.patch('cartography.intel.aws.boto3.Session')
 @mock.patch('cartography.intel.aws.organizations')
 @mock.patch.object(cartography.intel.aws, '_sync_multiple_accounts', return_value=True)
@@ -206,7 +282,7 @@ def test_sync_one_account_all_sync_functions(
 
     # Test that ALL syncs got called.
     for sync_name in cartography.intel.aws.resources.RESOURCE_FUNCTIONS.keys():
-        AWS_RESOURCE_FUNCTIONS_STUB[sync_name].assert_called_with(**aws_sync_test_kwargs)
+        assert_sync_called_with(AWS_RESOURCE_FUNCTIONS_STUB[sync_name], aws_sync_test_kwargs)
 
     # Check that the boilerplate functions get called as expected. Brittle, but a good sanity check.
     assert mock_autodiscover.call_count == 0
@@ -229,15 +305,53 @@ def test_sync_one_account_just_iam_rels_and_tags(
     )
 
     # Test that the syncs we requested (IAM, perm rels, tags) actually got called.
-    AWS_RESOURCE_FUNCTIONS_STUB['iam'].assert_called_with(**aws_sync_test_kwargs)
-    AWS_RESOURCE_FUNCTIONS_STUB['permission_relationships'].assert_called_with(**aws_sync_test_kwargs)
-    AWS_RESOURCE_FUNCTIONS_STUB['resourcegroupstaggingapi'].assert_called_with(**aws_sync_test_kwargs)
+    assert_sync_called_with(AWS_RESOURCE_FUNCTIONS_STUB['iam'], aws_sync_test_kwargs)
+    assert_sync_called_with(AWS_RESOURCE_FUNCTIONS_STUB['permission_relationships'], aws_sync_test_kwargs)
+    assert_sync_called_with(AWS_RESOURCE_FUNCTIONS_STUB['resourcegroupstaggingapi'], aws_sync_test_kwargs)
 
     # _sync_one_account() above did not specify regions, so we expect 1 call to _autodiscover_account_regions().
     assert mock_autodiscover.call_count == 1
     assert mock_cleanup.call_count == 0
 
 
+@mock.patch('cartography.intel.aws.boto3.Session')
+@mock.patch.dict('cartography.intel.aws.RESOURCE_FUNCTIONS', AWS_RESOURCE_FUNCTIONS_STUB)
+@mock.patch.object(cartography.intel.aws, '_autodiscover_account_regions', return_value=TEST_REGIONS)
+@mock.patch.object(cartography.intel.aws, 'get_session_factory')
+def test_sync_one_account_concurrently(mock_get_session_factory, mock_autodiscover, mock_boto3_session, neo4j_session):
+    worker_session = mock.MagicMock()
+    mock_get_session_factory.return_value.new_session.return_value.__enter__.return_value = worker_session
+    for stub in AWS_RESOURCE_FUNCTIONS_STUB.values():
+        stub.reset_mock()
+
+    cartography.intel.aws._sync_one_account(
+        neo4j_session, mock_boto3_session(), '1234', TEST_UPDATE_TAG, GRAPH_JOB_PARAMETERS,
+        regions=TEST_REGIONS,
+        aws_requested_syncs=['iam', 'ec2:instance', 'ssm', 'resourcegroupstaggingapi'],
+        max_workers=4,
+    )
+
+    # Each resource sync runs on its own worker session.
+    for sync_name in ['iam', 'ec2:instance', 'ssm', 'resourcegroupstaggingapi']:
+        AWS_RESOURCE_FUNCTIONS_STUB[sync_name].assert_called_once()
+        assert AWS_RESOURCE_FUNCTIONS_STUB[sync_name].call_args.kwargs['neo4j_session'] is worker_session
+    assert AWS_RESOURCE_FUNCTIONS_STUB['s3'].call_count == 0
+    assert mock_get_session_factory.return_value.new_session.call_count == 4
+    assert mock_autodiscover.call_count == 0
+
+
+@mock.patch.dict('cartography.intel.aws.RESOURCE_FUNCTIONS', AWS_RESOURCE_FUNCTIONS_STUB)
+def test_sync_one_account_raises_on_unknown_sync(neo4j_session):
+    AWS_RESOURCE_FUNCTIONS_STUB['iam'].reset_mock()
+    with raises(ValueError):
+        cartography.intel.aws._sync_one_account(
+            neo4j_session, mock.MagicMock(), '1234', TEST_UPDATE_TAG, GRAPH_JOB_PARAMETERS,
+            regions=TEST_REGIONS,
+            aws_requested_syncs=['iam', 'not-a-real-sync'],
+        )
+    assert AWS_RESOURCE_FUNCTIONS_STUB['iam'].call_count == 0
+
+
 def test_standardize_aws_sync_kwargs():
     """
     Makes sure that we always use a standard set of parameter names for AWS syncs referenced in the
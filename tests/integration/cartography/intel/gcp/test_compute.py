@@ -1,3 +1,5 @@
+import copy
+
 import cartography.intel.gcp.compute
 import tests.data.gcp.compute
 
@@ -228,6 +230,8 @@ def test_transform_and_load_firewalls(neo4j_session):
     :param neo4j_session:
     :return:
     """
+    # Firewalls are attached to VPCs that have already been loaded
+    _ensure_local_neo4j_has_test_vpc_data(neo4j_session)
     fw_list = cartography.intel.gcp.compute.transform_gcp_firewall(tests.data.gcp.compute.LIST_FIREWALLS_RESPONSE)
     cartography.intel.gcp.compute.load_gcp_ingress_firewalls(neo4j_session, fw_list, TEST_UPDATE_TAG)
 
@@ -399,6 +403,34 @@ def test_instance_to_vpc(neo4j_session):
     assert actual_nodes == expected_nodes
 
 
+def test_shared_vpc_instance_to_host_project_subnet_and_vpc(neo4j_session):
+    """
+    Ensure that an instance of a Shared VPC service project is attached to the subnet and VPC of the host project, even
+    if the host project has not been synced yet
+    """
+    instance = copy.deepcopy(tests.data.gcp.compute.TRANSFORMED_GCP_INSTANCES[0])
+    instance_id = 'projects/service-project/zones/europe-west2-b/instances/shared-vpc-instance'
+    host_vpc_id = 'projects/host-project/global/networks/shared'
+    host_subnet_id = 'projects/host-project/regions/europe-west2/subnetworks/shared'
+    instance['partial_uri'] = instance_id
+    instance['project_id'] = 'service-project'
+    for nic in instance['networkInterfaces']:
+        nic['vpc_partial_uri'] = host_vpc_id
+        nic['subnet_partial_uri'] = host_subnet_id
+
+    cartography.intel.gcp.compute.load_gcp_instances(neo4j_session, [instance], TEST_UPDATE_TAG)
+
+    query = """
+    MATCH (i:GCPInstance{id:$InstanceId})-[:NETWORK_INTERFACE]->(:GCPNetworkInterface)
+          -[:PART_OF_SUBNET]->(subnet:GCPSubnet)<-[:RESOURCE]-(vpc:GCPVpc)<-[:MEMBER_OF_GCP_VPC]-(i)
+    MATCH (i)-[:TAGGED]->(:GCPNetworkTag)-[:DEFINED_IN]->(vpc)
+    RETURN DISTINCT subnet.id, vpc.id
+    """
+    nodes = neo4j_session.run(query, InstanceId=instance_id)
+    actual_nodes = {(n['subnet.id'], n['vpc.id']) for n in nodes}
+    assert actual_nodes == {(host_subnet_id, host_vpc_id)}
+
+
 def test_vpc_to_firewall_to_iprule_to_iprange(neo4j_session):
     _ensure_local_neo4j_has_test_vpc_data(neo4j_session)
     _ensure_local_neo4j_has_test_firewall_data(neo4j_session)
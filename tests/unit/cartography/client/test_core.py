@@ -0,0 +1,364 @@
+from unittest import mock
+
+import neo4j
+import pytest
+
+from cartography.client.core.session import set_session_factory
+from cartography.client.core.tx import AdaptiveBatchSizer
+from cartography.client.core.tx import ensure_indexes
+from cartography.client.core.tx import get_bad_rows
+from cartography.client.core.tx import get_change_counts
+from cartography.client.core.tx import load
+from cartography.client.core.tx import load_graph_data
+from cartography.client.core.tx import load_graph_data_concurrently
+from cartography.client.core.tx import MIN_CONCURRENT_LOAD_SIZE
+from cartography.client.core.tx import reset_bad_rows
+from cartography.client.core.tx import reset_change_counts
+from cartography.client.core.tx import reset_index_registry
+from cartography.client.core.tx import set_change_detection
+from cartography.client.core.tx import set_max_load_writers
+from cartography.client.core.tx import set_shared_node_lock
+from cartography.client.core.tx import set_two_phase_ingestion
+from cartography.client.core.tx import shared_node_writes
+from cartography.graph.querybuilder import build_create_index_queries
+from cartography.graph.querybuilder import CONTENT_HASH_FIELD
+from cartography.models.aws.iam.trusted_principal import AWSTrustedPrincipalAccountSchema
+from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetSchema
+from tests.data.graph.querybuilder.sample_models.simple_node import SimpleNodeSchema
+
+
+def test_load_graph_data_streams_generator_in_batches():
+    neo4j_session = mock.MagicMock()
+    consumed = []
+
+    def generate_items():
+        for i in range(25):
+            consumed.append(i)
+            yield {'id': i}
+
+    batch_sizer = AdaptiveBatchSizer(initial_size=10, min_size=10, max_size=10)
+    load_graph_data(neo4j_session, 'UNWIND $DictList AS item', generate_items(), batch_sizer=batch_sizer, lastupdated=1)
+
+    batches = [c.kwargs['DictList'] for c in neo4j_session.write_transaction.call_args_list]
+    assert [len(b) for b in batches] == [10, 10, 5]
+    assert all(c.kwargs['lastupdated'] == 1 for c in neo4j_session.write_transaction.call_args_list)
+    assert 'batch_sizer' not in neo4j_session.write_transaction.call_args.kwargs
+    assert len(consumed) == 25
+
+
+def test_adaptive_batch_sizer_cuts_batches_by_payload_bytes():
+    batch_sizer = AdaptiveBatchSizer(initial_size=100, min_size=10, target_bytes=1000)
+    items = [{'id': i, 'policy': 'x' * 300} for i in range(10)]
+
+    # Each item is a bit over 300 bytes, so a batch is cut once it holds 4 items even though min_size is 10.
+    assert [len(b) for b in batch_sizer.batches(items)] == [4, 4, 2]
+
+
+def test_adaptive_batch_sizer_samples_payload_sizes():
+    batch_sizer = AdaptiveBatchSizer(initial_size=100, min_size=10, max_size=100)
+    items = [{'id': i} for i in range(200)]
+
+    with mock.patch('cartography.client.core.tx.estimate_payload_bytes', return_value=10) as estimate:
+        assert [len(b) for b in batch_sizer.batches(items)] == [100, 100]
+
+    # Only every PAYLOAD_SAMPLE_INTERVAL-th item of each batch is serialized.
+    assert estimate.call_count == 2 * 7
+
+
+def test_adaptive_batch_sizer_adapts_to_latency():
+    batch_sizer = AdaptiveBatchSizer(initial_size=1000, min_size=100, max_size=3000, target_seconds=2.0)
+
+    # Fast transactions grow the batch size by at most 2x at a time, up to max_size.
+    batch_sizer.record(1000, 0.1)
+    assert batch_sizer.size == 2000
+    batch_sizer.record(2000, 0.1)
+    assert batch_sizer.size == 3000
+
+    # Slow transactions shrink it towards the number of items that fit in target_seconds, down to min_size.
+    batch_sizer.record(3000, 4.0)
+    assert batch_sizer.size == 1500
+    batch_sizer.record(1500, 2.5)
+    assert batch_sizer.size == 1200
+    for _ in range(10):
+        batch_sizer.record(batch_sizer.size, 60.0)
+    assert batch_sizer.size == 100
+
+
+def test_adaptive_batch_sizer_invalid_limits():
+    with pytest.raises(ValueError):
+        AdaptiveBatchSizer(min_size=10, max_size=5)
+
+
+def test_load_graph_data_concurrently_partitions_by_id():
+    sessions = []
+
+    def new_session():
+        session = mock.MagicMock()
+        session.__enter__.return_value = session
+        sessions.append(session)
+        return session
+
+    session_factory = mock.MagicMock()
+    session_factory.new_session.side_effect = new_session
+    items = ({'id': f'node-{i % 50}', 'value': i} for i in range(200))
+
+    load_graph_data_concurrently(session_factory, 'UNWIND $DictList AS item', items, 'id', 4, lastupdated=1)
+
+    assert len(sessions) == 4
+    ids_per_writer = []
+    for session in sessions:
+        written = [item for c in session.write_transaction.call_args_list for item in c.kwargs['DictList']]
+        ids_per_writer.append({item['id'] for item in written})
+    # Every item was written exactly once, and no node id was written by two writers.
+    assert sum(len(c.kwargs['DictList']) for s in sessions for c in s.write_transaction.call_args_list) == 200
+    assert len(set().union(*ids_per_writer)) == sum(len(ids) for ids in ids_per_writer) == 50
+
+
+def test_load_graph_data_concurrently_raises_writer_error():
+    session = mock.MagicMock()
+    session.__enter__.return_value = session
+    session.write_transaction.side_effect = ValueError('write failed')
+    session_factory = mock.MagicMock()
+    session_factory.new_session.return_value = session
+
+    with pytest.raises(ValueError, match='write failed'):
+        load_graph_data_concurrently(
+            session_factory, 'UNWIND $DictList AS item', ({'id': i} for i in range(100000)), 'id', 2,
+        )
+
+
+def test_load_writes_small_loads_on_the_caller_session():
+    neo4j_session = mock.MagicMock()
+    session_factory = mock.MagicMock()
+    set_session_factory(session_factory)
+    set_max_load_writers(4)
+    items = ({'Id': i, 'property1': 1, 'property2': 2} for i in range(MIN_CONCURRENT_LOAD_SIZE - 1))
+
+    try:
+        load(neo4j_session, SimpleNodeSchema(), items, lastupdated=1)
+    finally:
+        set_max_load_writers(1)
+        set_session_factory(None)
+
+    session_factory.new_session.assert_not_called()
+    written = neo4j_session.write_transaction.call_args.kwargs['DictList']
+    assert len(written) == MIN_CONCURRENT_LOAD_SIZE - 1
+
+
+def test_load_graph_data_retries_transient_errors():
+    neo4j_session = mock.MagicMock()
+    neo4j_session.write_transaction.side_effect = [neo4j.exceptions.TransientError('deadlock'), None]
+
+    with mock.patch('time.sleep'):
+        load_graph_data(neo4j_session, 'UNWIND $DictList AS item', [{'id': 1}])
+
+    assert neo4j_session.write_transaction.call_count == 2
+
+
+def _fail_on_ids(bad_ids, error_code):
+    def write_transaction(tx_func, query, DictList, **kwargs):
+        if any(item['id'] in bad_ids for item in DictList):
+            raise neo4j.exceptions.Neo4jError.hydrate(code=error_code, message='failed')
+    return write_transaction
+
+
+def test_load_graph_data_isolates_bad_rows():
+    reset_bad_rows()
+    neo4j_session = mock.MagicMock()
+    neo4j_session.write_transaction.side_effect = _fail_on_ids({5}, 'Neo.ClientError.Schema.ConstraintValidationFailed')
+
+    load_graph_data(neo4j_session, 'UNWIND $DictList AS item', [{'id': i} for i in range(8)], stat_key='TestSchema')
+
+    written = [
+        item['id']
+        for call in neo4j_session.write_transaction.call_args_list
+        if 5 not in [item['id'] for item in call.kwargs['DictList']]
+        for item in call.kwargs['DictList']
+    ]
+    assert sorted(written) == [0, 1, 2, 3, 4, 6, 7]
+    bad_rows = get_bad_rows()
+    assert [bad_row['row'] for bad_row in bad_rows['TestSchema']] == [{'id': 5}]
+    assert bad_rows['TestSchema'][0]['error'].startswith('Neo.ClientError.Schema.ConstraintValidationFailed')
+    reset_bad_rows()
+
+
+def test_load_graph_data_splits_batches_that_run_out_of_memory():
+    neo4j_session = mock.MagicMock()
+
+    def write_transaction(tx_func, query, DictList, **kwargs):
+        if len(DictList) > 2:
+            raise neo4j.exceptions.Neo4jError.hydrate(
+                code='Neo.TransientError.General.MemoryPoolOutOfMemoryError', message='out of memory',
+            )
+    neo4j_session.write_transaction.side_effect = write_transaction
+
+    load_graph_data(neo4j_session, 'UNWIND $DictList AS item', [{'id': i} for i in range(8)])
+
+    # The memory error is not retried as is: 1 batch of 8, 2 of 4 and 4 of 2.
+    assert neo4j_session.write_transaction.call_count == 7
+    assert get_bad_rows() == {}
+
+
+def test_load_graph_data_raises_query_errors():
+    neo4j_session = mock.MagicMock()
+    neo4j_session.write_transaction.side_effect = _fail_on_ids({0}, 'Neo.ClientError.Statement.SyntaxError')
+
+    with pytest.raises(neo4j.exceptions.ClientError):
+        load_graph_data(neo4j_session, 'UNWIND $DictList AS item', [{'id': i} for i in range(8)])
+    assert neo4j_session.write_transaction.call_count == 1
+
+
+@pytest.mark.parametrize('error_code', [
+    'Neo.ClientError.Statement.SemanticError',
+    'Neo.ClientError.Statement.TypeError',
+    'Neo.ClientError.Statement.ArgumentError',
+])
+def test_load_graph_data_raises_semantic_and_type_errors(error_code):
+    neo4j_session = mock.MagicMock()
+    neo4j_session.write_transaction.side_effect = _fail_on_ids({5}, error_code)
+
+    with pytest.raises(neo4j.exceptions.ClientError):
+        load_graph_data(neo4j_session, 'UNWIND $DictList AS item', [{'id': i} for i in range(8)])
+    assert neo4j_session.write_transaction.call_count == 1
+
+
+def test_load_graph_data_raises_when_every_row_fails():
+    reset_bad_rows()
+    neo4j_session = mock.MagicMock()
+    neo4j_session.write_transaction.side_effect = _fail_on_ids(
+        set(range(8)), 'Neo.ClientError.Schema.ConstraintValidationFailed',
+    )
+
+    with pytest.raises(neo4j.exceptions.ClientError):
+        load_graph_data(neo4j_session, 'UNWIND $DictList AS item', [{'id': i} for i in range(8)], stat_key='TestSchema')
+    # The rows are not reported as bad rows, since the error is raised.
+    assert get_bad_rows() == {}
+
+
+def test_ensure_indexes_runs_each_query_once_per_registry():
+    # Arrange
+    reset_index_registry()
+    neo4j_session = mock.MagicMock()
+    expected = build_create_index_queries(InterestingAssetSchema())
+
+    # Act
+    ensure_indexes(neo4j_session, InterestingAssetSchema())
+    ensure_indexes(neo4j_session, InterestingAssetSchema())
+
+    # Assert
+    assert [c.args[0] for c in neo4j_session.run.call_args_list] == expected
+
+    # Act: a reset causes the indexes to be ensured again
+    reset_index_registry()
+    ensure_indexes(neo4j_session, InterestingAssetSchema())
+
+    # Assert
+    assert neo4j_session.run.call_count == 2 * len(expected)
+
+
+def test_load_with_change_detection_hashes_items_and_counts_changes():
+    # Arrange
+    neo4j_session = mock.MagicMock()
+    neo4j_session.write_transaction.return_value = (1, 2)
+    items = [
+        {'Id': 'a', 'property1': 1, 'property2': 2},
+        {'Id': 'b', 'property1': 1, 'property2': 2},
+        {'Id': 'a', 'property1': 1, 'property2': 3},
+    ]
+    reset_change_counts()
+    set_change_detection(True)
+
+    # Act
+    try:
+        load(neo4j_session, SimpleNodeSchema(), items, lastupdated=1)
+        load(neo4j_session, SimpleNodeSchema(), items[:1], lastupdated=2)
+    finally:
+        set_change_detection(False)
+
+    # Assert: each item carries a hash of its properties; the update tag does not affect it.
+    first_batch = neo4j_session.write_transaction.call_args_list[0].kwargs['DictList']
+    second_batch = neo4j_session.write_transaction.call_args_list[1].kwargs['DictList']
+    hashes = [item[CONTENT_HASH_FIELD] for item in first_batch]
+    assert hashes[0] != hashes[1] != hashes[2]
+    assert second_batch[0][CONTENT_HASH_FIELD] == hashes[0]
+    assert CONTENT_HASH_FIELD not in items[0]
+    assert 'AS unchanged' in neo4j_session.write_transaction.call_args.args[1]
+    assert get_change_counts() == {'SimpleNodeSchema': {'changed': 2, 'unchanged': 4}}
+
+
+def test_load_without_change_detection_writes_items_unchanged():
+    # Arrange
+    neo4j_session = mock.MagicMock()
+    items = [{'Id': 'a', 'property1': 1, 'property2': 2}]
+
+    # Act
+    load(neo4j_session, SimpleNodeSchema(), items, lastupdated=1)
+
+    # Assert
+    assert neo4j_session.write_transaction.call_args.kwargs['DictList'] == items
+
+
+def test_load_sends_only_referenced_keys():
+    # Arrange
+    neo4j_session = mock.MagicMock()
+    items = [{'Id': 'a', 'property1': 1, 'raw_response': {'huge': ['nested'] * 100}}]
+
+    # Act
+    with mock.patch('cartography.client.core.tx.stat_handler') as stat_handler:
+        stat_handler.is_enabled.return_value = True
+        load(neo4j_session, SimpleNodeSchema(), items, lastupdated=1)
+
+    # Assert
+    assert neo4j_session.write_transaction.call_args.kwargs['DictList'] == [{'Id': 'a', 'property1': 1}]
+    stat_name, bytes_saved = stat_handler.incr.call_args.args
+    assert stat_name == 'SimpleNodeSchema.projection_bytes_saved'
+    assert bytes_saved > 1000
+
+
+def test_load_in_two_phases_writes_nodes_then_relationships_sorted_by_target():
+    # Arrange
+    neo4j_session = mock.MagicMock()
+    items = [
+        {'Id': 'a', 'hello_asset_id': 'h2', 'world_asset_id': 'w1', 'raw': 'unused'},
+        {'Id': 'b', 'hello_asset_id': 'h1', 'world_asset_id': None},
+        {'Id': 'c', 'hello_asset_id': 'h3', 'world_asset_id': 'w2'},
+    ]
+    set_two_phase_ingestion(True)
+
+    # Act
+    try:
+        load(neo4j_session, InterestingAssetSchema(), (item for item in items), lastupdated=1, sub_resource_id='s')
+    finally:
+        set_two_phase_ingestion(False)
+
+    # Assert: the nodes are written without relationships first, then one query per relationship type.
+    calls = neo4j_session.write_transaction.call_args_list
+    queries = [c.args[1] for c in calls]
+    assert len(calls) == 4
+    assert 'CALL {' not in queries[0] and 'MERGE (i:InterestingAsset' in queries[0]
+    assert [item['Id'] for item in calls[0].kwargs['DictList']] == ['a', 'b', 'c']
+    assert all('raw' not in item for item in calls[0].kwargs['DictList'])
+    assert 'RELATIONSHIP_LABEL' in queries[1]
+    assert 'ASSOCIATED_WITH' in queries[2]
+    assert [item['hello_asset_id'] for item in calls[2].kwargs['DictList']] == ['h1', 'h2', 'h3']
+    # Items that cannot match the target node are not sent.
+    assert 'CONNECTED' in queries[3]
+    assert [item['world_asset_id'] for item in calls[3].kwargs['DictList']] == ['w1', 'w2']
+
+
+def test_shared_node_writes_holds_the_lock_for_shared_labels():
+    lock = mock.MagicMock()
+    set_shared_node_lock(lock)
+    try:
+        with shared_node_writes({'EC2Instance'}):
+            assert not lock.__enter__.called
+        load(mock.MagicMock(), AWSTrustedPrincipalAccountSchema(), [{'id': '123'}], lastupdated=1)
+    finally:
+        set_shared_node_lock(None)
+
+    assert lock.__enter__.call_count == 1
+    assert lock.__exit__.call_count == 1
+
+    # Without a lock, i.e. when accounts are synced one at a time, writes are not serialized.
+    with shared_node_writes({'AWSAccount'}):
+        pass
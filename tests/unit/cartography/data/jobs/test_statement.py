@@ -1,4 +1,18 @@
+from unittest import mock
+
+import neo4j
+import pytest
+
+from cartography.graph import statement as statement_module
+from cartography.graph.statement import get_precheck_counts
 from cartography.graph.statement import GraphStatement
+from cartography.graph.statement import reset_precheck_counts
+from cartography.graph.statement import rewrite_as_server_side_batches
+from cartography.graph.statement import set_adaptive_iterations
+from cartography.graph.statement import set_cleanup_precheck
+from cartography.graph.statement import set_server_side_iterations
+
+OUT_OF_MEMORY = 'Neo.TransientError.General.MemoryPoolOutOfMemoryError'
 
 
 SAMPLE_STATEMENT_AS_DICT = {
@@ -12,3 +26,200 @@ def test_create_from_json():
     assert statement.parent_job_name == 'my_job_name'
     assert statement.query == "Query goes here"
     assert statement.parent_job_sequence_num == 1
+
+
+def _iteration_result(nodes_deleted: int, relationships_deleted: int = 0) -> mock.MagicMock:
+    result = mock.MagicMock()
+    counters = result.consume.return_value.counters
+    counters.nodes_deleted = nodes_deleted
+    counters.relationships_deleted = relationships_deleted
+    counters.nodes_created = counters.relationships_created = counters.properties_set = 0
+    counters.labels_added = counters.labels_removed = 0
+    counters.contains_updates = bool(nodes_deleted or relationships_deleted)
+    return result
+
+
+def _run_with_limit_sizes(statement: GraphStatement, results: list) -> list:
+    """
+    Runs the iterative statement against a session that returns the given results, or raises them if they are
+    exceptions, and returns the LIMIT_SIZE used for every transaction.
+    """
+    limit_sizes = []
+
+    def write_transaction(tx_func):
+        limit_sizes.append(statement.parameters['LIMIT_SIZE'])
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    session = mock.MagicMock()
+    session.write_transaction.side_effect = write_transaction
+    statement._run_iterative(session)
+    return limit_sizes
+
+
+def test_run_iterative_records_totals_with_fixed_limit_size():
+    statement = GraphStatement('query', iterative=True, iterationsize=100)
+
+    results = [_iteration_result(100, 5), _iteration_result(40), _iteration_result(0)]
+
+    limit_sizes = _run_with_limit_sizes(statement, results)
+
+    assert limit_sizes == [100, 100, 100]
+    assert (statement.iterations, statement.nodes_deleted, statement.relationships_deleted) == (3, 140, 5)
+
+
+def test_run_iterative_adapts_limit_size():
+    statement = GraphStatement('query', iterative=True, iterationsize=100)
+    results = [
+        _iteration_result(100),
+        _iteration_result(200, relationships_deleted=statement_module.ADAPTIVE_ITERATION_MAX_UPDATES * 2),
+        neo4j.exceptions.Neo4jError.hydrate(code=OUT_OF_MEMORY, message='oom'),
+        _iteration_result(0),
+    ]
+
+    set_adaptive_iterations(True)
+    try:
+        with mock.patch.object(statement_module.time, 'monotonic', side_effect=[0, 0.1, 0, 0.1, 0, 0, 0.1]):
+            limit_sizes = _run_with_limit_sizes(statement, results)
+    finally:
+        set_adaptive_iterations(False)
+
+    # Fast transactions double LIMIT_SIZE, too many updates cut it to the memory budget, and running out of memory
+    # halves it.
+    assert limit_sizes == [100, 200, 99, 49]
+    assert statement.iterations == 3
+
+
+def test_run_iterative_raises_memory_error_without_adaptive_iterations():
+    statement = GraphStatement('query', iterative=True, iterationsize=100)
+    error = neo4j.exceptions.Neo4jError.hydrate(code=OUT_OF_MEMORY, message='oom')
+
+    with pytest.raises(neo4j.exceptions.Neo4jError):
+        _run_with_limit_sizes(statement, [error])
+
+
+def test_rewrite_as_server_side_batches():
+    query = """
+        MATCH (n:EC2Instance)<-[:RESOURCE]-(:AWSAccount{id: $AWS_ID})
+        WHERE n.lastupdated <> $UPDATE_TAG
+        WITH n LIMIT $LIMIT_SIZE
+        DETACH DELETE (n) return COUNT(*) as TotalCompleted;
+    """
+
+    rewritten = rewrite_as_server_side_batches(query, 500)
+
+    assert rewritten is not None
+    assert ' '.join(rewritten.split()) == (
+        'MATCH (n:EC2Instance)<-[:RESOURCE]-(:AWSAccount{id: $AWS_ID}) WHERE n.lastupdated <> $UPDATE_TAG '
+        'WITH DISTINCT n CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 500 ROWS'
+    )
+    assert rewrite_as_server_side_batches(
+        'MATCH (n:S3Bucket) WITH n LIMIT $LIMIT_SIZE REMOVE n.anonymous_access', 500,
+    ) is None
+
+
+def _server_side_session(version: str) -> mock.MagicMock:
+    session = mock.MagicMock()
+    session.run.return_value.single.return_value = {'version': version}
+    counters = session.run.return_value.consume.return_value.counters
+    counters.nodes_deleted = 10
+    counters.relationships_deleted = 20
+    return session
+
+
+def test_run_server_side_iterations():
+    statement = GraphStatement(
+        'MATCH (n:X) WITH n LIMIT $LIMIT_SIZE DELETE n', {'UPDATE_TAG': 1}, iterative=True, iterationsize=100,
+    )
+    session = _server_side_session('5.13.0')
+
+    set_server_side_iterations(True)
+    try:
+        statement.run(session)
+    finally:
+        set_server_side_iterations(False)
+
+    query, parameters = session.run.call_args.args
+    assert query.endswith('IN TRANSACTIONS OF 100 ROWS')
+    assert parameters == {'UPDATE_TAG': 1}
+    assert not session.write_transaction.called
+    assert (statement.iterations, statement.nodes_deleted, statement.relationships_deleted) == (1, 10, 20)
+
+
+def test_run_server_side_iterations_falls_back_on_old_servers():
+    statement = GraphStatement('MATCH (n:X) WITH n LIMIT $LIMIT_SIZE DELETE n', iterative=True, iterationsize=100)
+    session = _server_side_session('4.3.9')
+
+    session.write_transaction.return_value = _iteration_result(0)
+
+    set_server_side_iterations(True)
+    try:
+        statement.run(session)
+    finally:
+        set_server_side_iterations(False)
+
+    # Only the version check ran outside of the loop's write transactions.
+    assert session.run.call_count == 1
+    assert 'dbms.components' in session.run.call_args.args[0]
+    assert session.write_transaction.call_count == 1
+
+
+def _run_prechecked(session) -> GraphStatement:
+    statement = GraphStatement(
+        'MATCH (n:X) WITH n LIMIT $LIMIT_SIZE DELETE n', {'UPDATE_TAG': 1}, iterative=True, iterationsize=100,
+        parent_job_name='X', parent_job_sequence_num=1, precheck_query='RETURN 0 AS count',
+    )
+    reset_precheck_counts()
+    set_cleanup_precheck(True)
+    try:
+        statement.run(session)
+    finally:
+        set_cleanup_precheck(False)
+    return statement
+
+
+def test_run_skips_statement_when_precheck_counts_nothing():
+    session = mock.MagicMock()
+    session.read_transaction.return_value = 0
+
+    _run_prechecked(session)
+
+    assert session.read_transaction.call_args.args[1] == 'RETURN 0 AS count'
+    assert not session.write_transaction.called
+    assert get_precheck_counts() == {'X': {'skipped': 1, 'run': 0}}
+
+
+def test_run_runs_statement_when_precheck_counts_stale_records():
+    session = mock.MagicMock()
+    session.read_transaction.return_value = 3
+    session.write_transaction.side_effect = [_iteration_result(3), _iteration_result(0)]
+
+    statement = _run_prechecked(session)
+
+    assert statement.nodes_deleted == 3
+    assert get_precheck_counts() == {'X': {'skipped': 0, 'run': 1}}
+
+
+def test_run_runs_statement_when_precheck_fails():
+    session = mock.MagicMock()
+    session.read_transaction.side_effect = neo4j.exceptions.Neo4jError.hydrate(
+        code='Neo.ClientError.Schema.IndexNotFound', message='No such index',
+    )
+    session.write_transaction.return_value = _iteration_result(0)
+
+    _run_prechecked(session)
+
+    assert session.write_transaction.call_count == 1
+    assert get_precheck_counts() == {}
+
+
+def test_run_ignores_precheck_when_disabled():
+    statement = GraphStatement('MATCH (n:X) DELETE n', precheck_query='RETURN 0 AS count')
+    session = mock.MagicMock()
+
+    statement.run(session)
+
+    assert not session.read_transaction.called
+    assert session.write_transaction.called
@@ -1,4 +1,6 @@
+from cartography.graph.job import get_touched_labels
 from cartography.graph.job import GraphJob
+from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetSchema
 from tests.data.jobs.sample import SAMPLE_CLEANUP_JOB
 
 
@@ -10,3 +12,24 @@ def test_graphjob_from_json():
     assert job.name == "cleanup stale resources"
     assert len(job.statements) == 3
     assert job.short_name is None
+
+
+def test_graphjob_infers_touched_labels():
+    job: GraphJob = GraphJob.from_json(SAMPLE_CLEANUP_JOB)
+    assert job.labels == {'TypeA', 'TypeB'}
+
+    # Anonymous nodes pinned by a parameter only scope the query.
+    assert get_touched_labels([
+        'MATCH (:AWSAccount{id: $AWS_ID})-[:RESOURCE]->(:ECSCluster)-[:HAS_TASK]->(n:ECSTask:Task) DETACH DELETE n',
+    ]) == {'ECSCluster', 'ECSTask', 'Task'}
+
+
+def test_graphjob_from_node_schema_declares_its_labels():
+    job = GraphJob.from_node_schema(InterestingAssetSchema(), {'UPDATE_TAG': 1, 'sub_resource_id': 'a'})
+    assert job.labels == {'InterestingAsset', 'AnotherNodeLabel', 'YetAnotherNodeLabel'}
+
+
+def test_graphjob_from_node_schema_prechecks_the_node_statement():
+    job = GraphJob.from_node_schema(InterestingAssetSchema(), {'UPDATE_TAG': 1, 'sub_resource_id': 'a'})
+    assert job.statements[0].precheck_query is not None
+    assert all(statement.precheck_query is None for statement in job.statements[1:])
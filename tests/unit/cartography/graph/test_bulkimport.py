@@ -0,0 +1,144 @@
+import csv
+from unittest import mock
+
+from cartography.client.core.tx import load
+from cartography.graph.bulkimport import BulkImportCsvExporter
+from cartography.graph.bulkimport import set_bulk_import_exporter
+from cartography.graph.job import GraphJob
+from cartography.graph.statement import GraphStatement
+from tests.data.graph.querybuilder.sample_models.fake_emps_githubusers import FakeEmpSchema
+from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetSchema
+from tests.data.graph.querybuilder.sample_models.pointer_asset import OtherAssetSchema
+from tests.data.graph.querybuilder.sample_models.pointer_asset import PointerAssetSchema
+from tests.data.graph.querybuilder.sample_models.pointer_asset import SubResourceSchema
+
+
+def _read_csv(path):
+    with open(path, newline='') as csv_file:
+        return list(csv.reader(csv_file))
+
+
+def test_bulk_import_exporter_writes_deduplicated_nodes_and_rels(tmp_path):
+    # Arrange
+    exporter = BulkImportCsvExporter(str(tmp_path))
+    items = [
+        {'Id': 'a', 'property1': 1, 'property2': ['x', 'y'], 'hello_asset_id': 'h1'},
+        {'Id': 'b', 'property1': 2, 'property2': ['z'], 'hello_asset_id': None},
+        {'Id': 'a', 'property1': 3, 'property2': ['x', 'y'], 'hello_asset_id': 'h1'},
+    ]
+
+    # Act
+    exporter.add(InterestingAssetSchema(), items, lastupdated=1234, sub_resource_id='sub')
+    exporter.add(SubResourceSchema(), [{'Id': 'sub'}], lastupdated=1234)
+    paths = exporter.write()
+
+    # Assert: nodes are deduplicated by id, keeping the latest properties and their types.
+    nodes = _read_csv(tmp_path / 'nodes_InterestingAsset.csv')
+    assert nodes[0] == [
+        ':ID(InterestingAsset)', 'id:string', 'firstseen:long', 'lastupdated:long', 'property1:long',
+        'property2:string[]', ':LABEL',
+    ]
+    labels = 'AnotherNodeLabel;InterestingAsset;YetAnotherNodeLabel'
+    assert nodes[1:] == [
+        ['a', 'a', str(exporter.firstseen), '1234', '3', 'x;y', labels],
+        ['b', 'b', str(exporter.firstseen), '1234', '2', 'z', labels],
+    ]
+
+    # Assert: relationships respect their direction and skip items without a target.
+    sub_resource_rels = _read_csv(tmp_path / 'relationships_SubResource_RELATIONSHIP_LABEL_InterestingAsset.csv')
+    assert [row[:3] for row in sub_resource_rels] == [
+        [':START_ID(SubResource)', ':END_ID(InterestingAsset)', ':TYPE'],
+        ['sub', 'a', 'RELATIONSHIP_LABEL'],
+        ['sub', 'b', 'RELATIONSHIP_LABEL'],
+    ]
+    # Assert: relationships to nodes that are not exported are left out.
+    assert not (tmp_path / 'relationships_InterestingAsset_ASSOCIATED_WITH_HelloAsset.csv').exists()
+    assert exporter.unresolved_relationships == {'ASSOCIATED_WITH': 1}
+
+    # Assert: the import arguments and indexes are written alongside the CSV files.
+    import_args = (tmp_path / 'neo4j-admin-import.args').read_text().splitlines()
+    assert [f'--nodes={path}' for path in paths[:2]] == [arg for arg in import_args if arg.startswith('--nodes=')]
+    assert 'CREATE INDEX IF NOT EXISTS' in (tmp_path / 'indexes.cypher').read_text()
+
+
+def test_bulk_import_exporter_skips_rels_not_matched_on_id(tmp_path):
+    # Arrange
+    exporter = BulkImportCsvExporter(str(tmp_path))
+
+    # Act
+    exporter.add(FakeEmpSchema(), [{'id': 1, 'email': 'a@b.c', 'github_username': 'A'}], lastupdated=1)
+    paths = exporter.write()
+
+    # Assert
+    assert exporter.skipped_relationships == {'IDENTITY_GITHUB': 1}
+    assert paths == [str(tmp_path / 'nodes_FakeEmployee.csv')]
+    assert _read_csv(paths[0])[1][:2] == ['1', '1']
+
+
+def test_bulk_import_exporter_shares_id_spaces_of_labels_that_rels_point_to(tmp_path):
+    # Arrange
+    exporter = BulkImportCsvExporter(str(tmp_path))
+
+    # Act: OtherAsset and InterestingAsset both carry AnotherNodeLabel, which PointerAsset points to.
+    exporter.add(InterestingAssetSchema(), [{'Id': 'a', 'property1': 1}], lastupdated=1, sub_resource_id='sub')
+    exporter.add(OtherAssetSchema(), [{'Id': 'o'}, {'Id': 'a'}], lastupdated=2)
+    exporter.add(
+        PointerAssetSchema(),
+        [{'Id': 'p1', 'target_id': 'a'}, {'Id': 'p2', 'target_id': 'o'}, {'Id': 'p3', 'target_id': 'missing'}],
+        lastupdated=1,
+    )
+    exporter.write()
+
+    # Assert: the labels share one ID space, and the node with the same id in it is merged.
+    interesting_assets = _read_csv(tmp_path / 'nodes_InterestingAsset.csv')
+    other_assets = _read_csv(tmp_path / 'nodes_OtherAsset.csv')
+    assert interesting_assets[0][0] == other_assets[0][0] == ':ID(InterestingAsset)'
+    assert [row[0] for row in other_assets[1:]] == ['o']
+    assert interesting_assets[1][-1] == 'AnotherNodeLabel;InterestingAsset;OtherAsset;YetAnotherNodeLabel'
+
+    # Assert: relationships find their targets in the shared ID space, and unresolved ones are left out.
+    pointer_rels = _read_csv(tmp_path / 'relationships_PointerAsset_POINTS_TO_AnotherNodeLabel.csv')
+    assert pointer_rels[0][:2] == [':START_ID(PointerAsset)', ':END_ID(InterestingAsset)']
+    assert [row[:2] for row in pointer_rels[1:]] == [['p1', 'a'], ['p2', 'o']]
+    assert exporter.unresolved_relationships == {'POINTS_TO': 1, 'RELATIONSHIP_LABEL': 1}
+
+
+def test_load_and_jobs_use_bulk_import_exporter(tmp_path):
+    # Arrange
+    exporter = BulkImportCsvExporter(str(tmp_path))
+    neo4j_session = mock.MagicMock()
+    set_bulk_import_exporter(exporter)
+
+    # Act
+    try:
+        load(neo4j_session, InterestingAssetSchema(), [{'Id': 'a'}], lastupdated=1, sub_resource_id='sub')
+        GraphJob.from_node_schema(
+            InterestingAssetSchema(), {'UPDATE_TAG': 1, 'sub_resource_id': 'sub'},
+        ).run(neo4j_session)
+    finally:
+        set_bulk_import_exporter(None)
+
+    # Assert: nothing was sent to Neo4j.
+    neo4j_session.run.assert_not_called()
+    neo4j_session.write_transaction.assert_not_called()
+    assert exporter.write() == [str(tmp_path / 'nodes_InterestingAsset.csv')]
+
+
+def test_jobs_on_labels_that_are_not_exported_still_run(tmp_path):
+    # Arrange
+    exporter = BulkImportCsvExporter(str(tmp_path))
+    exporter.add(FakeEmpSchema(), [{'id': 1, 'email': 'a@b.c'}], lastupdated=1)
+    neo4j_session = mock.MagicMock()
+    set_bulk_import_exporter(exporter)
+
+    # Act
+    try:
+        with mock.patch.object(GraphStatement, 'run') as mock_run:
+            GraphJob.from_node_schema(
+                InterestingAssetSchema(), {'UPDATE_TAG': 1, 'sub_resource_id': 'sub'},
+            ).run(neo4j_session)
+    finally:
+        set_bulk_import_exporter(None)
+
+    # Assert: InterestingAssets are not in the export, so the modules that wrote them wrote them to Neo4j.
+    mock_run.assert_called_with(neo4j_session)
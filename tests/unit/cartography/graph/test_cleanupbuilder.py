@@ -4,6 +4,7 @@ import pytest
 
 from cartography.graph.cleanupbuilder import _build_cleanup_node_and_rel_queries
 from cartography.graph.cleanupbuilder import build_cleanup_queries
+from cartography.graph.cleanupbuilder import build_stale_node_count_query
 from cartography.graph.job import get_parameters
 from cartography.models.aws.emr import EMRClusterToAWSAccount
 from tests.data.graph.querybuilder.sample_models.asset_with_non_kwargs_tgm import FakeEC2InstanceSchema
@@ -131,3 +132,23 @@ def test_build_cleanup_queries_selected_rels_no_sub_res_raises_exc():
 def test_build_cleanup_node_and_rel_queries_sub_res_tgm_not_validated_raises_exc():
     with pytest.raises(ValueError, match='must have set_in_kwargs=True'):
         _build_cleanup_node_and_rel_queries(FakeEC2InstanceSchema(), FakeEC2InstanceToAWSAccount())
+
+
+def test_build_stale_node_count_query():
+    """
+    Test that the stale node count query is anchored on the sub resource like the cleanup node query.
+    """
+    actual_query: str = build_stale_node_count_query(InterestingAssetSchema())
+    expected_query = """
+        MATCH (n:InterestingAsset)<-[:RELATIONSHIP_LABEL]-(:SubResource{id: $sub_resource_id})
+        WHERE n.lastupdated <> $UPDATE_TAG
+        WITH n LIMIT 1
+        RETURN count(n) AS count;
+    """
+    assert clean_query_list([actual_query]) == clean_query_list([expected_query])
+    assert get_parameters([actual_query]) == {'UPDATE_TAG', 'sub_resource_id'}
+
+
+def test_build_stale_node_count_query_no_sub_res_raises_exc():
+    with pytest.raises(ValueError, match='node_schema without a sub resource relationship is not supported'):
+        build_stale_node_count_query(SimpleNodeSchema())
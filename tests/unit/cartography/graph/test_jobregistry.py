@@ -0,0 +1,42 @@
+import pytest
+
+from cartography.graph.jobregistry import get_job_registry
+from cartography.graph.jobregistry import parse_job
+from tests.data.jobs.sample import SAMPLE_CLEANUP_JOB
+
+
+def test_job_registry_loads_packaged_jobs():
+    registry = get_job_registry()
+
+    job = registry.get('cartography.data.jobs.cleanup', 'aws_import_tgw_cleanup.json')
+
+    assert job is not None
+    assert job.short_name == 'aws_import_tgw_cleanup'
+    assert registry.get('cartography.data.jobs.cleanup', 'does_not_exist.json') is None
+
+
+def test_job_spec_bind_does_not_share_parameters():
+    job = parse_job(SAMPLE_CLEANUP_JOB, 'sample')
+
+    first = job.bind({'UPDATE_TAG': 1})
+    second = job.bind({'UPDATE_TAG': 2})
+
+    assert first.name == 'cleanup stale resources'
+    assert [s.parent_job_sequence_num for s in first.statements] == [1, 2, 3]
+    assert first.statements[0].parameters['UPDATE_TAG'] == 1
+    assert second.statements[0].parameters['UPDATE_TAG'] == 2
+    assert 'UPDATE_TAG' not in job.statements[0].parameters
+
+
+@pytest.mark.parametrize(
+    'blob', [
+        '{"name": "broken", "statements": [',
+        '{"statements": [{"query": "MATCH (n) RETURN n"}]}',
+        '{"name": "no statements", "statements": []}',
+        '{"name": "no query", "statements": [{"iterative": false}]}',
+        '{"name": "no size", "statements": [{"query": "MATCH (n) DELETE n", "iterative": true}]}',
+    ],
+)
+def test_parse_job_rejects_malformed_jobs(blob):
+    with pytest.raises(ValueError, match='malformed_job'):
+        parse_job(blob, 'malformed_job')
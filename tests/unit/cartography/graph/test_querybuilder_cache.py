@@ -0,0 +1,47 @@
+from cartography.graph.querybuilder import build_create_index_queries
+from cartography.graph.querybuilder import build_ingestion_query
+from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetSchema
+from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetToHelloAssetRel
+from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetToSubResourceRel
+
+
+def test_build_ingestion_query_is_memoized_across_schema_instances():
+    # Act
+    first = build_ingestion_query(InterestingAssetSchema())
+    second = build_ingestion_query(InterestingAssetSchema())
+
+    # Assert: fresh instances of the same schema reuse the compiled query
+    assert first is second
+
+
+def test_build_ingestion_query_cache_keys_on_selected_relationships():
+    # Act
+    full = build_ingestion_query(InterestingAssetSchema())
+    selected = build_ingestion_query(
+        InterestingAssetSchema(),
+        selected_relationships={InterestingAssetToSubResourceRel(), InterestingAssetToHelloAssetRel()},
+    )
+    selected_again = build_ingestion_query(
+        InterestingAssetSchema(),
+        selected_relationships={InterestingAssetToHelloAssetRel(), InterestingAssetToSubResourceRel()},
+    )
+    sub_resource_only = build_ingestion_query(
+        InterestingAssetSchema(),
+        selected_relationships={InterestingAssetToSubResourceRel()},
+    )
+
+    # Assert
+    assert selected is selected_again
+    assert selected != full
+    assert sub_resource_only != selected
+
+
+def test_build_create_index_queries_returns_a_copy():
+    # Arrange
+    queries = build_create_index_queries(InterestingAssetSchema())
+
+    # Act: mutating the result must not leak into the cache
+    queries.append('garbage')
+
+    # Assert
+    assert 'garbage' not in build_create_index_queries(InterestingAssetSchema())
@@ -0,0 +1,54 @@
+from cartography.graph.querybuilder import build_ingestion_query
+from cartography.graph.querybuilder import get_content_hash_property
+from tests.data.graph.querybuilder.sample_models.simple_node import SimpleNodeSchema
+from tests.data.graph.querybuilder.sample_models.simple_node import SimpleNodeWithSubResourceSchema
+from tests.unit.cartography.graph.helpers import remove_leading_whitespace_and_empty_lines
+
+
+def test_build_ingestion_query_with_change_detection():
+    # Act
+    query = build_ingestion_query(SimpleNodeSchema(), change_detection=True)
+
+    expected = """
+        UNWIND $DictList AS item
+            MERGE (i:SimpleNode{id: item.Id})
+            ON CREATE SET i.firstseen = timestamp()
+            WITH i, item, coalesce(i.content_hash_SimpleNodeSchema = item.content_hash, false) AS unchanged
+            SET i.lastupdated = $lastupdated
+            FOREACH (_ IN CASE WHEN unchanged THEN [] ELSE [1] END |
+                SET
+                    i.content_hash_SimpleNodeSchema = item.content_hash,
+                    i.lastupdated = $lastupdated,
+                    i.property1 = item.property1,
+                    i.property2 = item.property2
+            )
+            WITH count(DISTINCT i) AS nodes, count(DISTINCT CASE WHEN NOT unchanged THEN i END) AS changed
+            RETURN changed, nodes - changed AS unchanged
+    """
+
+    # Assert: compare query outputs while ignoring leading whitespace.
+    actual_query = remove_leading_whitespace_and_empty_lines(query)
+    expected_query = remove_leading_whitespace_and_empty_lines(expected)
+    assert actual_query == expected_query
+
+
+def test_build_ingestion_query_with_change_detection_carries_flag_past_relationships():
+    # Act
+    query = build_ingestion_query(SimpleNodeWithSubResourceSchema(), change_detection=True)
+
+    # Assert: the flag survives the relationship subqueries so that it can be counted at the end.
+    actual_query = remove_leading_whitespace_and_empty_lines(query)
+    assert 'WITH i, item, unchanged\nCALL {' in actual_query
+    assert actual_query.endswith('RETURN changed, nodes - changed AS unchanged')
+    assert query != build_ingestion_query(SimpleNodeWithSubResourceSchema())
+
+
+def test_build_ingestion_query_with_change_detection_stores_a_hash_per_schema():
+    # Act
+    query = build_ingestion_query(SimpleNodeSchema(), change_detection=True)
+    other_query = build_ingestion_query(SimpleNodeWithSubResourceSchema(), change_detection=True)
+
+    # Assert: schemas that write the same label do not overwrite each other's hash.
+    assert get_content_hash_property(SimpleNodeSchema()) != get_content_hash_property(SimpleNodeWithSubResourceSchema())
+    assert f'i.{get_content_hash_property(SimpleNodeSchema())} = item.content_hash' in query
+    assert f'i.{get_content_hash_property(SimpleNodeWithSubResourceSchema())} = item.content_hash' in other_query
@@ -1,4 +1,5 @@
 from cartography.graph.querybuilder import build_ingestion_query
+from cartography.graph.querybuilder import get_referenced_item_keys
 from tests.data.graph.querybuilder.sample_models.fake_emps_githubusers import FakeEmpSchema
 from tests.data.graph.querybuilder.sample_models.simple_node import SimpleNodeSchema
 from tests.data.graph.querybuilder.sample_models.simple_node import SimpleNodeWithSubResourceSchema
@@ -90,3 +91,11 @@ def test_build_ingestion_query_case_insensitive_match():
     actual_query = remove_leading_whitespace_and_empty_lines(query)
     expected_query = remove_leading_whitespace_and_empty_lines(expected)
     assert actual_query == expected_query
+
+
+def test_get_referenced_item_keys():
+    # Act
+    keys = get_referenced_item_keys(build_ingestion_query(FakeEmpSchema()))
+
+    # Assert: kwargs like $lastupdated are not item keys.
+    assert keys == {'id', 'email', 'github_username'}
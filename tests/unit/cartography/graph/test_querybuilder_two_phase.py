@@ -0,0 +1,66 @@
+import pytest
+
+from cartography.graph.querybuilder import build_ingestion_query
+from cartography.graph.querybuilder import build_relationship_ingestion_query
+from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetSchema
+from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetToHelloAssetRel
+from tests.data.graph.querybuilder.sample_models.interesting_asset import InterestingAssetToSubResourceRel
+from tests.data.graph.querybuilder.sample_models.simple_node import SimpleNodeSchema
+from tests.unit.cartography.graph.helpers import remove_leading_whitespace_and_empty_lines
+
+
+def test_build_relationship_ingestion_query_sub_resource():
+    # Act
+    query = build_relationship_ingestion_query(InterestingAssetSchema(), InterestingAssetToSubResourceRel())
+
+    expected = """
+        UNWIND $DictList AS item
+            MATCH (i:InterestingAsset{id: item.Id})
+            MATCH (j:SubResource)
+            WHERE
+                j.id = $sub_resource_id
+            MERGE (i)<-[r:RELATIONSHIP_LABEL]-(j)
+            ON CREATE SET r.firstseen = timestamp()
+            SET
+                r.lastupdated = $lastupdated,
+                r.another_rel_field = item.AnotherField,
+                r.yet_another_rel_field = item.YetAnotherRelField
+    """
+
+    # Assert: compare query outputs while ignoring leading whitespace.
+    actual_query = remove_leading_whitespace_and_empty_lines(query)
+    expected_query = remove_leading_whitespace_and_empty_lines(expected)
+    assert actual_query == expected_query
+
+
+def test_build_relationship_ingestion_query_other_rel():
+    # Act
+    query = build_relationship_ingestion_query(InterestingAssetSchema(), InterestingAssetToHelloAssetRel())
+
+    expected = """
+        UNWIND $DictList AS item
+            MATCH (i:InterestingAsset{id: item.Id})
+            MATCH (j:HelloAsset)
+            WHERE
+                j.id = item.hello_asset_id
+            MERGE (i)-[r:ASSOCIATED_WITH]->(j)
+            ON CREATE SET r.firstseen = timestamp()
+            SET
+                r.lastupdated = $lastupdated
+    """
+
+    # Assert
+    actual_query = remove_leading_whitespace_and_empty_lines(query)
+    expected_query = remove_leading_whitespace_and_empty_lines(expected)
+    assert actual_query == expected_query
+
+
+def test_build_relationship_ingestion_query_rejects_unknown_rel():
+    with pytest.raises(ValueError):
+        build_relationship_ingestion_query(SimpleNodeSchema(), InterestingAssetToHelloAssetRel())
+
+
+def test_node_phase_query_has_no_relationships():
+    query = build_ingestion_query(InterestingAssetSchema(), selected_relationships=set())
+    assert 'CALL {' not in query
+    assert 'MERGE (i)' not in query
@@ -0,0 +1,85 @@
+import json
+from unittest import mock
+
+from cartography.graph.querylint import get_json_job_queries
+from cartography.graph.querylint import get_node_schemas
+from cartography.graph.querylint import get_schema_queries
+from cartography.graph.querylint import LintQuery
+from cartography.graph.querylint import load_label_counts
+from cartography.graph.querylint import QueryLinter
+from cartography.models.aws.ec2.securitygroups import EC2SecurityGroupSchema
+
+
+def _mock_session(plan):
+    neo4j_session = mock.MagicMock()
+    neo4j_session.run.return_value.consume.return_value.plan = plan
+    return neo4j_session
+
+
+def test_linter_flags_scans_and_cartesian_products():
+    plan = {
+        'operatorType': 'ProduceResults@neo4j',
+        'args': {},
+        'children': [
+            {
+                'operatorType': 'CartesianProduct@neo4j',
+                'args': {},
+                'children': [
+                    {'operatorType': 'AllNodesScan@neo4j', 'args': {'Details': 'n'}, 'children': []},
+                    {'operatorType': 'NodeByLabelScan@neo4j', 'args': {'Details': 'r:AWSRole'}, 'children': []},
+                ],
+            },
+        ],
+    }
+    neo4j_session = _mock_session(plan)
+
+    findings = QueryLinter(neo4j_session).lint(
+        LintQuery('test', 'MATCH (n), (r:AWSRole{id: $AWS_ID}) RETURN n'),
+    )
+
+    assert [(f.operator, f.label, f.label_count) for f in findings] == [
+        ('CartesianProduct', None, None),
+        ('AllNodesScan', None, None),
+        ('NodeByLabelScan', 'AWSRole', None),
+    ]
+    explain_call = neo4j_session.run.call_args_list[0]
+    assert explain_call.args == ('EXPLAIN MATCH (n), (r:AWSRole{id: $AWS_ID}) RETURN n', {'AWS_ID': None})
+    # The empty database that queries are linted against is never asked for label counts.
+    assert neo4j_session.run.call_count == 1
+
+
+def test_linter_ignores_label_scans_on_small_labels():
+    plan = {'operatorType': 'NodeByLabelScan@neo4j', 'args': {'Details': 'n:AWSAccount'}, 'children': []}
+
+    assert QueryLinter(_mock_session(plan)).lint(LintQuery('test', 'MATCH (n)')) == []
+    assert len(QueryLinter(_mock_session(plan), small_labels=set()).lint(LintQuery('test', 'MATCH (n)'))) == 1
+
+
+def test_linter_uses_label_counts(tmp_path):
+    plan = {'operatorType': 'NodeByLabelScan@neo4j', 'args': {'Details': 'n:AWSRole'}, 'children': []}
+    label_counts_file = tmp_path / 'label_counts.json'
+    label_counts_file.write_text(json.dumps({'AWSRole': 50000, 'AWSUser': 10}))
+    label_counts = load_label_counts(str(label_counts_file))
+
+    findings = QueryLinter(_mock_session(plan), label_counts=label_counts, large_label_threshold=10000).lint(
+        LintQuery('test', 'MATCH (n:AWSRole)'),
+    )
+    assert [(f.operator, f.label, f.label_count) for f in findings] == [('NodeByLabelScan', 'AWSRole', 50000)]
+
+    plan['args']['Details'] = 'n:AWSUser'
+    assert QueryLinter(_mock_session(plan), label_counts=label_counts, large_label_threshold=10000).lint(
+        LintQuery('test', 'MATCH (n:AWSUser)'),
+    ) == []
+
+
+def test_lint_query_collection():
+    node_schemas = get_node_schemas()
+    assert any(isinstance(node_schema, EC2SecurityGroupSchema) for node_schema in node_schemas)
+
+    sources = {lint_query.source for lint_query in get_schema_queries(node_schemas)}
+    assert 'EC2SecurityGroupSchema:ingestion' in sources
+    assert 'EC2SecurityGroupSchema:cleanup#0' in sources
+    assert 'EC2SecurityGroupSchema:stale_count' in sources
+
+    job_sources = {lint_query.source for lint_query in get_json_job_queries()}
+    assert 'analysis/aws_ec2_asset_exposure.json#0' in job_sources
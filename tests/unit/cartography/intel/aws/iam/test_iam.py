@@ -116,3 +116,42 @@ def test_transform_policy_data_correctly_creates_lists_of_statements():
 
     # Assert that we correctly converted the statement to a list
     assert type(pol_statement_map['some-arn']['pol-name']) == list
+
+
+def test_transform_roles_flattens_trusted_principals():
+    roles = [
+        {
+            "Arn": "arn:aws:iam::000000000000:role/role-0",
+            "CreateDate": "2019-01-01 00:00:01",
+            "AssumeRolePolicyDocument": {
+                "Statement": [
+                    {"Principal": {"AWS": "arn:aws:iam::111111111111:root", "Service": "ec2.amazonaws.com"}},
+                ],
+            },
+        },
+        {
+            "Arn": "arn:aws:iam::000000000000:role/role-1",
+            "CreateDate": "2019-01-01 00:00:01",
+            "AssumeRolePolicyDocument": {
+                "Statement": [{"Principal": {"AWS": "arn:aws:iam::111111111111:root"}}],
+            },
+        },
+        {
+            "Arn": "arn:aws:iam::000000000000:role/role-2",
+            "CreateDate": "2019-01-01 00:00:01",
+            "AssumeRolePolicyDocument": {"Statement": []},
+        },
+    ]
+
+    role_rows, trusted_principals = iam.transform_roles(roles)
+
+    assert [(row["Arn"], row["TrustedPrincipalArn"]) for row in role_rows] == [
+        ("arn:aws:iam::000000000000:role/role-0", "arn:aws:iam::111111111111:root"),
+        ("arn:aws:iam::000000000000:role/role-0", "ec2.amazonaws.com"),
+        ("arn:aws:iam::000000000000:role/role-1", "arn:aws:iam::111111111111:root"),
+        ("arn:aws:iam::000000000000:role/role-2", None),
+    ]
+    assert trusted_principals == [
+        {"arn": "arn:aws:iam::111111111111:root", "type": "AWS", "account_id": "111111111111"},
+        {"arn": "ec2.amazonaws.com", "type": "Service", "account_id": None},
+    ]
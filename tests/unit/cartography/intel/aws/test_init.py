@@ -0,0 +1,55 @@
+from unittest import mock
+
+import cartography.intel.aws
+from cartography.client.core import tx
+from cartography.client.core.tx import get_bad_rows
+from cartography.client.core.tx import get_change_counts
+from cartography.client.core.tx import reset_bad_rows
+from cartography.client.core.tx import reset_change_counts
+from cartography.config import Config
+from cartography.graph import statement
+from cartography.graph.statement import get_precheck_counts
+from cartography.graph.statement import reset_precheck_counts
+
+
+def _record_account_outcomes(*args, **kwargs):
+    tx._record_change_counts('TestSchema', 2, 3)
+    tx._bad_rows.setdefault('TestSchema', []).append({'row': {'id': 1}, 'error': 'failed'})
+    statement._record_precheck('test_cleanup', skipped=True)
+
+
+@mock.patch.object(cartography.intel.aws, '_sync_one_account', side_effect=_record_account_outcomes)
+@mock.patch.object(cartography.intel.aws, '_get_account_boto3_session')
+@mock.patch.object(cartography.intel.aws, 'build_neo4j_driver')
+def test_sync_account_in_worker_process_reports_its_counts(mock_driver, mock_boto3_session, mock_sync_one_account):
+    reset_change_counts()
+    reset_bad_rows()
+    reset_precheck_counts()
+    # Counts recorded before the account, e.g. inherited by a forked worker process, are not reported again.
+    tx._record_change_counts('TestSchema', 10, 10)
+
+    report = cartography.intel.aws._sync_account_in_worker(
+        None, 'default', '000000000000', 1, 1, {'UPDATE_TAG': 1, 'AWS_ID': '000000000000'}, [],
+        Config(neo4j_uri='bolt://localhost:7687'),
+    )
+
+    assert report == (
+        {'TestSchema': {'changed': 2, 'unchanged': 3}},
+        {'TestSchema': [{'row': {'id': 1}, 'error': 'failed'}]},
+        {'test_cleanup': {'skipped': 1, 'run': 0}},
+    )
+
+    # The parent merges the report of each worker process into its own counts.
+    reset_change_counts()
+    reset_bad_rows()
+    reset_precheck_counts()
+    tx._record_change_counts('TestSchema', 1, 1)
+    cartography.intel.aws._merge_worker_report(report)
+    cartography.intel.aws._merge_worker_report(None)
+
+    assert get_change_counts() == {'TestSchema': {'changed': 3, 'unchanged': 4}}
+    assert get_bad_rows() == {'TestSchema': [{'row': {'id': 1}, 'error': 'failed'}]}
+    assert get_precheck_counts() == {'test_cleanup': {'skipped': 1, 'run': 0}}
+    reset_change_counts()
+    reset_bad_rows()
+    reset_precheck_counts()
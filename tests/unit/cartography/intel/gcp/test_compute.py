@@ -1,5 +1,7 @@
 import cartography.intel.gcp.compute
 from tests.data.gcp.compute import LIST_FIREWALLS_RESPONSE
+from tests.data.gcp.compute import TRANSFORMED_FW_LIST
+from tests.data.gcp.compute import TRANSFORMED_GCP_INSTANCES
 from tests.data.gcp.compute import VPC_RESPONSE
 from tests.data.gcp.compute import VPC_SUBNET_RESPONSE
 
@@ -63,3 +65,53 @@ def test_transform_gcp_firewall():
     assert sample_fw_icmp_rule['fromport'] is None
     assert sample_fw_icmp_rule['toport'] is None
     assert sample_fw_icmp_rule['protocol'] == 'icmp'
+
+
+def test_transform_gcp_nics_and_access_configs():
+    nics = cartography.intel.gcp.compute.transform_gcp_nics(TRANSFORMED_GCP_INSTANCES)
+    nic_id = 'projects/project-abc/zones/europe-west2-b/instances/instance-1/networkinterfaces/nic0'
+    assert [nic['nic_id'] for nic in nics] == [
+        nic_id,
+        'projects/project-abc/zones/europe-west2-b/instances/instance-1-test/networkinterfaces/nic0',
+    ]
+    assert nics[0]['instance_partial_uri'] == 'projects/project-abc/zones/europe-west2-b/instances/instance-1'
+
+    access_configs = cartography.intel.gcp.compute.transform_gcp_nic_access_configs(nics)
+    assert len(access_configs) == 2
+    assert access_configs[0]['access_config_id'] == f'{nic_id}/accessconfigs/ONE_TO_ONE_NAT'
+    assert access_configs[0]['nic_id'] == nic_id
+
+
+def test_transform_gcp_vpc_and_subnet_references():
+    nics = cartography.intel.gcp.compute.transform_gcp_nics(TRANSFORMED_GCP_INSTANCES)
+    assert cartography.intel.gcp.compute.transform_gcp_vpc_references(nics) == [
+        {'vpc_partial_uri': 'projects/project-abc/global/networks/default'},
+    ]
+    assert cartography.intel.gcp.compute.transform_gcp_subnet_references(nics) == [{
+        'subnet_partial_uri': 'projects/project-abc/regions/europe-west2/subnetworks/default',
+        'vpc_partial_uri': 'projects/project-abc/global/networks/default',
+    }]
+
+
+def test_transform_gcp_instance_tags():
+    tags = cartography.intel.gcp.compute.transform_gcp_instance_tags(TRANSFORMED_GCP_INSTANCES)
+    assert tags == [{
+        'tag_id': 'projects/project-abc/global/networks/default/tags/test',
+        'value': 'test',
+        'instance_partial_uri': 'projects/project-abc/zones/europe-west2-b/instances/instance-1',
+        'vpc_partial_uri': 'projects/project-abc/global/networks/default',
+    }]
+
+
+def test_transform_gcp_firewall_ip_rules():
+    rules, ranges = cartography.intel.gcp.compute.transform_gcp_firewall_ip_rules(TRANSFORMED_FW_LIST)
+    icmp_rule_id = 'projects/project-abc/global/firewalls/default-allow-icmp/allow/icmp'
+    assert {
+        'ruleid': icmp_rule_id,
+        'protocol': 'icmp',
+        'fromport': None,
+        'toport': None,
+        'allowed_by_fw_partial_uri': 'projects/project-abc/global/firewalls/default-allow-icmp',
+    } in rules
+    assert {'range': '0.0.0.0/0', 'ruleid': icmp_rule_id} in ranges
+    assert len(rules) == len(ranges) == 7
@@ -1,8 +1,23 @@
+import itertools
+import re
+import threading
+from pathlib import Path
+from typing import Dict
+from typing import Set
+from unittest import mock
+
 import pytest
 
+import cartography.intel
+from cartography.client.core.tx import get_shared_node_lock
+from cartography.client.core.tx import SHARED_NODE_LABELS
+from cartography.graph.querylint import get_node_schemas
 from cartography.sync import build_default_sync
 from cartography.sync import build_sync
+from cartography.sync import get_stage_dependencies
 from cartography.sync import parse_and_validate_selected_modules
+from cartography.sync import STAGE_DEPENDENCIES
+from cartography.sync import Sync
 from cartography.sync import TOP_LEVEL_MODULES
 
 
@@ -37,3 +52,178 @@ def test_parse_and_validate_selected_modules():
     absolute_garbage = '#@$@#RDFFHKjsdfkjsd,KDFJHW#@,'
     with pytest.raises(ValueError):
         parse_and_validate_selected_modules(absolute_garbage)
+
+
+def test_build_sync_dependencies():
+    sync = build_sync('analysis, okta, aws, create-indexes')
+
+    # Stages run in dependency order regardless of the order they were specified in
+    assert sync._get_run_order() == ['create-indexes', 'aws', 'okta', 'analysis']
+
+
+def test_get_stage_dependencies():
+    dependencies = get_stage_dependencies(['create-indexes', 'gsuite', 'crxcavator', 'gcp', 'analysis'])
+
+    assert dependencies['create-indexes'] == set()
+    assert dependencies['gsuite'] == {'create-indexes'}
+    assert dependencies['crxcavator'] == {'create-indexes', 'gsuite'}
+    assert dependencies['analysis'] == {'create-indexes', 'gsuite', 'crxcavator', 'gcp'}
+
+    # Dependencies on stages that are not part of the sync are dropped
+    assert get_stage_dependencies(['okta']) == {'okta': set()}
+
+
+def test_get_stage_dependencies_is_transitive():
+    # semgrep -> cve -> crowdstrike
+    assert get_stage_dependencies(['crowdstrike', 'semgrep'])['semgrep'] == {'crowdstrike'}
+
+
+# Matches the labels of MERGEd nodes in hand-written queries, like `MERGE (lib:PythonLibrary:Dependency{id: req.id})`.
+_MERGED_LABELS = re.compile(r'MERGE\s*\(\s*\w*\s*((?::\s*\w+\s*)+)')
+
+
+def _get_label_owners() -> Dict[str, Set[str]]:
+    """
+    :return: The stages that create nodes of each label, through a node schema or a hand-written MERGE query.
+    """
+    owners: Dict[str, Set[str]] = {}
+    for node_schema in get_node_schemas():
+        stage = type(node_schema).__module__.split('.')[2]
+        labels = [node_schema.label]
+        if node_schema.extra_node_labels:
+            labels.extend(node_schema.extra_node_labels.labels)
+        for label in labels:
+            owners.setdefault(label, set()).add(stage)
+    intel_dir = Path(cartography.intel.__file__).parent
+    for stage in TOP_LEVEL_MODULES:
+        stage_path = intel_dir / stage.replace('-', '_')
+        paths = stage_path.rglob('*.py') if stage_path.is_dir() else [stage_path.with_suffix('.py')]
+        for path in paths:
+            for match in _MERGED_LABELS.finditer(path.read_text()):
+                for label in match.group(1).split(':')[1:]:
+                    owners.setdefault(label.strip(), set()).add(stage)
+    return owners
+
+
+def test_stage_dependencies_cover_schema_target_labels():
+    """
+    Test that a stage whose schemas draw relationships to nodes created by other stages depends on those stages, so that
+    the relationships are not dropped when stages run concurrently.
+    """
+    owners = _get_label_owners()
+    dependencies = get_stage_dependencies(TOP_LEVEL_MODULES.keys())
+    missing = set()
+    for node_schema in get_node_schemas():
+        stage = type(node_schema).__module__.split('.')[2]
+        rels = [node_schema.sub_resource_relationship] if node_schema.sub_resource_relationship else []
+        if node_schema.other_relationships:
+            rels.extend(node_schema.other_relationships.rels)
+        for rel in rels:
+            rel_owners = owners.get(rel.target_node_label, set())
+            # Labels shared across providers, like IpRule, are matched by provider-specific ids, so a stage that creates
+            # nodes of the target label itself only targets its own.
+            if stage in rel_owners:
+                continue
+            for owner in rel_owners:
+                if owner not in dependencies[stage]:
+                    missing.add((stage, rel.target_node_label, owner))
+    assert missing == set()
+    assert set(STAGE_DEPENDENCIES) <= set(TOP_LEVEL_MODULES)
+
+
+# Labels that several providers create, but with provider-specific ids, so that their MERGEs never meet.
+_LABELS_WITH_PROVIDER_SPECIFIC_IDS = {'Instance', 'IpPermissionInbound', 'IpRule', 'NetworkInterface'}
+
+
+def test_stages_that_may_run_concurrently_do_not_merge_the_same_nodes():
+    """
+    Test that stages that create nodes of the same label are ordered by STAGE_DEPENDENCIES, or that their writes of the
+    label are serialized by shared_node_writes(), so that concurrent MERGEs cannot create duplicate nodes.
+    """
+    dependencies = get_stage_dependencies(TOP_LEVEL_MODULES.keys())
+    concurrent = set()
+    for label, owners in _get_label_owners().items():
+        if label in SHARED_NODE_LABELS or label in _LABELS_WITH_PROVIDER_SPECIFIC_IDS:
+            continue
+        for stage, other_stage in itertools.combinations(sorted(owners), 2):
+            if stage not in dependencies[other_stage] and other_stage not in dependencies[stage]:
+                concurrent.add((label, stage, other_stage))
+    assert concurrent == set()
+    assert 'IpRange' in SHARED_NODE_LABELS
+
+
+def test_sync_circular_dependencies():
+    sync = Sync()
+    sync.add_stage('a', mock.MagicMock(), depends_on=['b'])
+    sync.add_stage('b', mock.MagicMock(), depends_on=['a'])
+
+    with pytest.raises(ValueError):
+        sync._get_run_order()
+
+
+def test_sync_run_concurrently():
+    # Arrange
+    calls = []
+    lock = threading.Lock()
+    slow_stage_started = threading.Event()
+
+    shared_node_locks = []
+
+    def record(name):
+        def stage(neo4j_session, config):
+            with lock:
+                calls.append(name)
+                shared_node_locks.append(get_shared_node_lock())
+        return stage
+
+    def slow(neo4j_session, config):
+        slow_stage_started.set()
+        # `fast` does not depend on us, so it must be able to finish while we are still running
+        assert fast_finished.wait(timeout=5)
+        record('slow')(neo4j_session, config)
+
+    fast_finished = threading.Event()
+
+    def fast(neo4j_session, config):
+        assert slow_stage_started.wait(timeout=5)
+        record('fast')(neo4j_session, config)
+        fast_finished.set()
+
+    sync = Sync()
+    sync.add_stage('first', record('first'))
+    sync.add_stage('slow', slow, depends_on=['first'])
+    sync.add_stage('fast', fast, depends_on=['first'])
+    sync.add_stage('last', record('last'), depends_on=['slow', 'fast'])
+    config = mock.MagicMock(
+        max_concurrent_stages=2, max_load_writers=1, change_detection=False, two_phase_ingestion=False,
+        adaptive_iterations=False, server_side_iterations=False, cleanup_precheck=False,
+        max_concurrent_jobs=1, aws_max_in_flight_calls=None, bulk_import_csv_dir=None, update_tag=1,
+    )
+    neo4j_driver = mock.MagicMock()
+
+    # Act
+    sync.run(neo4j_driver, config)
+
+    # Assert
+    assert calls == ['first', 'fast', 'slow', 'last']
+    # Each stage gets its own session
+    assert neo4j_driver.session.call_count == 4
+    # Writes of shared nodes are serialized while the stages run, and no longer afterwards.
+    assert None not in shared_node_locks
+    assert get_shared_node_lock() is None
+
+
+def test_sync_run_concurrently_stops_on_error():
+    after = mock.MagicMock()
+    sync = Sync()
+    sync.add_stage('broken', mock.MagicMock(side_effect=RuntimeError('boom')))
+    sync.add_stage('after', after, depends_on=['broken'])
+    config = mock.MagicMock(
+        max_concurrent_stages=4, max_load_writers=1, change_detection=False, two_phase_ingestion=False,
+        adaptive_iterations=False, server_side_iterations=False, cleanup_precheck=False,
+        max_concurrent_jobs=1, aws_max_in_flight_calls=None, bulk_import_csv_dir=None, update_tag=1,
+    )
+
+    with pytest.raises(RuntimeError):
+        sync.run(mock.MagicMock(), config)
+    after.assert_not_called()
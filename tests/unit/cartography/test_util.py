@@ -1,38 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from unittest import mock
 from unittest.mock import Mock
 from unittest.mock import patch
 
+import boto3
 import botocore
 import pytest
 
 import cartography.util
 from cartography import util
+from cartography.intel.aws.ec2.util import get_botocore_config
+from cartography.intel.aws.resources import RESOURCE_DEPENDENCIES
+from cartography.util import aws_fan_out_regions
 from cartography.util import aws_handle_regions
+from cartography.util import aws_paginate_iter
+from cartography.util import AWSRateLimiter
 from cartography.util import batch
+from cartography.util import BoundedExecutor
+from cartography.util import CachedBoto3Session
+from cartography.util import get_aws_rate_limiter
+from cartography.util import get_aws_throttle_counts
+from cartography.util import get_cached_boto3_session
+from cartography.util import get_dependency_order
+from cartography.util import get_transitive_dependencies
+from cartography.util import is_retryable_aws_exception
+from cartography.util import iter_batches
+from cartography.util import reset_aws_rate_limiters
 from cartography.util import run_analysis_and_ensure_deps
+from cartography.util import run_with_dependencies
 
 
 def test_run_analysis_job_default_package(mocker):
-    mocker.patch('cartography.util.GraphJob')
+    mocker.patch('cartography.util.parse_job')
     read_text_mock = mocker.patch('cartography.util.read_text')
     util.run_analysis_job('test.json', mocker.Mock(), mocker.Mock())
     read_text_mock.assert_called_once_with('cartography.data.jobs.analysis', 'test.json')
 
 
 def test_run_analysis_job_custom_package(mocker):
-    mocker.patch('cartography.util.GraphJob')
+    mocker.patch('cartography.util.parse_job')
     read_text_mock = mocker.patch('cartography.util.read_text')
     util.run_analysis_job('test.json', mocker.Mock(), mocker.Mock(), package='a.b.c')
     read_text_mock.assert_called_once_with('a.b.c', 'test.json')
 
 
 def test_run_scoped_analysis_job_default_package(mocker):
-    mocker.patch('cartography.util.GraphJob')
+    mocker.patch('cartography.util.parse_job')
     read_text_mock = mocker.patch('cartography.util.read_text')
     util.run_scoped_analysis_job('test.json', mocker.Mock(), mocker.Mock())
     read_text_mock.assert_called_once_with('cartography.data.jobs.scoped_analysis', 'test.json')
 
 
+def test_run_cleanup_job_uses_job_registry(mocker):
+    read_text_mock = mocker.patch('cartography.util.read_text')
+    run_mock = mocker.patch('cartography.graph.job.GraphJob.run')
+    util.run_cleanup_job('aws_import_tgw_cleanup.json', mocker.Mock(), {'UPDATE_TAG': 1})
+    read_text_mock.assert_not_called()
+    run_mock.assert_called_once()
+
+
+def test_run_graph_jobs_orders_jobs_that_share_labels(mocker):
+    calls = []
+    b_done = threading.Event()
+
+    def make_job(name, labels, before=None, after=None):
+        def run(session):
+            if before:
+                before()
+            calls.append(name)
+            if after:
+                after()
+        job = mocker.Mock(labels=frozenset(labels))
+        job.name = name
+        job.run.side_effect = run
+        return job
+
+    jobs = [
+        # a waits for b, so it only finishes if they run concurrently.
+        make_job('a', {'A'}, before=lambda: b_done.wait(5)),
+        make_job('b', {'B'}, after=b_done.set),
+        # c shares a label with a, so it only starts once a has finished.
+        make_job('c', {'A', 'C'}),
+    ]
+    session_factory = mocker.MagicMock()
+    mocker.patch('cartography.util.get_session_factory', return_value=session_factory)
+    mocker.patch('cartography.util.get_max_concurrent_jobs', return_value=3)
+
+    util.run_graph_jobs(mocker.Mock(), jobs)
+
+    assert calls == ['b', 'a', 'c']
+    assert session_factory.new_session.call_count == 3
+
+
+def test_run_graph_jobs_runs_in_sequence_without_session_factory(mocker):
+    jobs = [mocker.Mock(labels=frozenset({'A'})), mocker.Mock(labels=frozenset({'B'}))]
+    neo4j_session = mocker.Mock()
+    mocker.patch('cartography.util.get_session_factory', return_value=None)
+    mocker.patch('cartography.util.get_max_concurrent_jobs', return_value=4)
+
+    util.run_graph_jobs(neo4j_session, jobs)
+
+    for job in jobs:
+        job.run.assert_called_once_with(neo4j_session)
+
+
 @patch(
     'cartography.util.backoff', Mock(
         on_exception=lambda *args, **kwargs: lambda func: func,
@@ -164,3 +238,327 @@ def test_run_analysis_and_ensure_deps_no_requirements(mock_run_analysis_job: moc
         neo4j_session,
         common_job_parameters,
     )
+
+
+def test_aws_fan_out_regions():
+    # Arrange
+    boto3_session = mock.MagicMock()
+    regions = ['us-east-1', 'us-west-2', 'eu-west-1']
+
+    def get_func(session, region):
+        # Client creation goes through the wrapped session
+        session.client('ec2', region_name=region)
+        return [f'{region}-item']
+
+    # Act
+    result = aws_fan_out_regions(get_func, boto3_session, regions)
+
+    # Assert results come back in region order
+    assert result == [
+        ('us-east-1', ['us-east-1-item']),
+        ('us-west-2', ['us-west-2-item']),
+        ('eu-west-1', ['eu-west-1-item']),
+    ]
+    assert boto3_session.client.call_count == 3
+
+
+def test_aws_fan_out_regions_raises():
+    def get_func(session, region):
+        if region == 'us-west-2':
+            raise ValueError(region)
+        return []
+
+    with pytest.raises(ValueError, match='us-west-2'):
+        aws_fan_out_regions(get_func, mock.MagicMock(), ['us-east-1', 'us-west-2', 'eu-west-1'])
+
+
+def test_get_dependency_order():
+    assert get_dependency_order(['c', 'a', 'b'], {'c': {'b'}}) == ['a', 'b', 'c']
+    # Dependencies on names that were not given are ignored.
+    assert get_dependency_order(['b', 'a'], {'b': {'z'}}) == ['b', 'a']
+    with pytest.raises(ValueError):
+        get_dependency_order(['a', 'b'], {'a': {'b'}, 'b': {'a'}})
+    # Dependencies are followed through names that were not given.
+    assert get_dependency_order(['c', 'a'], {'c': {'b'}, 'b': {'a'}}) == ['a', 'c']
+
+
+def test_get_transitive_dependencies():
+    assert get_transitive_dependencies({'c': {'b'}, 'b': {'a'}}) == {'c': {'a', 'b'}, 'b': {'a'}}
+
+
+def test_run_with_dependencies_follows_missing_names():
+    calls = []
+
+    def first():
+        # If 'c' were started concurrently, it would record itself before this returns.
+        time.sleep(0.05)
+        calls.append('a')
+
+    funcs = {'c': partial(calls.append, 'c'), 'a': first}
+    run_with_dependencies(funcs, {'c': {'b'}, 'b': {'a'}}, max_workers=2)
+
+    assert calls == ['a', 'c']
+
+
+def test_aws_resource_dependencies_are_transitive():
+    # The EC2 syncs MERGE the same labels, so they never run concurrently even if the syncs between them are not
+    # requested.
+    order = get_dependency_order(
+        ['ec2:security_group', 'ec2:network_interface', 'ec2:instance', 'rds'], RESOURCE_DEPENDENCIES,
+    )
+    assert order == ['ec2:instance', 'ec2:network_interface', 'ec2:security_group', 'rds']
+    closure = get_transitive_dependencies(RESOURCE_DEPENDENCIES)
+    assert {'ec2:instance', 'ec2:network_interface'} <= closure['ec2:security_group']
+    assert 'ec2:instance' in closure['rds']
+    # Syncs that MERGE AWSAccount nodes of other accounts run after IAM.
+    assert 'iam' in closure['ec2:tgw'] and 'iam' in closure['ec2:vpc_peering']
+
+
+def test_run_with_dependencies():
+    calls = []
+    funcs = {name: partial(calls.append, name) for name in ['tags', 'ec2', 'ssm', 'iam']}
+
+    run_with_dependencies(funcs, {'ssm': {'ec2'}, 'tags': {'ec2', 'ssm', 'iam'}}, max_workers=4)
+
+    assert sorted(calls) == ['ec2', 'iam', 'ssm', 'tags']
+    assert calls.index('ec2') < calls.index('ssm')
+    assert calls[-1] == 'tags'
+
+
+def test_run_with_dependencies_raises():
+    ssm = mock.MagicMock()
+
+    def fail():
+        raise ValueError('ec2 failed')
+
+    with pytest.raises(ValueError, match='ec2 failed'):
+        run_with_dependencies({'ec2': fail, 'ssm': ssm}, {'ssm': {'ec2'}}, max_workers=2)
+    # Functions that depend on a failed function are never started.
+    ssm.assert_not_called()
+
+
+def test_cached_boto3_session_reuses_clients():
+    boto3_session = boto3.session.Session(
+        aws_access_key_id='test', aws_secret_access_key='test', region_name='us-east-1',
+    )
+    cached_session = CachedBoto3Session(boto3_session)
+
+    ec2 = cached_session.client('ec2', region_name='us-west-2', config=get_botocore_config())
+    # Same service, region and config, given positionally or as a different but equal Config object.
+    assert cached_session.client('ec2', 'us-west-2', config=get_botocore_config()) is ec2
+    assert cached_session.client('ec2', region_name='us-east-2', config=get_botocore_config()) is not ec2
+    assert cached_session.client('ec2', region_name='us-west-2') is not ec2
+    assert cached_session.hits == 1
+    assert cached_session.misses == 3
+
+    # Other attributes are forwarded to the wrapped session.
+    assert cached_session.region_name == 'us-east-1'
+    assert get_cached_boto3_session(cached_session) is cached_session
+
+
+def test_cached_boto3_session_resources_are_per_thread():
+    boto3_session = mock.MagicMock()
+    boto3_session.resource.side_effect = lambda *args, **kwargs: mock.MagicMock()
+    cached_session = CachedBoto3Session(boto3_session)
+
+    iam = cached_session.resource('iam')
+    assert cached_session.resource('iam') is iam
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(cached_session.resource, 'iam').result() is not iam
+    assert boto3_session.resource.call_count == 2
+
+
+def _make_client_error(code: str, status_code: int = 400) -> botocore.exceptions.ClientError:
+    return botocore.exceptions.ClientError(
+        {'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status_code}},
+        'FakeOperation',
+    )
+
+
+def test_is_retryable_aws_exception():
+    assert is_retryable_aws_exception(_make_client_error('Throttling'))
+    assert is_retryable_aws_exception(_make_client_error('RequestLimitExceeded'))
+    assert is_retryable_aws_exception(_make_client_error('InternalError', 500))
+    assert is_retryable_aws_exception(_make_client_error('SomethingWentWrong', 503))
+    assert is_retryable_aws_exception(botocore.exceptions.EndpointConnectionError(endpoint_url='https://aws'))
+    assert not is_retryable_aws_exception(_make_client_error('AccessDenied'))
+    assert not is_retryable_aws_exception(_make_client_error('ValidationException'))
+    assert not is_retryable_aws_exception(ZeroDivisionError())
+
+
+def test_aws_rate_limiter_aimd():
+    limiter = AWSRateLimiter(initial_rate=10.0, min_rate=1.0, max_rate=11.0)
+
+    limiter.on_throttle()
+    assert limiter.rate == 5.0
+    limiter.on_throttle()
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.rate == 1.0
+    assert limiter.throttle_count == 4
+
+    limiter.on_success()
+    assert limiter.rate == 2.0
+    for _ in range(1000):
+        limiter.on_success()
+    assert limiter.rate == 11.0
+
+
+@patch('cartography.util.time')
+def test_aws_rate_limiter_acquire_waits_for_tokens(mock_time):
+    mock_time.monotonic.return_value = 100.0
+    limiter = AWSRateLimiter(initial_rate=2.0)
+
+    # The bucket starts with one token, after that the caller has to wait for the next one.
+    limiter.acquire()
+    mock_time.sleep.side_effect = lambda seconds: setattr(mock_time.monotonic, 'return_value', 100.0 + seconds)
+    limiter.acquire()
+    mock_time.sleep.assert_called_once_with(0.5)
+
+
+def test_register_aws_rate_limiter():
+    boto3_session = boto3.session.Session(
+        aws_access_key_id='test', aws_secret_access_key='test', region_name='us-east-1',
+    )
+    client = CachedBoto3Session(boto3_session, account_id='000000000099').client('ec2', region_name='eu-west-3')
+    limiter = get_aws_rate_limiter('000000000099', 'ec2', 'eu-west-3')
+    initial_rate = limiter.rate
+
+    client.meta.events.emit(
+        'needs-retry.ec2.DescribeInstances',
+        response=(Mock(status_code=503), {'Error': {'Code': 'RequestLimitExceeded'}}),
+        caught_exception=None,
+        attempts=1,
+        operation=Mock(),
+        request_dict={'context': {}},
+    )
+
+    assert limiter.rate == initial_rate / 2
+    assert get_aws_throttle_counts('000000000099') == {'ec2:eu-west-3': 1}
+
+
+def test_reset_aws_rate_limiters():
+    limiter = get_aws_rate_limiter('000000000098', 's3', 'us-east-1')
+    other = get_aws_rate_limiter('000000000097', 's3', 'us-east-1')
+
+    reset_aws_rate_limiters('000000000098')
+
+    assert get_aws_rate_limiter('000000000098', 's3', 'us-east-1') is not limiter
+    assert get_aws_rate_limiter('000000000097', 's3', 'us-east-1') is other
+    reset_aws_rate_limiters()
+    assert get_aws_rate_limiter('000000000097', 's3', 'us-east-1') is not other
+
+
+def test_bounded_executor_map_unordered_limits_in_flight_calls():
+    executor = BoundedExecutor(max_workers=8, default_max_in_flight=2)
+    lock = threading.Lock()
+    in_flight = []
+    max_seen = []
+
+    def slow_double(item):
+        with lock:
+            in_flight.append(item)
+            max_seen.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(item)
+        return item * 2
+
+    results = list(executor.map_unordered('test', slow_double, range(10)))
+
+    assert sorted(results) == [i * 2 for i in range(10)]
+    assert max(max_seen) <= 2
+
+
+def test_bounded_executor_map_unordered_yields_in_completion_order():
+    executor = BoundedExecutor(max_workers=4, default_max_in_flight=4)
+    executor.set_max_in_flight('test', 3)
+    slow_item_started = threading.Event()
+    release_slow_item = threading.Event()
+
+    def func(item):
+        if item == 'slow':
+            slow_item_started.set()
+            release_slow_item.wait(timeout=5)
+        return item
+
+    results = executor.map_unordered('test', func, ['slow', 'fast-1', 'fast-2'])
+    assert next(results) in ('fast-1', 'fast-2')
+    assert next(results) in ('fast-1', 'fast-2')
+    assert slow_item_started.is_set()
+    release_slow_item.set()
+    assert next(results) == 'slow'
+
+
+def test_bounded_executor_map_unordered_raises():
+    def fail(item):
+        raise ValueError(item)
+
+    with pytest.raises(ValueError):
+        list(BoundedExecutor().map_unordered('test', fail, [1, 2, 3]))
+
+
+def test_bounded_executor_does_not_starve_other_services():
+    executor = BoundedExecutor(max_workers=2, default_max_in_flight=1)
+    release = threading.Event()
+    blocked = [executor.submit('throttled', release.wait, 5) for _ in range(4)]
+
+    # The queued calls of the throttled service do not hold threads that other services need.
+    assert executor.submit('other', lambda: 'done').result(timeout=5) == 'done'
+    release.set()
+    assert all(future.result(timeout=5) for future in blocked)
+
+
+def test_bounded_executor_set_default_max_in_flight():
+    executor = BoundedExecutor(max_workers=8, default_max_in_flight=2)
+    executor.set_max_in_flight('limited', 1)
+    executor.set_default_max_in_flight(4)
+    lock = threading.Lock()
+    in_flight = []
+    max_seen = []
+
+    def slow_double(item):
+        with lock:
+            in_flight.append(item)
+            max_seen.append(len(in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(item)
+        return item * 2
+
+    assert sorted(executor.map_unordered('test', slow_double, range(16))) == [i * 2 for i in range(16)]
+    assert 2 < max(max_seen) <= 4
+    max_seen.clear()
+    assert sorted(executor.map_unordered('limited', slow_double, range(4))) == [i * 2 for i in range(4)]
+    assert max(max_seen) == 1
+
+
+def test_iter_batches():
+    assert list(iter_batches(iter(range(8)), size=3)) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert list(iter_batches([], size=3)) == []
+
+
+def test_aws_paginate_iter():
+    client = mock.MagicMock()
+    client.get_paginator.return_value.paginate.return_value = iter([{'Items': [1, 2]}, {}, {'Items': [3]}])
+
+    assert list(aws_paginate_iter(client, 'list_items', 'Items', Filter='x')) == [1, 2, 3]
+    client.get_paginator.return_value.paginate.assert_called_once_with(Filter='x')
+
+
+def test_aws_handle_regions_generator():
+    @aws_handle_regions
+    def get_items_denied():
+        yield 1
+        raise _make_client_error('AccessDenied')
+
+    # Streaming get functions stop at the error instead of losing the items they already yielded.
+    assert list(get_items_denied()) == [1]
+
+    @aws_handle_regions
+    def get_items_failing():
+        yield 1
+        raise _make_client_error('ValidationException')
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        list(get_items_failing())